@@ -1,35 +1,63 @@
-import discord
-import random
 import asyncio
+import signal
 from discord.ext import commands
+from aiohttp import web
 from dotenv import load_dotenv
 import os
-from flask import Flask, request
-from threading import Thread
 import logging
+import math
 import socket
 import sys
 import time
-import traceback
-from datetime import datetime
-
-# Configuration des logs avec rotation des fichiers
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.FileHandler('bot.log'),
-                        logging.StreamHandler(sys.stdout)
-                    ])
+from datetime import datetime, timedelta
+
+from core.backends import BackendMemoire, BackendRedis, ClientRedis
+from core.cache import memoire_residente, options_cache, statistiques_cache
+from core.catalogues import SourceCatalogues
+from core.cooldown import DUREE_COOLDOWN, CooldownRegistry
+from core.dedup import FenetreDedup
+from core.endpoints import configurer_endpoints
+from core.gateway_trace import EnregistreurGateway
+from core.intents import construire_intents, prefixe_commandes
+from core.logs import configurer_logs
+from core.loop_monitor import MoniteurBoucle
+from core.metrics import REGISTRE, suivi_rate_limits
+from core.outbound import PlanificateurEnvois
+from core.persistence import CooldownStore
+from core.prefilter import FiltrePrefixe
+from core.profiler import ProfileurEchantillonnage
+from core.reconnect import SuiviReconnexions, executer_avec_reprise
+from core.supervisor import Superviseur
+from core.tracing import Traceur, reception_message
+from core.user_state import TableUtilisateurs
+from core.web import ServeurKeepAlive, reponse_json, route_profil
+
+load_dotenv()
+
+# Configuration des logs : écriture et rotation des fichiers hors de la boucle
+configurer_logs()
 logger = logging.getLogger(__name__)
 
 
-# Mécanisme de verrouillage pour une seule instance
+# Mode cluster : chaque processus lancé par cluster.py possède une plage de
+# shards et son propre fichier de verrouillage
+CLUSTER_ID = os.getenv('CLUSTER_ID')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None
+SHARD_IDS = [
+    int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard
+] or None
+AUTO_SHARD = SHARD_COUNT is not None or os.getenv('AUTO_SHARD',
+                                                  'false').lower() == 'true'
+FICHIER_VERROU = f'.bot.{CLUSTER_ID}.lock' if CLUSTER_ID else '.bot.lock'
+
+
+# Mécanisme de verrouillage pour une seule instance (par cluster)
 def obtain_lock():
     try:
         # Force la suppression du verrou si le processus n'existe plus
-        if os.path.exists('.bot.lock'):
+        if os.path.exists(FICHIER_VERROU):
             try:
-                with open('.bot.lock', 'r') as f:
+                with open(FICHIER_VERROU, 'r') as f:
                     old_pid = int(f.read().strip())
                 try:
                     os.kill(old_pid, 0)
@@ -39,73 +67,73 @@ def obtain_lock():
                     return False
                 except ProcessLookupError:
                     logger.info("Suppression du verrou obsolète")
-                    os.remove('.bot.lock')
+                    os.remove(FICHIER_VERROU)
             except (ValueError, OSError) as e:
                 logger.warning(f"Suppression du verrou invalide: {e}")
-                os.remove('.bot.lock')
+                os.remove(FICHIER_VERROU)
 
         # Crée un nouveau fichier de verrouillage
-        with open('.bot.lock', 'w') as f:
+        with open(FICHIER_VERROU, 'w') as f:
             f.write(str(os.getpid()))
         return True
     except Exception as e:
         logger.error(f"Erreur lors de la création du verrou: {e}")
-        if os.path.exists('.bot.lock'):
+        if os.path.exists(FICHIER_VERROU):
             try:
-                os.remove('.bot.lock')
+                os.remove(FICHIER_VERROU)
             except OSError:
                 pass
         return False
 
 
-# Flask app pour le keep-alive avec surveillance de santé et sécurité améliorée
-app = Flask(__name__)
+# Serveur keep-alive exécuté sur la boucle asyncio du bot
 bot_start_time = datetime.now()
-last_heartbeat = datetime.now()
+
+# Surveillance du retard de la boucle asyncio et détection des blocages
+retard_boucle = REGISTRE.histogramme(
+    'bot_event_loop_lag_seconds',
+    'Retard de réveil de la boucle asyncio',
+    bornes=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+moniteur = MoniteurBoucle(intervalle=float(os.getenv('LOOP_LAG_INTERVAL',
+                                                     '0.1')),
+                          seuil=float(os.getenv('LOOP_STALL_THRESHOLD', '1')),
+                          on_retard=retard_boucle.observer)
+REGISTRE.compteur('bot_event_loop_stalls_total',
+                  'Blocages de la boucle détectés par le surveillant',
+                  fonction=lambda: moniteur.nb_blocages)
 
 
-@app.after_request
-def add_header(response):
-    # Autoriser l'accès depuis n'importe quelle origine pour le développement
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-    response.headers['X-Replit-ID'] = os.getenv('REPL_ID', 'Non défini')
-    response.headers['X-Debug-Info'] = 'Flask server running'
-    return response
+def depuis_dernier_battement():
+    return time.monotonic() - moniteur.dernier_battement
 
 
-@app.route('/')
-def home():
-    uptime = datetime.now() - bot_start_time
-    last_beat = datetime.now() - last_heartbeat
-    status = {
+def etat_keep_alive():
+    return {
         'status': 'alive',
-        'uptime': str(uptime),
-        'last_heartbeat': str(last_beat),
+        'uptime': str(datetime.now() - bot_start_time),
+        'last_heartbeat': str(timedelta(seconds=depuis_dernier_battement())),
         'start_time': bot_start_time.isoformat(),
         'version': '1.0.0',
         'repl_id': os.getenv('REPL_ID', 'Non défini'),
-        'debug_info': {
-            'host': request.host,
-            'url': request.url,
-            'headers': dict(request.headers)
-        }
     }
-    return status, 200, {'Content-Type': 'application/json'}
 
 
-@app.route('/health')
-def health():
+def etat_sante():
+    latence = bot.latency
+    connecte = bot.is_ready() and not bot.is_closed() and math.isfinite(
+        latence)
     return {
-        'status': 'healthy',
+        'status': 'healthy' if connecte else 'unhealthy',
+        'gateway_latency_ms': round(latence * 1000, 1) if connecte else None,
+        **moniteur.statistiques(),
+        'last_heartbeat_s': round(depuis_dernier_battement(), 3),
+        'disconnected_s': reconnexions.duree_coupure(),
+        'cluster': CLUSTER_ID,
+        'shards': SHARD_IDS,
+        # Taille du cache, sans construire la liste de bot.guilds
+        'guilds': len(bot._connection._guilds),
         'timestamp': datetime.now().isoformat(),
-        'repl_id': os.getenv('REPL_ID', 'Non défini'),
-        'debug_info': {
-            'host': request.host,
-            'url': request.url
-        }
-    }, 200
+    }
 
 
 def find_free_port():
@@ -121,309 +149,420 @@ def find_free_port():
     raise RuntimeError("Aucun port disponible trouvé")
 
 
-def run_flask():
-    try:
-        port = int(os.getenv(
-            'PORT',
-            '8080'))  # Utiliser la variable d'environnement PORT de Replit
-        logger.info(f"Démarrage du serveur Flask sur le port {port}")
-
-        # Logging des informations de débogage
-        logger.info("Variables d'environnement Replit:")
-        for env_var in ['REPL_ID', 'REPL_SLUG', 'REPL_OWNER', 'PORT']:
-            logger.info(f"{env_var}: {os.getenv(env_var, 'Non défini')}")
-
-        # Construction de l'URL avec ID unique Replit
-        repl_id = os.getenv('REPL_ID', '')
-        if repl_id:
-            replit_url = f"https://{repl_id}.id.repl.co"
-            logger.info(f"URL Replit (basée sur ID): {replit_url}")
-        else:
-            logger.warning(
-                "REPL_ID non défini - impossible de construire l'URL")
-
-        app.run(host='0.0.0.0', port=port)
-    except Exception as e:
-        logger.exception(
-            f"Erreur critique lors du démarrage du serveur Flask: {e}")
-        # Redémarrage automatique du serveur Flask en cas d'erreur
-        time.sleep(5)
-        run_flask()
-
-
-def keep_alive():
-    try:
-        server = Thread(target=run_flask, daemon=True)
-        server.start()
-        logger.info("Serveur keep-alive démarré avec succès")
-    except Exception as e:
-        logger.exception(
-            f"Erreur critique lors du démarrage du thread keep-alive: {e}")
-
-
-# Listes des Atouts et Défauts restent inchangées
-atouts = [
-    "L’un de vos sens est exceptionnellement développé (Vue, ouïe, odorat… à vous de choisir)",
-    "Votre corps est d’une résistance impressionnante (Vous encaissez mieux les coups et la fatigue)",
-    "Vous êtes particulièrement souple (Passer dans des espaces exigus ou esquiver est plus aisé)",
-    "Vos réflexes sont d’une précision remarquable (Votre corps réagit plus vite que votre pensée)",
-    "Votre musculature est bien au-dessus de la moyenne (Force physique accrue)",
-    "Vous êtes incroyablement endurant (Fatigue physique retardée, courses prolongées possibles)",
-    "Votre corps se remet vite des blessures (Cicatrisation accélérée, douleurs moins handicapantes)",
-    "Vous avez une coordination parfaite (Aucune maladresse, mouvements fluides et précis)",
-    "Votre respiration est maîtrisée (Plongée en apnée, endurance en conditions difficiles)",
-    "Votre voix est captivante et autoritaire (Difficile à ignorer, parfait pour imposer sa présence)",
-    "Vos gestes sont d’une précision chirurgicale (Idéal pour les manipulations délicates)",
-    "Votre démarche est naturelle et discrète (Déplacements silencieux instinctifs)",
-    "Votre sens de l’équilibre est parfait (Difficile à déséquilibrer ou à faire chuter)",
-    "Votre résistance aux toxines est accrue (Alcool, drogues ou poisons ont un effet réduit)",
-    "Vous êtes capable de supporter des températures extrêmes (Froid et chaleur vous affectent moins)",
-    "Votre corps est taillé pour l’escalade et l’agilité (Saisir, grimper, bondir semble naturel)",
-    "Vous possédez une force impressionnante dans une partie du corps (Main, jambes, dos… à vous de choisir)",
-    "Votre peau est particulièrement résistante (Coupures superficielles et ecchymoses ont peu d’effet)",
-    "Vous avez une capacité pulmonaire hors norme (Sprint, endurance ou résistance aux gaz)",
-    "Votre perception du mouvement est aiguisée (Difficile de vous surprendre en combat ou en infiltration)",
-    "Vous êtes naturellement rapide (Vos déplacements sont fulgurants)",
-    "Votre souplesse vous permet d’exécuter des postures improbables (Contorsionniste, esquives fluides)",
-    "Votre peau ne marque presque jamais (Bleus, coups, cicatrices disparaissent vite)",
-    "Vous récupérez étonnamment bien du manque de sommeil (Moins de besoin de repos immédiat)",
-    "Votre endurance nerveuse est inébranlable (Résistance accrue au stress et aux douleurs prolongées)",
-    "Votre corps s’adapte rapidement aux changements (Altitude, plongée, pression, mouvement rapide)",
-    "Votre instinct de survie est aiguisé (Votre corps réagit instinctivement face au danger)",
-    "Vous possédez une dextérité naturelle (Manipulations fines et précises, gestes rapides)",
-    "Votre posture et votre prestance imposent le respect (Aucune hésitation dans votre démarche)",
-    "Votre corps semble fonctionner avec une efficience parfaite (Coordination, réactivité et énergie optimale)",
-    "Vous possédez une arme de qualité (Une arme tranchante, une arme à feu, ou autre… à définir)",
-    "Vous avez un équipement de protection efficace (Armure, gilet pare-balles, combinaison renforcée…)",
-    "Vous êtes en possession d’un outil multifonction (Couteau suisse, pied-de-biche, laser de découpe…)",
-    "Vous avez des documents d’identité solides (Parfait pour passer les contrôles sans encombre)",
-    "Vous avez un accès à un moyen de transport fiable (Cheval, voiture, moto, vaisseau…)",
-    "Vous transportez une somme d’argent confortable (Assez pour acheter ce dont vous avez besoin sur place)",
-    "Vous possédez une clé/un badge/un code d’accès précieux (Vers un lieu sécurisé)",
-    "Vous portez des vêtements de grande qualité (Élégants, résistants, ou parfaitement adaptés à l’environnement)",
-    "Vous disposez d’un appareil technologique avancé (Communicateur, drone, analyseur de données…)",
-    "Vous avez des vivres et provisions en quantité (Nourriture, eau, rations de survie…)",
-    "Vous possédez un carnet de notes rempli d’informations utiles (Indices, noms, plans d’accès…)",
-    "Vous avez un animal dressé (Chien de garde, faucon messager, monture bien entraînée…)",
-    "Vous transportez un kit médical de bonne qualité (De quoi soigner des blessures légères à moyennes)",
-    "Vous possédez un plan détaillé du lieu où vous vous trouvez (Avec des annotations précises)",
-    "Vous avez un dispositif de communication efficace (Radio, talkie-walkie, réseau clandestin…)",
-    "Vous possédez un moyen d’éclairage performant (Lampe torche, briquet, pierre à feu, lumigel…)",
-    "Vous avez des explosifs improvisés (Grenades artisanales, charges de démolition, poudre noire…)",
-    "Vous transportez un document compromettant (Preuve d’un complot, information ultra-sensible…)",
-    "Vous avez une potion, drogue ou stimulant rare (Effet temporaire : force, endurance, résistance…)",
-    "Vous êtes en possession d’un livre ancien précieux (Informations cachées, artefact mystique ou technologique…)",
-    "Vous avez une arme dissimulée indétectable (Lame de botte, pistolet miniature, aiguilles empoisonnées…)",
-    "Vous possédez un appareil d’enregistrement sophistiqué (Pour collecter des preuves audio/vidéo…)",
-    "Vous avez un uniforme/localement reconnu (Permet de se faire passer pour quelqu’un d’autre…)",
-    "Vous transportez un message important (Lettre scellée, mission secrète, coordonnées d’un lieu…)",
-    "Vous possédez une monnaie d’échange rare (Or, pierres précieuses, artefact convoité…)",
-    "Vous avez une trousse à outils complète (De quoi forcer des serrures, bricoler, réparer…)",
-    "Vous êtes équipé d’un détecteur spécial (Détecte chaleur, métaux, radiations, énergie magique…)",
-    "Vous avez en votre possession un antidote (Peut neutraliser un poison spécifique…)",
-    "Vous transportez une carte de contacts influents (Réseau souterrain, accès à des informations privilégiées…)",
-    "Vous avez un mot de passe/un code secret (Permet d’ouvrir des portes… au sens propre ou figuré…)"
-]
-
-defauts = [
-    "L’un de vos sens est particulièrement faible (Vision trouble, mauvaise ouïe, odorat quasi inexistant…)",
-    "Votre corps est fragile et supporte mal les blessures (Moins de résistance aux coups et chocs)",
-    "Vous êtes étonnamment maladroit (Vos gestes manquent de précision, risque accru de rater des actions fines)",
-    "Vous souffrez d’un handicap physique léger (Boiterie, bras moins fonctionnel, manque de mobilité…)",
-    "Votre force est anormalement basse (Difficulté à soulever, porter, ou utiliser des objets lourds)",
-    "Votre endurance est limitée (Vous vous fatiguez plus vite que la normale)",
-    "Votre corps guérit très lentement (Les blessures, même mineures, mettent du temps à disparaître)",
-    "Vous manquez de coordination (Vos mouvements sont parfois imprécis ou hésitants)",
-    "Votre respiration est faible (Difficulté en altitude, en apnée, ou lors d’efforts prolongés)",
-    "Votre voix est faible ou monotone (Difficile à entendre ou à rendre captivante)",
-    "Votre équilibre est instable (Facile à déséquilibrer ou à faire chuter)",
-    "Votre peau est particulièrement sensible (Marque facilement, réactions aux agressions extérieures)",
-    "Vous êtes sujet aux tremblements (Mains, jambes, voire tout le corps, en fonction du stress ou de l’effort)",
-    "Votre résistance à la douleur est faible (Vous ressentez les blessures plus intensément)",
-    "Vous ne supportez pas bien les températures extrêmes (Chaleur et froid vous affectent rapidement)",
-    "Votre vitesse de déplacement est réduite (Vous êtes plus lent que la moyenne)",
-    "Vos réflexes sont anormalement lents (Difficile de réagir rapidement à une menace)",
-    "Votre posture est inhabituelle (Marche peu naturelle, attitude étrange qui attire l’attention)",
-    "Votre métabolisme est imprévisible (Vous avez souvent faim, soif, ou des réactions physiologiques anormales)",
-    "Vous êtes sujet à des douleurs chroniques (Migraine, douleurs articulaires, crampes inexpliquées…)",
-    "Votre système immunitaire est faible (Vulnérable aux maladies, infections ou poisons)",
-    "Vous êtes incapable de courir longtemps (Même une courte course vous épuise rapidement)",
-    "Vos mains sont rigides ou peu précises (Difficulté à manier des outils ou armes fines)",
-    "Votre champ de vision est réduit (Problèmes de perception périphérique ou vision tunnel)",
-    "Vous êtes facilement sujet aux vertiges (Déséquilibre fréquent, peur du vide, troubles de l’orientation)",
-    "Votre force dans un membre est réduite (Un bras ou une jambe est plus faible que l’autre)",
-    "Votre respiration est irrégulière (Tendance à s’essouffler sans raison apparente)",
-    "Vous êtes sujet à des crampes musculaires (Effort prolongé = crampe imprévisible)",
-    "Vous avez une condition médicale non soignée (Asthme léger, arythmie, douleurs articulaires chroniques…)",
-    "Votre corps est étrangement froid ou chaud au toucher (Sans raison apparente, ce qui peut attirer l’attention)",
-    "Vous êtes totalement désarmé (Aucune arme, même improvisée)",
-    "Votre équipement est en très mauvais état (Rouillé, abîmé, dysfonctionnel)",
-    "Vos vêtements sont inadaptés à votre environnement (Trop légers, trop chauds, mal ajustés)",
-    "Vous n’avez aucun moyen de communication (Impossible de contacter qui que ce soit)",
-    "Vous n’avez pas un sou en poche (Aucun argent, ni objet de valeur échangeable)",
-    "Votre seule arme est peu efficace (Lame émoussée, munitions limitées, arme improvisée)",
-    "Vous avez un équipement incomplet (Il manque un élément crucial)",
-    "Vos documents d’identité sont incohérents (Nom erroné, statut suspect, origine douteuse)",
-    "Votre sac est rempli d’objets inutiles (Des choses sans valeur ou hors de propos)",
-    "Votre équipement est trop encombrant (Difficile à transporter discrètement ou rapidement)",
-    "Vous avez un objet compromettant sur vous (Preuve d’un crime, faux papiers, substance interdite)",
-    "Vous êtes en possession d’un objet dangereux… sans en connaître l’usage (Technologie inconnue, substance douteuse)",
-    "Votre seule source de lumière est défaillante (Lampe qui clignote, torche qui s’éteint au moindre mouvement)",
-    "Votre nourriture et votre eau sont contaminées ou insuffisantes (Vous risquez de tomber malade)",
-    "Votre moyen de transport est en panne ou inutilisable (Bloqué, saboté, sans carburant)",
-    "Votre matériel électronique est hors service (Batterie morte, circuits grillés)",
-    "Votre trousse médicale est presque vide (Pas de bandages, antiseptique épuisé, médications manquantes)",
-    "Vous avez une clé/un code d’accès, mais il ne fonctionne plus (Obsolète, erreur de cryptage, mauvaise porte)",
-    "Vous possédez une arme, mais aucune munition (Ou des munitions incompatibles)",
-    "Votre équipement de protection est inefficace (Armure trouée, casque fissuré, bouclier fendu)",
-    "Vous avez un appareil high-tech… mais vous ne savez pas l’utiliser (Technologie étrangère ou trop avancée)",
-    "Votre tenue vous rend très visible (Trop colorée, trop reconnaissable)",
-    "Vos chaussures sont inadaptées (Trop grandes, trop petites, usées, glissantes)",
-    "Votre sac ou conteneur principal est déchiré (Risque de perdre du matériel)",
-    "Votre carte ou plan est erroné (Mauvaises indications, zones non mises à jour)",
-    "Vous avez un objet de valeur… mais il est faussement authentifié (Risque de trahison si découvert)",
-    "Votre matériel de camouflage ne fonctionne pas (Tissu déchiré, peinture qui s’efface, bruit trop élevé)",
-    "Vos menottes, cordes ou attaches ne tiennent pas (Difficile de sécuriser un captif)",
-    "Votre équipement de survie est incomplet (Pas de feu, pas d’eau potable, pas de trousse d’urgence)",
-    "Vous avez un objet inconnu sur vous (Vous ignorez son usage et s’il est dangereux)"
-]
-
-# Historique des tirages avec nettoyage automatique
-recent_tirages = {}
-command_lock = {}
-processed_messages = set()
-
-
-def nettoyer_historique():
-    try:
-        maintenant = time.time()
-        a_supprimer = []
-        for tirage, timestamp in recent_tirages.items():
-            if maintenant - timestamp > 3600:
-                a_supprimer.append(tirage)
-        for tirage in a_supprimer:
-            del recent_tirages[tirage]
-    except Exception as e:
-        logger.error(f"Erreur lors du nettoyage de l'historique: {e}")
-
-
-async def update_heartbeat():
-    while True:
-        global last_heartbeat
-        last_heartbeat = datetime.now()
-        await asyncio.sleep(60)  # Update toutes les minutes
-
-
-def tirage_unique(liste, historique):
-    try:
-        nettoyer_historique()
-        maintenant = time.time()
-        candidats = [item for item in liste if item not in historique.keys()]
-        if not candidats:
-            temps_restant = int(3600 - (maintenant - min(historique.values())))
-            minutes = temps_restant // 60
-            secondes = temps_restant % 60
-            raise ValueError(
-                f"Tous les éléments sont en cooldown. Veuillez attendre {minutes}m {secondes}s."
-            )
-
-        choix = random.choice(candidats)
-        historique[choix] = maintenant
-        return choix
-    except Exception as e:
-        logger.error(f"Erreur lors du tirage unique: {e}")
-        raise
-
+def log_environnement_replit():
+    # Logging des informations de débogage
+    logger.info("Variables d'environnement Replit:")
+    for env_var in ['REPL_ID', 'REPL_SLUG', 'REPL_OWNER', 'PORT']:
+        logger.info("%s: %s", env_var, os.getenv(env_var, 'Non défini'))
 
-# Configuration du bot avec des intents minimaux et gestion d'erreurs améliorée
-load_dotenv()
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+    # Construction de l'URL avec ID unique Replit
+    repl_id = os.getenv('REPL_ID', '')
+    if repl_id:
+        logger.info("URL Replit (basée sur ID): https://%s.id.repl.co",
+                    repl_id)
+    else:
+        logger.warning("REPL_ID non défini - impossible de construire l'URL")
+
+
+# Métriques exposées sur /metrics (format Prometheus)
+latence_commandes = REGISTRE.histogramme(
+    'bot_command_duration_seconds',
+    "Durée des commandes, de l'invocation à la fin de l'envoi",
+    labels=('command', ))
+rate_limits = REGISTRE.compteur('discord_rest_rate_limited_total',
+                                'Réponses 429 reçues de l\'API REST')
+
+
+async def exposer_metriques(request):
+    return web.Response(text=REGISTRE.exposition(),
+                        content_type='text/plain',
+                        charset='utf-8')
+
+
+serveur_web = ServeurKeepAlive(
+    etat_keep_alive,
+    etat_sante,
+    host=os.getenv('HOST', '0.0.0.0'),
+    port=int(os.getenv('PORT',
+                       '8080')))  # Utiliser la variable d'environnement PORT de Replit
+serveur_web.ajouter_route('/metrics', exposer_metriques)
+
+
+# Catalogues de tirage lus depuis des fichiers texte (un par table, avec
+# remplacements optionnels par serveur), surveillés et rechargés à chaud
+source_catalogues = SourceCatalogues(os.getenv('CATALOG_DIR',
+                                               'data/catalogues'))
+catalogues = source_catalogues.charger()
+
+# Pools de tirage avec cooldown, isolés par serveur (ou par salon)
+cooldowns = CooldownRegistry(
+    catalogues,
+    duree=int(os.getenv('COOLDOWN_DURATION', DUREE_COOLDOWN)),
+    par_salon=os.getenv('COOLDOWN_SCOPE', 'guild').lower() == 'channel',
+    ttl_inactivite=int(os.getenv('COOLDOWN_IDLE_TTL', DUREE_COOLDOWN)))
+# Stockage persistant des cooldowns, ouvert au démarrage (voir __main__)
+store = None
+# État par utilisateur (verrou de commande, compteurs) avec éviction
+command_lock = TableUtilisateurs(
+    ttl=int(os.getenv('USER_STATE_TTL', '3600')),
+    capacite=int(os.getenv('USER_STATE_CAPACITY', '100000')))
+# Déduplication des messages sur une fenêtre glissante à mémoire constante
+processed_messages = FenetreDedup(
+    fenetre=float(os.getenv('DEDUP_WINDOW', '300')),
+    capacite=int(os.getenv('DEDUP_CAPACITY', '10000')))
+
+
+# Backend des cooldowns : mémoire du processus, ou serveur Redis partagé pour
+# que plusieurs processus servant un même serveur ne tirent pas de doublons
+def creer_backend():
+    if os.getenv('COOLDOWN_BACKEND', 'memory').lower() == 'redis':
+        return BackendRedis(
+            ClientRedis(os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')),
+            catalogues,
+            duree=cooldowns.duree,
+            par_salon=os.getenv('COOLDOWN_SCOPE',
+                                'guild').lower() == 'channel',
+            fenetre_dedup=float(os.getenv('DEDUP_WINDOW', '300')))
+    return BackendMemoire(cooldowns)
+
+
+backend = creer_backend()
+
+# Envois regroupés par salon, avec rate limit anticipé
+envois = PlanificateurEnvois(
+    fenetre=float(os.getenv('SEND_COALESCE_WINDOW', '0.05')))
+
+
+# Configuration du bot : le profil d'intents détermine les événements reçus
+# de la gateway (voir core/intents.py) ; les commandes slash fonctionnent
+# avec tous les profils
+PROFIL_INTENTS = os.getenv('INTENTS_PROFILE', 'full').lower()
+intents = construire_intents(PROFIL_INTENTS)
+PREFIXE = prefixe_commandes(PROFIL_INTENTS)
+
+# Filtre rapide des messages avant process_commands : la grande majorité des
+# messages reçus ne sont pas des commandes
+filtre_prefixe = FiltrePrefixe(PREFIXE)
+duree_dispatch = REGISTRE.histogramme(
+    'bot_command_dispatch_seconds',
+    'Durée de process_commands pour les messages ayant passé le filtre',
+    bornes=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+
+# Profil de cache : low_memory désactive le cache de messages et le chunking
+# des membres pour servir beaucoup de serveurs par processus
+TAILLE_CACHE_MESSAGES = os.getenv('MESSAGE_CACHE_SIZE')
+OPTIONS_CACHE = options_cache(
+    os.getenv('CACHE_PROFILE', 'default').lower(),
+    int(TAILLE_CACHE_MESSAGES) if TAILLE_CACHE_MESSAGES else None)
+
+# Enregistrement optionnel des événements de la gateway, pour rejouer le
+# trafic de production hors ligne (utils/replay_trace.py)
+CHEMIN_TRACE = os.getenv('GATEWAY_TRACE')
+enregistreur = EnregistreurGateway(
+    CHEMIN_TRACE,
+    redaction=os.getenv('GATEWAY_TRACE_REDACT', 'content').lower(),
+    debuts=filtre_prefixe.debuts) if CHEMIN_TRACE else None
+
+# Traçage des étapes des commandes (TRACE_FILE), sur une fraction
+# TRACE_SAMPLE_RATE des commandes ; sans fichier, les spans ne coûtent rien
+traceur = Traceur(os.getenv('TRACE_FILE'),
+                  taux=float(os.getenv('TRACE_SAMPLE_RATE', '0.1')))
+
+
+# Tâches de fond supervisées : démarrées une seule fois par connexion,
+# relancées si elles plantent et annulées à la fermeture
+superviseur = Superviseur()
+duree_taches = REGISTRE.jauge('bot_job_duration_seconds',
+                              'Durée de la dernière exécution des tâches',
+                              labels=('job', ))
+derive_taches = REGISTRE.jauge('bot_job_drift_seconds',
+                               'Retard du dernier déclenchement des tâches',
+                               labels=('job', ))
+redemarrages_taches = REGISTRE.compteur('bot_job_restarts_total',
+                                        'Redémarrages des tâches plantées',
+                                        labels=('job', ))
+
+
+def purger_etats():
+    cooldowns.purger_inactifs()
+    command_lock.purger()
+    envois.purger()
+
+
+async def ecrire_cooldowns():
+    if store is not None:
+        await asyncio.to_thread(store.flush)
+
+
+async def vider_trace():
+    if enregistreur is not None:
+        await asyncio.to_thread(enregistreur.vider)
+
+
+async def vider_spans():
+    if traceur.actif:
+        await asyncio.to_thread(traceur.vider)
+
+
+async def surveiller_catalogues():
+    jeu = await asyncio.to_thread(source_catalogues.verifier)
+    if jeu is not None:
+        # Les cooldowns des éléments toujours présents sont conservés
+        modifies = backend.remplacer_catalogues(jeu)
+        logger.info("Catalogues rechargés: %s",
+                    ', '.join(modifies) or 'aucun changement')
+
+
+def agreger_metriques():
+    for tache in superviseur:
+        duree_taches.labels(tache.nom).set(tache.derniere_duree)
+        derive_taches.labels(tache.nom).set(tache.derniere_derive)
+        redemarrages_taches.labels(tache.nom).set(tache.nb_redemarrages)
+
+
+superviseur.enregistrer('heartbeat', moniteur.executer)
+superviseur.enregistrer('cooldown_expiry', purger_etats, intervalle=60)
+superviseur.enregistrer('persistence_flush', ecrire_cooldowns, intervalle=2)
+superviseur.enregistrer('metrics_rollup', agreger_metriques, intervalle=15)
+superviseur.enregistrer('trace_flush', vider_trace, intervalle=5)
+superviseur.enregistrer('span_export', vider_spans, intervalle=5)
+superviseur.enregistrer('catalog_watch',
+                        surveiller_catalogues,
+                        intervalle=float(os.getenv('CATALOG_POLL_INTERVAL',
+                                                   '5')))
+
+
+class LucieBot(commands.AutoShardedBot if AUTO_SHARD else commands.Bot):
+
+    commandes_synchronisees = False
+
+    async def setup_hook(self):
+        # Appelé à chaque connexion : les services du processus sont démarrés
+        # une seule fois par executer()
+        if (os.getenv('SYNC_COMMANDS', 'false').lower() == 'true'
+                and not self.commandes_synchronisees):
+            # Synchronisation globale, soumise à un rate limit strict : à ne
+            # faire qu'après un changement des commandes
+            commandes = await self.tree.sync()
+            self.commandes_synchronisees = True
+            logger.info("%d commandes slash synchronisées", len(commandes))
+
+    async def on_message(self, message):
+        if not filtre_prefixe.accepte(message):
+            return
+        debut = time.perf_counter()
+        jeton = reception_message.set(debut) if traceur.actif else None
+        try:
+            await self.process_commands(message)
+        finally:
+            if jeton is not None:
+                reception_message.reset(jeton)
+        duree_dispatch.observer(time.perf_counter() - debut)
+
+    async def on_command_error(self, ctx, erreur):
+        # Une commande slash qui échoue ne passe pas par after_invoke
+        traceur.fin_commande(ctx, erreur)
+        await super().on_command_error(ctx, erreur)
+
+
+if AUTO_SHARD:
+    bot = LucieBot(command_prefix=PREFIXE,
+                   intents=intents,
+                   shard_count=SHARD_COUNT,
+                   shard_ids=SHARD_IDS,
+                   enable_debug_events=enregistreur is not None,
+                   http_trace=suivi_rate_limits(rate_limits),
+                   **OPTIONS_CACHE)
+else:
+    bot = LucieBot(command_prefix=PREFIXE,
+                   intents=intents,
+                   enable_debug_events=enregistreur is not None,
+                   http_trace=suivi_rate_limits(rate_limits),
+                   **OPTIONS_CACHE)
+if enregistreur is not None:
+    bot.add_listener(enregistreur.enregistrer, 'on_socket_raw_receive')
+
+# Modules de commandes rechargeables à chaud (commande reload). L'état dont
+# ils dépendent appartient au processus et leur est exposé via le bot : il
+# survit aux rechargements sans toucher à la connexion gateway
+EXTENSIONS = ('cogs.lucie', 'cogs.admin')
+bot.cooldowns = cooldowns
+bot.backend = backend
+bot.envois = envois
+bot.command_lock = command_lock
+bot.processed_messages = processed_messages
+
+
+async def exposer_cache(request):
+    return reponse_json(statistiques_cache(bot))
+
+
+serveur_web.ajouter_route('/cache', exposer_cache)
+
+# Profilage à la demande du processus en production (commande profile et
+# route /profile, activée seulement si PROFILE_TOKEN est défini)
+profileur = ProfileurEchantillonnage(
+    intervalle=float(os.getenv('PROFILE_INTERVAL', '0.01')),
+    bascule=float(os.getenv('PROFILE_SWITCH_INTERVAL', '0.001')))
+bot.profileur = profileur
+JETON_PROFIL = os.getenv('PROFILE_TOKEN')
+if JETON_PROFIL:
+    serveur_web.ajouter_route('/profile', route_profil(profileur, JETON_PROFIL))
+
+REGISTRE.jauge('discord_gateway_latency_seconds',
+               'Latence du heartbeat de la gateway',
+               fonction=lambda: bot.latency)
+REGISTRE.jauge('bot_cached_guilds', 'Serveurs en cache',
+               fonction=lambda: len(bot.guilds))
+REGISTRE.jauge('bot_cached_users', 'Utilisateurs en cache',
+               fonction=lambda: len(bot.users))
+REGISTRE.jauge('bot_cached_messages', 'Messages en cache',
+               fonction=lambda: len(bot.cached_messages))
+REGISTRE.jauge('process_resident_memory_bytes',
+               'Mémoire résidente du processus',
+               fonction=lambda: memoire_residente() or 0)
+REGISTRE.jauge('bot_cooldown_pools', 'Serveurs (ou salons) ayant un pool actif',
+               fonction=lambda: len(cooldowns))
+REGISTRE.jauge('bot_cooldown_entries', 'Éléments actuellement en cooldown',
+               fonction=cooldowns.nb_en_cooldown)
+REGISTRE.jauge('bot_user_states', "États d'utilisateurs en mémoire",
+               fonction=lambda: len(command_lock))
+REGISTRE.jauge('bot_dedup_entries', 'Identifiants de messages mémorisés',
+               fonction=lambda: len(processed_messages))
+REGISTRE.compteur('bot_dedup_hits_total', 'Messages en double ignorés',
+                  fonction=lambda: processed_messages.hits)
+REGISTRE.compteur('bot_outbound_messages_total',
+                  'Réponses mises en file par le planificateur',
+                  fonction=lambda: envois.nb_messages)
+REGISTRE.compteur('bot_outbound_sends_total',
+                  'Appels REST effectués après regroupement',
+                  fonction=lambda: envois.nb_envois)
+REGISTRE.compteur('bot_messages_seen_total',
+                  'Messages reçus par le filtre de préfixe',
+                  fonction=lambda: filtre_prefixe.nb_vus)
+REGISTRE.compteur('bot_messages_rejected_total',
+                  'Messages rejetés sans traitement des commandes',
+                  fonction=lambda: filtre_prefixe.nb_rejetes)
+REGISTRE.compteur('bot_messages_dispatched_total',
+                  'Messages transmis à process_commands',
+                  fonction=lambda: filtre_prefixe.nb_traites)
+REGISTRE.compteur('bot_trace_spans_total', 'Spans de traçage exportés',
+                  fonction=lambda: traceur.nb_spans)
+REGISTRE.compteur('bot_trace_spans_dropped_total',
+                  'Spans perdus car le tampon de traçage était plein',
+                  fonction=lambda: traceur.nb_perdus)
+REGISTRE.jauge('bot_outbound_queue', "Réponses en attente d'envoi",
+               fonction=lambda: len(envois))
+
+
+# Suivi des coupures de la gateway (par shard en mode shardé) et du temps de
+# rétablissement, par reprise de session ou nouvelle identification
+retablissements = REGISTRE.histogramme(
+    'discord_gateway_recovery_seconds',
+    'Durée entre une coupure de la gateway et son rétablissement',
+    labels=('mode', ),
+    bornes=(0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+reconnexions = SuiviReconnexions(on_retablissement=lambda duree, mode:
+                                 retablissements.labels(mode).observer(duree))
+redemarrages_client = REGISTRE.compteur(
+    'discord_client_restarts_total',
+    'Relances du client après un échec de connexion')
+REGISTRE.compteur('discord_gateway_outages_total',
+                  'Coupures de la connexion à la gateway',
+                  fonction=lambda: reconnexions.nb_coupures)
+
+
+async def sur_deconnexion(shard_id=None):
+    reconnexions.deconnecte(shard_id)
+
+
+async def sur_reprise(shard_id=None):
+    reconnexions.retabli(shard_id, reprise=True)
+
+
+async def sur_identification(shard_id=None):
+    reconnexions.retabli(shard_id, reprise=False)
+
+
+evenement = 'on_shard_' if AUTO_SHARD else 'on_'
+bot.add_listener(sur_deconnexion, f'{evenement}disconnect')
+bot.add_listener(sur_reprise, f'{evenement}resumed')
+bot.add_listener(sur_identification, f'{evenement}ready')
+
+
+@bot.before_invoke
+async def debut_commande(ctx):
+    ctx.debut_commande = time.perf_counter()
+    traceur.debut_commande(ctx)
+
+
+@bot.after_invoke
+async def fin_commande(ctx):
+    traceur.fin_commande(ctx)
+    debut = getattr(ctx, 'debut_commande', None)
+    if debut is not None:
+        latence_commandes.labels(ctx.command.qualified_name).observer(
+            time.perf_counter() - debut)
 
 
 @bot.event
 async def on_ready():
     try:
-        logger.info(f'Bot connecté en tant que {bot.user}')
-        # Démarre le heartbeat
-        bot.loop.create_task(update_heartbeat())
+        logger.info('Bot connecté en tant que %s', bot.user)
     except Exception as e:
-        logger.exception(f"Erreur lors de l'initialisation du bot: {e}")
+        logger.exception("Erreur lors de l'initialisation du bot: %s", e)
 
 
 @bot.event
 async def on_error(event, *args, **kwargs):
-    logger.error(f"Erreur dans l'événement {event}: {traceback.format_exc()}")
+    logger.exception("Erreur dans l'événement %s", event)
 
 
-@bot.command()
-async def lucie(ctx):
-    try:
-        # Déduplication des messages
-        message_id = f"{ctx.message.id}"
-        if message_id in processed_messages:
-            logger.warning(f"Message {message_id} déjà traité, ignoré")
-            return
-        processed_messages.add(message_id)
+async def executer(token):
+    """Démarre les services du processus puis maintient le bot connecté.
 
-        # Nettoyage périodique des messages traités
-        if len(processed_messages) > 1000:
-            processed_messages.clear()
+    Les tâches de fond, le serveur HTTP et les files d'envoi survivent aux
+    relances du client ; ils sont arrêtés à la fin (SIGINT/SIGTERM ou appel à
+    bot.close()).
+    """
+    loop = asyncio.get_running_loop()
+    arret = asyncio.Event()
 
-        # Vérifications de base
-        if not ctx.guild:
-            logger.debug(
-                f"Commande ignorée car envoyée en DM par {ctx.author.name}")
-            return
-
-        user_id = str(ctx.author.id)
-        logger.info(
-            f"Nouvelle commande lucie de {ctx.author.name} (ID: {user_id}, Message ID: {message_id})"
-        )
-
-        if user_id in command_lock and command_lock[user_id]:
-            logger.warning(f"Commande déjà en cours pour {ctx.author.name}")
-            await ctx.send(
-                "Une commande est déjà en cours pour vous. Veuillez attendre.")
-            return
-
-        command_lock[user_id] = True
-        logger.debug(f"Verrou activé pour {ctx.author.name}")
+    def demander_arret():
+        arret.set()
+        loop.create_task(bot.close())
 
+    for signal_arret in (signal.SIGINT, signal.SIGTERM):
         try:
-            atout = tirage_unique(atouts, recent_tirages)
-            defaut = tirage_unique(defauts, recent_tirages)
-            await ctx.send(
-                f"🎲 **Résultat du tirage :**\n🎭 **Atout :** {atout}\n⚠️ **Défaut :** {defaut}"
-            )
-            logger.info(
-                f"Tirage réussi pour {ctx.author.name} (Message ID: {message_id})"
-            )
-        except ValueError as ve:
-            await ctx.send(str(ve))
-            return
-        except Exception as e:
-            logger.exception(f"Erreur inattendue lors du tirage: {e}")
-            await ctx.send(
-                "Une erreur s'est produite lors du tirage. Veuillez réessayer."
-            )
-            return
+            loop.add_signal_handler(signal_arret, demander_arret)
+        except NotImplementedError:  # Windows
+            pass
 
-    except Exception as e:
+    for extension in EXTENSIONS:
+        await bot.load_extension(extension)
+    superviseur.demarrer()
+    try:
+        await serveur_web.demarrer()
+    except OSError as e:
         logger.exception(
-            f"Erreur lors de l'exécution de la commande lucie: {e}")
-        await ctx.send(
-            "Une erreur s'est produite lors du tirage. Veuillez réessayer.")
+            "Erreur critique lors du démarrage du serveur keep-alive: %s", e)
+    try:
+        await executer_avec_reprise(
+            bot, token, arret, on_echec=lambda e: redemarrages_client.inc())
     finally:
-        command_lock[user_id] = False
-        logger.debug(f"Verrou désactivé pour {ctx.author.name}")
+        await superviseur.arreter()
+        await serveur_web.arreter()
+        await envois.arreter()
+        await backend.fermer()
+        if enregistreur is not None:
+            enregistreur.fermer()
+        traceur.fermer()
 
 
 if __name__ == '__main__':
     if obtain_lock():
         try:
-            keep_alive()
+            log_environnement_replit()
             token = os.getenv('DISCORD_TOKEN')
             if not token:
                 logger.error(
@@ -431,19 +570,30 @@ if __name__ == '__main__':
                 )
                 sys.exit(1)
 
-            while True:
-                try:
-                    bot.run(token)
-                except Exception as e:
-                    logger.exception(
-                        f"Erreur critique lors de l'exécution du bot: {e}")
-                    logger.info("Tentative de reconnexion dans 30 secondes...")
-                    time.sleep(30)
+            # Serveur Discord de substitution pour les tests de charge hors
+            # ligne (voir utils/mock_discord.py)
+            api_url = os.getenv('DISCORD_API_URL')
+            gateway_url = os.getenv('DISCORD_GATEWAY_URL')
+            if api_url or gateway_url:
+                configurer_endpoints(api_url, gateway_url)
+                logger.warning("Connexion à %s / %s au lieu de Discord",
+                               api_url, gateway_url)
+
+            # Reprise à chaud des cooldowns encore actifs avant la connexion
+            chemin_store = os.getenv('COOLDOWN_DB', 'cooldowns.db')
+            if chemin_store and isinstance(backend, BackendMemoire):
+                store = CooldownStore(chemin_store)
+                cooldowns.attacher_store(store)
+
+            # Les logs de discord.py passent par notre configuration
+            asyncio.run(executer(token))
         except Exception as e:
             logger.exception(f"Erreur critique lors du démarrage du bot: {e}")
         finally:
+            if store is not None:
+                store.fermer()
             try:
-                os.remove('.bot.lock')
+                os.remove(FICHIER_VERROU)
                 logger.info("Fichier de verrouillage supprimé")
             except OSError:
                 pass
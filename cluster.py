@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+
+from core.logs import configurer_logs
+
+logger = logging.getLogger(__name__)
+
+URL_GATEWAY_BOT = 'https://discord.com/api/v10/gateway/bot'
+
+
+def repartir_shards(nb_shards, nb_clusters):
+    """Découpe les shards 0..nb_shards-1 en plages contiguës par cluster."""
+    nb_clusters = max(1, min(nb_clusters, nb_shards))
+    taille, reste = divmod(nb_shards, nb_clusters)
+    plages = []
+    debut = 0
+    for cluster in range(nb_clusters):
+        fin = debut + taille + (1 if cluster < reste else 0)
+        plages.append(list(range(debut, fin)))
+        debut = fin
+    return plages
+
+
+async def nombre_shards_recommande(token):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(URL_GATEWAY_BOT,
+                               headers={'Authorization':
+                                        f'Bot {token}'}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+
+def _ajouter_label(ligne, nom, valeur):
+    label = f'{nom}="{valeur}"'
+    accolade = ligne.find('{')
+    espace = ligne.find(' ')
+    if accolade != -1 and accolade < espace:
+        separateur = '' if ligne[accolade + 1] == '}' else ','
+        return f'{ligne[:accolade + 1]}{label}{separateur}{ligne[accolade + 1:]}'
+    return f'{ligne[:espace]}{{{label}}}{ligne[espace:]}'
+
+
+def fusionner_metriques(textes):
+    """Fusionne les expositions Prometheus des workers avec un label cluster."""
+    familles = {}
+    for cluster, texte in textes.items():
+        famille = None
+        for ligne in texte.splitlines():
+            if not ligne:
+                continue
+            if ligne.startswith('# '):
+                nom = ligne.split(' ', 3)[2]
+                famille = familles.setdefault(nom, ([], []))
+                if ligne not in famille[0]:
+                    famille[0].append(ligne)
+                continue
+            if famille is None:
+                famille = familles.setdefault(ligne.split(' ', 1)[0], ([], []))
+            famille[1].append(_ajouter_label(ligne, 'cluster', cluster))
+    lignes = []
+    for entete, echantillons in familles.values():
+        lignes.extend(entete)
+        lignes.extend(echantillons)
+    return '\n'.join(lignes) + '\n'
+
+
+# Fichiers écrits par chaque processus bot.py : un par cluster
+FICHIERS_WORKER = {
+    'LOG_FILE': 'bot.log',
+    'COOLDOWN_DB': 'cooldowns.db',
+    'TRACE_FILE': '',
+    'GATEWAY_TRACE': '',
+}
+
+
+def fichier_cluster(chemin, cluster_id):
+    """`bot.log` -> `bot.<cluster_id>.log` ; un chemin vide reste vide."""
+    if not chemin:
+        return chemin
+    dossier, nom = os.path.split(chemin)
+    base, point, extension = nom.partition('.')
+    return os.path.join(dossier, f'{base}.{cluster_id}{point}{extension}')
+
+
+def env_worker(cluster_id, shards, nb_shards, port, environ=None):
+    env = dict(os.environ if environ is None else environ,
+               CLUSTER_ID=str(cluster_id),
+               SHARD_IDS=','.join(str(shard) for shard in shards),
+               SHARD_COUNT=str(nb_shards),
+               PORT=str(port))
+    for nom, defaut in FICHIERS_WORKER.items():
+        env[nom] = fichier_cluster(env.get(nom, defaut), cluster_id)
+    return env
+
+
+class Worker:
+    __slots__ = ('cluster_id', 'shards', 'port', 'process', 'redemarrages')
+
+    def __init__(self, cluster_id, shards, port):
+        self.cluster_id = cluster_id
+        self.shards = shards
+        self.port = port
+        self.process = None
+        self.redemarrages = 0
+
+
+class Lanceur:
+    """Lance un processus bot.py par cluster et agrège leur santé/métriques.
+
+    Chaque worker reçoit sa plage de shards (SHARD_IDS), le nombre total de
+    shards (SHARD_COUNT), son identifiant (CLUSTER_ID, qui lui donne son propre
+    fichier de verrouillage), ses propres fichiers de logs, de cooldowns et de
+    traces (`bot.<cluster>.log`...) et un port HTTP dédié. Le lanceur sert `/`,
+    `/health` et `/metrics` agrégés sur le port principal.
+    """
+
+    def __init__(self, nb_shards, nb_clusters, host='0.0.0.0', port=8080,
+                 script='bot.py'):
+        self.host = host
+        self.port = port
+        self.script = script
+        self.workers = [
+            Worker(cluster, shards, port + 1 + cluster)
+            for cluster, shards in enumerate(
+                repartir_shards(nb_shards, nb_clusters))
+        ]
+        self.nb_shards = nb_shards
+        self._arret = asyncio.Event()
+        self._session = None
+
+    async def _executer_worker(self, worker):
+        echecs = 0
+        env = env_worker(worker.cluster_id, worker.shards, self.nb_shards,
+                         worker.port)
+        while not self._arret.is_set():
+            logger.info("Démarrage du cluster %d (shards %s, port %d)",
+                        worker.cluster_id, worker.shards, worker.port)
+            debut = time.monotonic()
+            worker.process = await asyncio.create_subprocess_exec(
+                sys.executable, self.script, env=env)
+            code = await worker.process.wait()
+            if self._arret.is_set():
+                break
+            worker.redemarrages += 1
+            if time.monotonic() - debut > 60:
+                # Un worker resté stable repart d'un délai court
+                echecs = 0
+            delai = random.uniform(0, min(60, 2**echecs))
+            echecs += 1
+            logger.error(
+                "Le cluster %d s'est arrêté (code %s), redémarrage dans %.1f s",
+                worker.cluster_id, code, delai)
+            try:
+                await asyncio.wait_for(self._arret.wait(), delai)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _interroger(self, worker, chemin):
+        try:
+            async with self._session.get(
+                    f'http://127.0.0.1:{worker.port}{chemin}',
+                    timeout=aiohttp.ClientTimeout(total=2)) as response:
+                if chemin == '/metrics':
+                    return await response.text()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+
+    async def _health(self, request):
+        etats = await asyncio.gather(
+            *(self._interroger(worker, '/health') for worker in self.workers))
+        clusters = {}
+        sain = True
+        for worker, etat in zip(self.workers, etats):
+            if etat is None:
+                etat = {'status': 'unreachable'}
+            sain = sain and etat.get('status') == 'healthy'
+            etat['restarts'] = worker.redemarrages
+            clusters[str(worker.cluster_id)] = etat
+        donnees = {
+            'status': 'healthy' if sain else 'unhealthy',
+            'shard_count': self.nb_shards,
+            'clusters': clusters,
+        }
+        return web.Response(text=json.dumps(donnees),
+                            status=200 if sain else 503,
+                            content_type='application/json')
+
+    async def _metrics(self, request):
+        textes = await asyncio.gather(
+            *(self._interroger(worker, '/metrics') for worker in self.workers))
+        fusion = fusionner_metriques({
+            str(worker.cluster_id): texte
+            for worker, texte in zip(self.workers, textes) if texte
+        })
+        lignes = [
+            '# HELP cluster_worker_restarts_total Redémarrages des workers',
+            '# TYPE cluster_worker_restarts_total counter',
+        ] + [
+            f'cluster_worker_restarts_total{{cluster="{worker.cluster_id}"}} '
+            f'{worker.redemarrages}' for worker in self.workers
+        ]
+        fusion += '\n'.join(lignes) + '\n'
+        return web.Response(text=fusion, content_type='text/plain',
+                            charset='utf-8')
+
+    async def _accueil(self, request):
+        donnees = {
+            'status': 'alive',
+            'clusters': len(self.workers),
+            'shard_count': self.nb_shards,
+        }
+        return web.Response(text=json.dumps(donnees),
+                            content_type='application/json')
+
+    def arreter(self):
+        self._arret.set()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.returncode is None:
+                worker.process.terminate()
+
+    async def executer(self):
+        loop = asyncio.get_running_loop()
+        for signal_arret in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_arret, self.arreter)
+
+        app = web.Application()
+        app.router.add_get('/', self._accueil)
+        app.router.add_get('/health', self._health)
+        app.router.add_get('/metrics', self._metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+
+        self._session = aiohttp.ClientSession()
+        try:
+            await asyncio.gather(
+                *(self._executer_worker(worker) for worker in self.workers))
+        finally:
+            await self._session.close()
+            await runner.cleanup()
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description='Lance le bot en plusieurs processus shardés')
+    parser.add_argument('--clusters', type=int, default=os.cpu_count() or 1,
+                        help='Nombre de processus workers')
+    parser.add_argument('--shards', type=int,
+                        default=int(os.getenv('SHARD_COUNT', '0')),
+                        help='Nombre total de shards (recommandé par Discord par défaut)')
+    parser.add_argument('--port', type=int,
+                        default=int(os.getenv('PORT', '8080')),
+                        help="Port du serveur d'agrégation")
+    arguments = parser.parse_args()
+
+    nb_shards = arguments.shards
+    if not nb_shards:
+        token = os.getenv('DISCORD_TOKEN')
+        if not token:
+            logger.error(
+                "Token Discord non trouvé dans les variables d'environnement")
+            return 1
+        nb_shards = await nombre_shards_recommande(token)
+        logger.info("Nombre de shards recommandé par Discord: %d", nb_shards)
+
+    lanceur = Lanceur(nb_shards, arguments.clusters,
+                      host=os.getenv('HOST', '0.0.0.0'), port=arguments.port)
+    await lanceur.executer()
+    return 0
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    configurer_logs(fichier=os.getenv('CLUSTER_LOG_FILE', 'cluster.log'))
+    sys.exit(asyncio.run(main()))
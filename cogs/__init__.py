@@ -0,0 +1 @@
+# Modules de commandes chargés comme extensions discord.py
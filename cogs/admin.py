@@ -0,0 +1,91 @@
+import io
+import logging
+import time
+
+import discord
+from discord.ext import commands
+
+from core.cache import statistiques_cache
+from core.profiler import DUREE_MAX, ProfilageEnCours
+
+logger = logging.getLogger(__name__)
+
+
+class Admin(commands.Cog):
+    """Commandes réservées au propriétaire du bot."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_check(self, ctx):
+        return await self.bot.is_owner(ctx.author)
+
+    @commands.hybrid_command(name='cache',
+                             description="Tailles des caches et mémoire du processus")
+    async def cache_stats(self, ctx):
+        stats = statistiques_cache(self.bot)
+        rss = stats['rss_bytes']
+        lignes = [f"{nom}: {valeur}" for nom, valeur in stats.items()
+                  if nom != 'rss_bytes']
+        lignes.append(f"rss: {rss / 2**20:.1f} Mo" if rss else "rss: inconnue")
+        await ctx.send("```\n" + "\n".join(lignes) + "\n```", ephemeral=True)
+
+    @commands.hybrid_command(name='reload',
+                             description="Recharge les modules de commandes")
+    async def recharger(self, ctx, module: str = None):
+        """Recharge un module (`lucie`, `cogs.lucie`...) ou tous les modules.
+
+        discord.py restaure l'ancienne version d'un module dont le
+        rechargement échoue.
+        """
+        if module is None:
+            noms = list(self.bot.extensions)
+        else:
+            noms = [module if '.' in module else f'cogs.{module}']
+        debut = time.perf_counter()
+        for nom in noms:
+            try:
+                await self.bot.reload_extension(nom)
+            except commands.ExtensionError as e:
+                logger.exception("Échec du rechargement de %s", nom)
+                await ctx.send(f"Échec du rechargement de {nom}: {e}",
+                               ephemeral=True)
+                return
+        duree = (time.perf_counter() - debut) * 1000
+        logger.info("Modules rechargés en %.1f ms: %s", duree, ', '.join(noms))
+        await ctx.send(f"{len(noms)} module(s) rechargé(s) en {duree:.1f} ms",
+                       ephemeral=True)
+
+    @commands.hybrid_command(name='profile',
+                             description="Profile le processus en production")
+    async def profiler(self, ctx, secondes: float = 10.0):
+        """Échantillonne les piles de tous les threads pendant `secondes`.
+
+        Répond les fonctions les plus échantillonnées et joint les piles au
+        format collapsed (flamegraph.pl, speedscope).
+        """
+        if not 0 < secondes <= DUREE_MAX:
+            await ctx.send(f"Durée entre 0 et {DUREE_MAX} s.", ephemeral=True)
+            return
+        await ctx.defer(ephemeral=True)
+        try:
+            profil = await self.bot.profileur.profiler(secondes)
+        except ProfilageEnCours as e:
+            await ctx.send(str(e), ephemeral=True)
+            return
+        logger.info("Profilage de %.1f s: %d relevés, échantillonnage "
+                    "%.2f%% d'un cœur, retard p99 de la boucle %.2f ms",
+                    profil.duree, profil.nb_echantillons,
+                    profil.cpu_echantillonnage * 100,
+                    profil.retard_boucle_p99 * 1000)
+        resume = profil.resume(15)
+        if len(resume) > 1900:
+            resume = resume[:1900].rsplit('\n', 1)[0]
+        fichier = discord.File(io.BytesIO(profil.collapsed().encode()),
+                               filename=f"profile_{int(time.time())}.folded")
+        await ctx.send("```\n" + resume + "\n```", file=fichier,
+                       ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
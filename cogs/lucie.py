@@ -0,0 +1,198 @@
+import logging
+import re
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from core.cooldown import CooldownEpuise
+from core.metrics import REGISTRE
+from core.outbound import PRIORITE_ERREUR, PRIORITE_RESULTAT
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Le registre retourne les métriques existantes : les compteurs survivent aux
+# rechargements du module
+refus_cooldown = REGISTRE.compteur(
+    'bot_cooldown_rejections_total',
+    'Tirages refusés car tous les éléments sont en cooldown')
+refus_verrou = REGISTRE.compteur(
+    'bot_command_lock_rejections_total',
+    'Commandes refusées car une commande est déjà en cours')
+
+# Limite du tirage groupé (une ligne de champ d'embed par joueur)
+MAX_JOUEURS = 10
+MENTION = re.compile(r'<@!?(\d+)>')
+USAGE = "Usage : !lucie [nombre de joueurs | @joueur1 @joueur2 ...]"
+ERREUR_NOMBRE = f"Un tirage groupé compte de 1 à {MAX_JOUEURS} joueurs."
+
+
+def lire_joueurs(texte):
+    """Joueurs d'un tirage groupé : `N` ou des mentions.
+
+    Retourne une liste avec la mention de chaque joueur (None pour un joueur
+    désigné par un simple nombre) ; `[None]` sans argument.
+    """
+    texte = (texte or '').strip()
+    if not texte:
+        return [None]
+    # isdigit() seul accepte les chiffres Unicode ('²'), que int() refuse
+    if texte.isascii() and texte.isdigit():
+        # Nombre vérifié avant de construire la liste : `!lucie 50000000` ne
+        # doit rien allouer, et int() n'est pas appelé sur un texte trop long
+        chiffres = texte.lstrip('0')
+        nombre = int(chiffres) if len(chiffres) <= len(str(MAX_JOUEURS)) else 0
+        if not 1 <= nombre <= MAX_JOUEURS:
+            raise ValueError(ERREUR_NOMBRE)
+        return [None] * nombre
+    ids = MENTION.findall(texte)
+    if not ids or MENTION.sub('', texte).strip():
+        raise ValueError(USAGE)
+    joueurs = [f'<@{user_id}>' for user_id in dict.fromkeys(ids)]
+    if len(joueurs) > MAX_JOUEURS:
+        raise ValueError(ERREUR_NOMBRE)
+    return joueurs
+
+
+def embed_tirage(joueurs, tirage):
+    embed = discord.Embed(
+        title=f"🎲 Résultat du tirage pour {len(joueurs)} joueurs")
+    for numero, (joueur, atout, defaut) in enumerate(
+            zip(joueurs, tirage['atouts'], tirage['defauts']), 1):
+        valeur = f"🎭 **Atout :** {atout}\n⚠️ **Défaut :** {defaut}"
+        if joueur is not None:
+            valeur = f"{joueur}\n{valeur}"
+        embed.add_field(name=f"Joueur {numero}", value=valeur, inline=False)
+    return embed
+
+
+class Lucie(commands.Cog):
+    """Commande de tirage d'un atout et d'un défaut, seul ou pour un groupe.
+
+    L'état (cooldowns, déduplication, verrous, files d'envoi) appartient au
+    processus et est lu sur le bot : un rechargement du module ne remplace
+    que le code. Les catalogues sont lus depuis data/catalogues et rechargés
+    par le processus quand les fichiers changent.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def repondre(self, ctx, contenu, priorite=PRIORITE_RESULTAT,
+                       embed=None):
+        with span('envoi', priorite=priorite):
+            if ctx.interaction is not None:
+                # Une interaction a sa propre réponse (suivi de la réponse
+                # différée) : elle ne passe pas par la file du salon
+                return await ctx.send(contenu, embed=embed)
+            return await self.bot.envois.envoyer(
+                ctx,
+                contenu,
+                priorite,
+                auteur=ctx.author.display_name,
+                embed=embed)
+
+    @commands.hybrid_command(description="Tire un atout et un défaut au hasard")
+    @app_commands.describe(joueurs="Nombre de joueurs ou @mentions des joueurs")
+    @app_commands.guild_only()
+    async def lucie(self, ctx, *, joueurs: str = None):
+        """Un tirage, ou un tirage groupé : `!lucie 4`, `!lucie @a @b`.
+
+        Les paires d'un tirage groupé sont distinctes et réservées en un seul
+        appel au backend, puis envoyées dans un unique embed.
+        """
+        verrou_pris = False
+        try:
+            # Réponse différée : le tirage peut dépasser le délai de 3 s d'une
+            # interaction (sans effet pour une commande préfixée)
+            await ctx.defer()
+
+            # Déduplication des messages (identifiant de l'interaction en slash)
+            message_id = ctx.message.id
+            with span('dedup'):
+                deja_vu = self.bot.processed_messages.vu(message_id)
+            if deja_vu:
+                logger.warning("Message %s déjà traité, ignoré", message_id)
+                return
+
+            # Vérifications de base
+            if not ctx.guild:
+                logger.debug("Commande ignorée car envoyée en DM par %s",
+                             ctx.author.name)
+                return
+
+            user_id = ctx.author.id
+            logger.info(
+                "Nouvelle commande lucie de %s (ID: %s, Message ID: %s)",
+                ctx.author.name, user_id, message_id)
+
+            try:
+                joueurs = lire_joueurs(joueurs)
+            except ValueError as ve:
+                await self.repondre(ctx, str(ve), PRIORITE_ERREUR)
+                return
+
+            with span('verrou'):
+                verrou_pris = self.bot.command_lock.acquerir(user_id)
+            if not verrou_pris:
+                refus_verrou.inc()
+                logger.warning("Commande déjà en cours pour %s", ctx.author.name)
+                await self.repondre(
+                    ctx,
+                    "Une commande est déjà en cours pour vous. Veuillez attendre.",
+                    PRIORITE_ERREUR)
+                return
+
+            logger.debug("Verrou activé pour %s", ctx.author.name)
+
+            try:
+                with span('tirage', joueurs=len(joueurs)):
+                    tirage = await self.bot.backend.tirer_lot(
+                        ctx.guild.id, ctx.channel.id, ('atouts', 'defauts'),
+                        len(joueurs), message_id)
+                if tirage is None:
+                    logger.warning(
+                        "Message %s déjà traité par une autre instance, ignoré",
+                        message_id)
+                    return
+                with span('formatage'):
+                    if joueurs == [None]:
+                        atout = tirage['atouts'][0]
+                        defaut = tirage['defauts'][0]
+                        contenu = f"🎲 **Résultat du tirage :**\n🎭 **Atout :** {atout}\n⚠️ **Défaut :** {defaut}"
+                        embed = None
+                    else:
+                        contenu = None
+                        embed = embed_tirage(joueurs, tirage)
+                await self.repondre(ctx, contenu, embed=embed)
+                logger.info("Tirage réussi pour %s (Message ID: %s)",
+                            ctx.author.name, message_id)
+            except ValueError as ve:
+                if isinstance(ve, CooldownEpuise):
+                    refus_cooldown.inc()
+                await self.repondre(ctx, str(ve), PRIORITE_ERREUR)
+                return
+            except Exception as e:
+                logger.exception("Erreur inattendue lors du tirage: %s", e)
+                await self.repondre(
+                    ctx,
+                    "Une erreur s'est produite lors du tirage. Veuillez réessayer.",
+                    PRIORITE_ERREUR)
+                return
+
+        except Exception as e:
+            logger.exception(
+                "Erreur lors de l'exécution de la commande lucie: %s", e)
+            await self.repondre(
+                ctx,
+                "Une erreur s'est produite lors du tirage. Veuillez réessayer.",
+                PRIORITE_ERREUR)
+        finally:
+            if verrou_pris:
+                self.bot.command_lock.liberer(ctx.author.id)
+                logger.debug("Verrou désactivé pour %s", ctx.author.name)
+
+
+async def setup(bot):
+    await bot.add_cog(Lucie(bot))
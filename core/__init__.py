@@ -0,0 +1 @@
+# Briques internes du bot (cooldowns, état partagé, supervision)
@@ -0,0 +1,401 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+
+from core.catalogues import JeuCatalogues, en_jeu
+from core.cooldown import CooldownEpuise
+
+logger = logging.getLogger(__name__)
+
+
+def verifier_taille(nom, taille, nombre):
+    if nombre > taille:
+        raise ValueError(
+            f"Impossible de tirer {nombre} éléments distincts dans {nom} "
+            f"({taille} éléments).")
+
+
+class BackendCooldown:
+    """Interface des backends d'état de tirage (cooldowns et déduplication).
+
+    `tirer` réserve atomiquement un élément de chacun des `tableaux` pour le
+    serveur (ou le salon) donné et retourne un dictionnaire nom -> élément. Si
+    l'un des tableaux est épuisé, rien n'est réservé et CooldownEpuise est
+    levée. Si `message_id` a déjà été traité par un autre processus, retourne
+    None.
+
+    `tirer_lot` fait de même pour `nombre` joueurs : il réserve `nombre`
+    éléments distincts de chaque tableau et retourne nom -> liste d'éléments.
+    """
+
+    async def tirer(self, guild_id, channel_id, tableaux, message_id=None):
+        lot = await self.tirer_lot(guild_id, channel_id, tableaux, 1,
+                                   message_id)
+        if lot is None:
+            return None
+        return {nom: items[0] for nom, items in lot.items()}
+
+    async def tirer_lot(self, guild_id, channel_id, tableaux, nombre,
+                        message_id=None):
+        raise NotImplementedError
+
+    def remplacer_catalogues(self, catalogues):
+        """Change les catalogues tirés (rechargement des commandes)."""
+        raise NotImplementedError
+
+    async def fermer(self):
+        pass
+
+
+class BackendMemoire(BackendCooldown):
+    """Backend en mémoire du processus, adossé à un CooldownRegistry."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    async def tirer_lot(self, guild_id, channel_id, tableaux, nombre,
+                        message_id=None):
+        pools = self.registry.pools(guild_id, channel_id)
+        # Vérifie d'abord tous les tableaux pour ne rien réserver en cas d'échec
+        for nom in tableaux:
+            verifier_taille(nom, pools[nom].taille_catalogue, nombre)
+            attente = pools[nom].temps_restant(nombre=nombre)
+            if attente or len(pools[nom]) < nombre:
+                raise CooldownEpuise(attente)
+        return {nom: pools[nom].tirer_plusieurs(nombre) for nom in tableaux}
+
+    def remplacer_catalogues(self, catalogues):
+        return self.registry.remplacer_catalogues(catalogues)
+
+
+class ErreurRedis(Exception):
+    pass
+
+
+class ClientRedis:
+    """Client minimal du protocole Redis (RESP2) sur une seule connexion.
+
+    Les commandes sont écrites dès leur appel et les réponses lues dans
+    l'ordre par une tâche dédiée : les requêtes concurrentes partagent la
+    connexion sans attendre la réponse des précédentes (pipelining).
+    """
+
+    def __init__(self, url='redis://127.0.0.1:6379/0'):
+        url = urlparse(url)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 6379
+        self.mot_de_passe = url.password
+        self.base = int(url.path.lstrip('/') or 0)
+        self._lecteur = None
+        self._ecrivain = None
+        self._tache_lecture = None
+        self._en_attente = deque()
+        self._verrou_connexion = asyncio.Lock()
+
+    @staticmethod
+    def encoder(*args):
+        morceaux = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            morceaux.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(morceaux)
+
+    async def _lire_reponse(self):
+        ligne = await self._lecteur.readline()
+        if not ligne:
+            raise ConnectionError("Connexion Redis fermée")
+        prefixe, contenu = ligne[:1], ligne[1:-2]
+        if prefixe == b'+':
+            return contenu.decode()
+        if prefixe == b'-':
+            return ErreurRedis(contenu.decode())
+        if prefixe == b':':
+            return int(contenu)
+        if prefixe == b'$':
+            taille = int(contenu)
+            if taille == -1:
+                return None
+            donnees = await self._lecteur.readexactly(taille + 2)
+            return donnees[:-2].decode()
+        if prefixe == b'*':
+            taille = int(contenu)
+            if taille == -1:
+                return None
+            return [await self._lire_reponse() for _ in range(taille)]
+        raise ErreurRedis(f"Réponse Redis invalide: {ligne!r}")
+
+    async def _boucle_lecture(self):
+        try:
+            while True:
+                reponse = await self._lire_reponse()
+                futur = self._en_attente.popleft()
+                if not futur.done():
+                    futur.set_result(reponse)
+        except Exception as e:
+            erreur = e if isinstance(e, ConnectionError) else ConnectionError(
+                str(e))
+            self._deconnecter(erreur)
+
+    def _deconnecter(self, erreur):
+        """Ferme la connexion et fait échouer les réponses encore attendues."""
+        tache, self._tache_lecture = self._tache_lecture, None
+        if tache is not None and tache is not asyncio.current_task():
+            tache.cancel()
+        if self._ecrivain is not None:
+            self._ecrivain.close()
+            self._ecrivain = None
+        while self._en_attente:
+            futur = self._en_attente.popleft()
+            if not futur.done():
+                futur.set_exception(erreur)
+
+    async def connecter(self):
+        async with self._verrou_connexion:
+            if self._ecrivain is not None:
+                return
+            self._lecteur, self._ecrivain = await asyncio.open_connection(
+                self.host, self.port)
+            self._tache_lecture = asyncio.get_running_loop().create_task(
+                self._boucle_lecture())
+            initialisation = []
+            if self.mot_de_passe:
+                initialisation.append(('AUTH', self.mot_de_passe))
+            if self.base:
+                initialisation.append(('SELECT', self.base))
+            for reponse in await self.pipeline(initialisation):
+                if isinstance(reponse, ErreurRedis):
+                    # Pas de commandes sur une connexion non authentifiée
+                    self._deconnecter(ConnectionError(str(reponse)))
+                    raise reponse
+
+    async def pipeline(self, commandes):
+        """Envoie plusieurs commandes en une écriture ; retourne les réponses.
+
+        Les réponses d'erreur sont retournées (et non levées) sous forme
+        d'ErreurRedis.
+        """
+        if not commandes:
+            return []
+        if self._ecrivain is None:
+            await self.connecter()
+        loop = asyncio.get_running_loop()
+        futurs = []
+        for _ in commandes:
+            futur = loop.create_future()
+            self._en_attente.append(futur)
+            futurs.append(futur)
+        self._ecrivain.write(b''.join(self.encoder(*c) for c in commandes))
+        return list(await asyncio.gather(*futurs))
+
+    async def executer(self, *args):
+        reponse, = await self.pipeline([args])
+        if isinstance(reponse, ErreurRedis):
+            raise reponse
+        return reponse
+
+    async def fermer(self):
+        self._deconnecter(ConnectionError("Connexion Redis fermée"))
+
+
+# Réservation atomique d'éléments distincts par tableau, avec déduplication.
+# KEYS[1] : clé de déduplication, KEYS[2..] : ensemble trié des cooldowns de
+# chaque tableau (élément = indice dans le catalogue, score = expiration ms).
+# ARGV : maintenant (ms), durée (ms), fenêtre de déduplication (ms, 0 = aucune)
+# puis, pour chaque tableau : taille du catalogue, nombre d'éléments à tirer,
+# nombre de candidats tirés au hasard par le client, candidats, et un entier
+# aléatoire par élément à tirer (choix parmi les indices libres si tous les
+# candidats sont déjà réservés).
+# Retour : {1, choix...} (les choix de chaque tableau à la suite), {0} si
+# message déjà traité, ou {-1, tableau, expiration libérant assez d'éléments}
+# si un tableau est épuisé (rien n'est alors réservé).
+SCRIPT_TIRAGE = """
+local maintenant = tonumber(ARGV[1])
+local duree = tonumber(ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+  if not redis.call('SET', KEYS[1], '1', 'NX', 'PX', ARGV[3]) then
+    return {0}
+  end
+end
+local tableaux = {}
+local pos = 4
+for i = 2, #KEYS do
+  local n = tonumber(ARGV[pos])
+  local nombre = tonumber(ARGV[pos + 1])
+  local k = tonumber(ARGV[pos + 2])
+  local candidats = {}
+  for j = 1, k do
+    candidats[j] = ARGV[pos + 2 + j]
+  end
+  local aleas = {}
+  for j = 1, nombre do
+    aleas[j] = tonumber(ARGV[pos + 2 + k + j])
+  end
+  pos = pos + 3 + k + nombre
+  redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', maintenant)
+  local manquants = redis.call('ZCARD', KEYS[i]) + nombre - n
+  if manquants > 0 then
+    local libere = redis.call('ZRANGE', KEYS[i], manquants - 1, manquants - 1,
+                              'WITHSCORES')
+    return {-1, i - 2, tonumber(libere[2] or maintenant)}
+  end
+  tableaux[i] = {n, nombre, candidats, aleas}
+end
+local resultat = {1}
+for i = 2, #KEYS do
+  local expire_a = maintenant + duree
+  local restants = tableaux[i][2]
+  -- Un candidat déjà réservé (y compris dans ce lot) est ignoré
+  for _, candidat in ipairs(tableaux[i][3]) do
+    if restants == 0 then
+      break
+    end
+    if not redis.call('ZSCORE', KEYS[i], candidat) then
+      redis.call('ZADD', KEYS[i], expire_a, candidat)
+      resultat[#resultat + 1] = tonumber(candidat)
+      restants = restants - 1
+    end
+  end
+  if restants > 0 then
+    -- Tous les candidats sont pris : tirage uniforme parmi les indices
+    -- libres (un parcours depuis 0 favoriserait les premiers)
+    local libres = {}
+    for candidat = 0, tableaux[i][1] - 1 do
+      if not redis.call('ZSCORE', KEYS[i], candidat) then
+        libres[#libres + 1] = candidat
+      end
+    end
+    for j = 1, restants do
+      local rang = tableaux[i][4][j] % #libres + 1
+      local candidat = libres[rang]
+      libres[rang] = libres[#libres]
+      libres[#libres] = nil
+      redis.call('ZADD', KEYS[i], expire_a, candidat)
+      resultat[#resultat + 1] = candidat
+    end
+  end
+  redis.call('PEXPIRE', KEYS[i], duree)
+end
+return resultat
+"""
+# Borne des entiers aléatoires passés au script (exacts en nombre Lua)
+ALEA_MAX = 2**31
+SHA_SCRIPT_TIRAGE = hashlib.sha1(SCRIPT_TIRAGE.encode()).hexdigest()
+
+
+class BackendRedis(BackendCooldown):
+    """Backend partagé entre processus via un serveur compatible Redis.
+
+    Chaque tirage (déduplication comprise) est un unique EVALSHA exécuté
+    atomiquement par le serveur. Un petit cache local retient la date de fin
+    d'épuisement des pools et la taille du lot refusé : tant qu'elle n'est
+    pas atteinte, un lot au moins aussi grand est refusé sans aller-retour
+    réseau, les éléments ne pouvant pas se libérer plus tôt.
+    """
+
+    NB_CANDIDATS = 8
+    # Pools épuisés retenus au plus ; au-delà, les moins récents sont oubliés
+    TAILLE_EPUISES = 10000
+
+    def __init__(self, client, catalogues, duree, par_salon=False,
+                 fenetre_dedup=300.0, prefixe='lucie', horloge=time.time):
+        self.client = client
+        self._catalogues = JeuCatalogues()
+        self.remplacer_catalogues(catalogues)
+        self._duree_ms = int(duree * 1000)
+        self._par_salon = par_salon
+        self._fenetre_ms = int(fenetre_dedup * 1000)
+        self._prefixe = prefixe
+        self._horloge = horloge
+
+    def remplacer_catalogues(self, catalogues):
+        """Change les catalogues tirés.
+
+        Un catalogue modifié change d'empreinte, donc de clé : ses cooldowns
+        repartent de zéro, les indices de l'ancien catalogue n'ayant plus de
+        sens. Retourne la liste des tables modifiées.
+        """
+        ancien = self._catalogues
+        self._catalogues = en_jeu(catalogues)
+        self._catalogues.conserver(ancien)
+        self._epuises = OrderedDict()
+        return self._catalogues.modifies(ancien)
+
+    def _portee(self, guild_id, channel_id):
+        if self._par_salon and channel_id is not None:
+            return f'{guild_id}:{channel_id}'
+        return str(guild_id)
+
+    def _cle(self, portee, nom, catalogue):
+        # L'empreinte du catalogue évite de mélanger des indices incompatibles
+        return f'{self._prefixe}:cd:{portee}:{nom}:{catalogue.empreinte}'
+
+    async def _evalsha(self, cles, args):
+        commande = ('EVALSHA', SHA_SCRIPT_TIRAGE, len(cles), *cles, *args)
+        reponse, = await self.client.pipeline([commande])
+        if isinstance(reponse, ErreurRedis) and str(reponse).startswith(
+                'NOSCRIPT'):
+            # Premier appel sur ce serveur : EVAL met le script en cache
+            reponse, = await self.client.pipeline(
+                [('EVAL', SCRIPT_TIRAGE, len(cles), *cles, *args)])
+        if isinstance(reponse, ErreurRedis):
+            raise reponse
+        return reponse
+
+    async def tirer_lot(self, guild_id, channel_id, tableaux, nombre,
+                        message_id=None):
+        maintenant = self._horloge()
+        portee = self._portee(guild_id, channel_id)
+        for nom in tableaux:
+            epuise = self._epuises.get((portee, nom))
+            if epuise is not None:
+                fin, refuse = epuise
+                if fin <= maintenant:
+                    del self._epuises[(portee, nom)]
+                elif nombre >= refuse:
+                    # Un lot plus petit que celui refusé peut encore passer
+                    self._epuises.move_to_end((portee, nom))
+                    raise CooldownEpuise(fin - maintenant)
+
+        maintenant_ms = int(maintenant * 1000)
+        fenetre = self._fenetre_ms if message_id is not None else 0
+        cles = [f'{self._prefixe}:msg:{message_id}']
+        args = [maintenant_ms, self._duree_ms, fenetre]
+        catalogues = [
+            self._catalogues.catalogue(guild_id, nom) for nom in tableaux
+        ]
+        for nom, catalogue in zip(tableaux, catalogues):
+            taille = len(catalogue)
+            verifier_taille(nom, taille, nombre)
+            cles.append(self._cle(portee, nom, catalogue))
+            nb_candidats = min(self.NB_CANDIDATS * nombre, taille)
+            args.append(taille)
+            args.append(nombre)
+            args.append(nb_candidats)
+            args.extend(random.randrange(taille) for _ in range(nb_candidats))
+            args.extend(random.randrange(ALEA_MAX) for _ in range(nombre))
+
+        reponse = await self._evalsha(cles, args)
+        statut = reponse[0]
+        if statut == 0:
+            return None
+        if statut == -1:
+            nom = tableaux[reponse[1]]
+            fin = int(reponse[2]) / 1000
+            self._epuises[(portee, nom)] = (fin, nombre)
+            self._epuises.move_to_end((portee, nom))
+            if len(self._epuises) > self.TAILLE_EPUISES:
+                self._epuises.popitem(last=False)
+            raise CooldownEpuise(fin - maintenant)
+        choix = iter(reponse[1:])
+        return {
+            nom: [catalogue.items[next(choix)] for _ in range(nombre)]
+            for nom, catalogue in zip(tableaux, catalogues)
+        }
+
+    async def fermer(self):
+        await self.client.fermer()
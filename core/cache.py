@@ -0,0 +1,65 @@
+import os
+import sys
+
+import discord
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profils de cache disponibles (variable CACHE_PROFILE) :
+# - default : cache de discord.py par défaut (1000 messages, membres selon
+#   les intents)
+# - low_memory : aucun cache de messages ni de membres (l'auteur d'une
+#   commande est construit à partir du message ou de l'interaction reçue),
+#   pas de chunking des serveurs au démarrage
+PROFILS = ('default', 'low_memory')
+
+
+def options_cache(profil='default', taille_messages=None):
+    """Arguments de construction du bot correspondant au profil de cache.
+
+    `taille_messages` remplace la taille du cache de messages du profil
+    (0 le désactive).
+    """
+    if profil not in PROFILS:
+        raise ValueError(f"Profil de cache inconnu: {profil}")
+    if profil == 'default':
+        options = {}
+    else:
+        options = {
+            'max_messages': None,
+            'member_cache_flags': discord.MemberCacheFlags.none(),
+            'chunk_guilds_at_startup': False,
+        }
+    if taille_messages is not None:
+        options['max_messages'] = taille_messages or None
+    return options
+
+
+def memoire_residente():
+    """Mémoire résidente du processus en octets (pic hors Linux), ou None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en Ko ailleurs
+    return pic if sys.platform == 'darwin' else pic * 1024
+
+
+def statistiques_cache(bot):
+    guilds = bot.guilds
+    return {
+        'guilds': len(guilds),
+        'channels': sum(len(guild.channels) for guild in guilds),
+        'members': sum(len(guild.members) for guild in guilds),
+        'users': len(bot.users),
+        'messages': len(bot.cached_messages),
+        'emojis': len(bot.emojis),
+        'rss_bytes': memoire_residente(),
+    }
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = '.txt'
+
+
+class Catalogue:
+    """Catalogue compilé, partagé par tous les pools qui le tirent.
+
+    Les éléments sont dédoublonnés (les doublons partagent le même cooldown)
+    et internés ; l'indice de chaque élément est précalculé une fois pour
+    toutes, si bien que l'état des cooldowns ne manipule que des entiers.
+    """
+
+    __slots__ = ('items', 'indices', 'empreinte')
+
+    def __init__(self, items):
+        self.items = tuple(
+            dict.fromkeys(
+                sys.intern(item) if isinstance(item, str) else item
+                for item in items))
+        self.indices = {item: idx for idx, item in enumerate(self.items)}
+        self.empreinte = hashlib.sha1('\n'.join(map(
+            str, self.items)).encode()).hexdigest()[:8]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def compiler(catalogues):
+    return {
+        nom: items if isinstance(items, Catalogue) else Catalogue(items)
+        for nom, items in catalogues.items()
+    }
+
+
+class JeuCatalogues:
+    """Catalogues globaux et catalogues propres à certains serveurs.
+
+    Un serveur ne remplace que les tables pour lesquelles il a son propre
+    catalogue ; les autres restent celles du jeu global.
+    """
+
+    __slots__ = ('globaux', 'par_serveur')
+
+    def __init__(self, globaux=None, par_serveur=None):
+        self.globaux = compiler(globaux or {})
+        self.par_serveur = {
+            int(guild_id): compiler(catalogues)
+            for guild_id, catalogues in (par_serveur or {}).items()
+        }
+
+    def catalogue(self, guild_id, nom):
+        propres = self.par_serveur.get(guild_id)
+        if propres is not None:
+            catalogue = propres.get(nom)
+            if catalogue is not None:
+                return catalogue
+        return self.globaux[nom]
+
+    def conserver(self, ancien):
+        """Réutilise les catalogues inchangés de l'ancien jeu.
+
+        Les pools existants peuvent alors reconnaître un catalogue inchangé
+        par identité et le garder sans reconstruction.
+        """
+        connus = {}
+        for catalogues in (ancien.globaux, *ancien.par_serveur.values()):
+            for catalogue in catalogues.values():
+                connus[catalogue.items] = catalogue
+        for catalogues in (self.globaux, *self.par_serveur.values()):
+            for nom, catalogue in catalogues.items():
+                catalogues[nom] = connus.get(catalogue.items, catalogue)
+
+    def modifies(self, ancien):
+        """Noms des tables dont un catalogue (global ou d'un serveur) a changé."""
+
+        def empreintes(jeu):
+            resultat = {(None, nom): catalogue.empreinte
+                        for nom, catalogue in jeu.globaux.items()}
+            for guild_id, catalogues in jeu.par_serveur.items():
+                for nom, catalogue in catalogues.items():
+                    resultat[(guild_id, nom)] = catalogue.empreinte
+            return resultat
+
+        nouvelles, anciennes = empreintes(self), empreintes(ancien)
+        return sorted({
+            nom for cle, nom in nouvelles.keys() | anciennes.keys()
+            if nouvelles.get((cle, nom)) != anciennes.get((cle, nom))
+        })
+
+
+def en_jeu(catalogues):
+    if isinstance(catalogues, JeuCatalogues):
+        return catalogues
+    return JeuCatalogues(catalogues)
+
+
+def lire_catalogue(chemin):
+    """Un élément par ligne ; lignes vides et commentaires (#) ignorés."""
+    with open(chemin, encoding='utf-8') as f:
+        lignes = (ligne.strip() for ligne in f)
+        return [ligne for ligne in lignes if ligne and not ligne.startswith('#')]
+
+
+class SourceCatalogues:
+    """Catalogues lus depuis un dossier de fichiers texte.
+
+    `<dossier>/<table>.txt` définit le catalogue global d'une table et
+    `<dossier>/<id du serveur>/<table>.txt` son remplacement pour un serveur.
+    `verifier` compare la date de modification et la taille des fichiers au
+    dernier chargement et ne relit le dossier qu'en cas de changement.
+    """
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self._signature = None
+        self._refusee = None
+
+    def _fichiers(self):
+        fichiers = []
+        with os.scandir(self.dossier) as entrees:
+            for entree in entrees:
+                if entree.is_file() and entree.name.endswith(EXTENSION):
+                    fichiers.append((None, entree))
+                elif entree.is_dir() and entree.name.isdigit():
+                    with os.scandir(entree.path) as sous_entrees:
+                        fichiers.extend((int(entree.name), sous_entree)
+                                        for sous_entree in sous_entrees
+                                        if sous_entree.is_file() and
+                                        sous_entree.name.endswith(EXTENSION))
+        return fichiers
+
+    @staticmethod
+    def _calculer_signature(fichiers):
+        signature = []
+        for _, entree in fichiers:
+            stat = entree.stat()
+            signature.append((entree.path, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(signature))
+
+    def charger(self):
+        """Lit et compile tous les catalogues du dossier."""
+        fichiers = self._fichiers()
+        signature = self._calculer_signature(fichiers)
+        globaux = {}
+        par_serveur = {}
+        for guild_id, entree in fichiers:
+            nom = entree.name[:-len(EXTENSION)]
+            items = lire_catalogue(entree.path)
+            if not items:
+                raise ValueError(f"Catalogue vide: {entree.path}")
+            if guild_id is None:
+                globaux[nom] = items
+            else:
+                par_serveur.setdefault(guild_id, {})[nom] = items
+        if not globaux:
+            raise ValueError(f"Aucun catalogue dans {self.dossier}")
+        inconnues = {
+            nom for catalogues in par_serveur.values() for nom in catalogues
+        } - globaux.keys()
+        if inconnues:
+            raise ValueError(
+                f"Tables sans catalogue global: {', '.join(sorted(inconnues))}")
+        jeu = JeuCatalogues(globaux, par_serveur)
+        self._signature = signature
+        return jeu
+
+    def verifier(self):
+        """Retourne le nouveau jeu de catalogues si le dossier a changé.
+
+        Un dossier illisible ou invalide est signalé une fois et ignoré : les
+        catalogues en place restent utilisés jusqu'à la prochaine modification.
+        """
+        try:
+            signature = self._calculer_signature(self._fichiers())
+        except OSError:
+            # Dossier illisible : signature vide, signalé une seule fois
+            signature = ()
+        if signature in (self._signature, self._refusee):
+            return None
+        try:
+            return self.charger()
+        except (OSError, UnicodeDecodeError, ValueError):
+            self._refusee = signature
+            logger.exception("Catalogues de %s invalides, rechargement ignoré",
+                             self.dossier)
+            return None
@@ -0,0 +1,314 @@
+import heapq
+from array import array
+from collections import OrderedDict
+from functools import partial
+import random
+import time
+
+from core.catalogues import Catalogue, en_jeu
+
+# Durée par défaut du cooldown d'un élément tiré (1 heure)
+DUREE_COOLDOWN = 3600
+
+
+class CooldownEpuise(ValueError):
+    """Levée quand tous les éléments d'un pool sont en cooldown."""
+
+    def __init__(self, temps_restant):
+        self.temps_restant = max(0, int(temps_restant))
+        minutes, secondes = divmod(self.temps_restant, 60)
+        super().__init__(
+            f"Tous les éléments sont en cooldown. Veuillez attendre {minutes}m {secondes}s."
+        )
+
+
+class CooldownPool:
+    """Pool d'éléments tirables sans remise pendant la durée du cooldown.
+
+    Les indices des éléments disponibles sont gardés dans un tableau compact
+    (tirage en O(1) par échange avec le dernier élément) et les éléments en
+    cooldown dans un tas min trié par date d'expiration. Les expirations sont
+    traitées au fil des tirages, sans parcours complet de l'historique. Le
+    catalogue compilé est partagé entre les pools de tous les serveurs.
+    """
+
+    __slots__ = ('catalogue', '_duree', '_horloge', '_random', '_dispo',
+                 '_pos', '_expirations', 'on_tirage')
+
+    def __init__(self, items, duree=DUREE_COOLDOWN, horloge=time.time,
+                 rng=None):
+        # Les doublons du catalogue partagent le même cooldown
+        self.catalogue = items if isinstance(items,
+                                             Catalogue) else Catalogue(items)
+        self._duree = duree
+        self._horloge = horloge
+        self._random = rng or random
+        self._dispo = array('i', range(len(self.catalogue)))
+        # Position de chaque élément dans _dispo, -1 s'il est en cooldown
+        self._pos = array('i', range(len(self.catalogue)))
+        self._expirations = []
+        # Rappel optionnel (item, expire_a) appelé après chaque tirage
+        self.on_tirage = None
+
+    def __len__(self):
+        return len(self._dispo)
+
+    @property
+    def duree(self):
+        return self._duree
+
+    @property
+    def taille_catalogue(self):
+        return len(self.catalogue)
+
+    def en_cooldown(self, maintenant=None):
+        """Nombre d'éléments en cooldown, sans ceux déjà expirés."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        self._expirer(maintenant)
+        return len(self._expirations)
+
+    def _expirer(self, maintenant):
+        expirations = self._expirations
+        while expirations and expirations[0][0] <= maintenant:
+            _, idx = heapq.heappop(expirations)
+            self._pos[idx] = len(self._dispo)
+            self._dispo.append(idx)
+
+    def _reserver(self, idx, expire_a):
+        # Retire idx de la liste des disponibles en l'échangeant avec le dernier
+        dispo = self._dispo
+        pos = self._pos[idx]
+        dernier = dispo.pop()
+        if dernier != idx:
+            dispo[pos] = dernier
+            self._pos[dernier] = pos
+        self._pos[idx] = -1
+        heapq.heappush(self._expirations, (expire_a, idx))
+
+    def temps_restant(self, maintenant=None, nombre=1):
+        """Secondes avant que `nombre` éléments soient libres (0 s'ils le sont)."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        self._expirer(maintenant)
+        manquants = nombre - len(self._dispo)
+        if manquants <= 0 or not self._expirations:
+            return 0
+        if manquants == 1:
+            return self._expirations[0][0] - maintenant
+        return heapq.nsmallest(manquants,
+                               self._expirations)[-1][0] - maintenant
+
+    def tirer(self, maintenant=None):
+        if maintenant is None:
+            maintenant = self._horloge()
+        self._expirer(maintenant)
+        if not self._dispo:
+            if not self._expirations:
+                raise CooldownEpuise(0)
+            raise CooldownEpuise(self._expirations[0][0] - maintenant)
+
+        idx = self._dispo[self._random.randrange(len(self._dispo))]
+        expire_a = maintenant + self._duree
+        self._reserver(idx, expire_a)
+        item = self.catalogue.items[idx]
+        if self.on_tirage is not None:
+            self.on_tirage(item, expire_a)
+        return item
+
+    def tirer_plusieurs(self, nombre, maintenant=None):
+        """Tire `nombre` éléments distincts en une seule passe, sans remise."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        attente = self.temps_restant(maintenant, nombre)
+        if len(self._dispo) < nombre:
+            raise CooldownEpuise(attente)
+
+        dispo = self._dispo
+        items = self.catalogue.items
+        expire_a = maintenant + self._duree
+        tirage = []
+        for _ in range(nombre):
+            idx = dispo[self._random.randrange(len(dispo))]
+            self._reserver(idx, expire_a)
+            tirage.append(items[idx])
+        if self.on_tirage is not None:
+            for item in tirage:
+                self.on_tirage(item, expire_a)
+        return tirage
+
+    def cooldowns(self, maintenant=None):
+        """Éléments actuellement en cooldown et leur date d'expiration."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        self._expirer(maintenant)
+        items = self.catalogue.items
+        return [(items[idx], expire_a)
+                for expire_a, idx in self._expirations]
+
+    def restaurer(self, item, expire_a, maintenant=None):
+        """Remet un élément en cooldown jusqu'à expire_a (reprise à chaud)."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        if expire_a <= maintenant:
+            return False
+        idx = self.catalogue.indices.get(item)
+        if idx is None or self._pos[idx] == -1:
+            return False
+        self._reserver(idx, expire_a)
+        return True
+
+
+def cle_persistance(cle):
+    if isinstance(cle, tuple):
+        return ':'.join(str(partie) for partie in cle)
+    return str(cle)
+
+
+class _PoolsServeur:
+    __slots__ = ('pools', 'dernier_acces')
+
+    def __init__(self, pools, dernier_acces):
+        self.pools = pools
+        self.dernier_acces = dernier_acces
+
+
+class CooldownRegistry:
+    """Pools de cooldown isolés par serveur (ou par salon), créés à la demande.
+
+    Les entrées sont ordonnées de la moins à la plus récemment utilisée : un
+    pool inactif depuis plus de max(ttl_inactivite, durée du cooldown) n'a
+    plus aucun élément en cooldown et peut être supprimé sans perte d'état.
+    """
+
+    def __init__(self, catalogues, duree=DUREE_COOLDOWN, par_salon=False,
+                 ttl_inactivite=DUREE_COOLDOWN, horloge=time.time, rng=None):
+        # Dictionnaire nom -> éléments, ou JeuCatalogues avec remplacements
+        # par serveur
+        self._catalogues = en_jeu(catalogues)
+        self._duree = duree
+        self._par_salon = par_salon
+        self._ttl = max(ttl_inactivite, duree)
+        self._horloge = horloge
+        self._random = rng
+        self._entrees = OrderedDict()
+        self._store = None
+        self._en_attente = {}
+
+    def __len__(self):
+        return len(self._entrees)
+
+    @property
+    def duree(self):
+        return self._duree
+
+    def cle(self, guild_id, channel_id=None):
+        if self._par_salon and channel_id is not None:
+            return (guild_id, channel_id)
+        return guild_id
+
+    def pools(self, guild_id, channel_id=None, maintenant=None):
+        if maintenant is None:
+            maintenant = self._horloge()
+        cle = self.cle(guild_id, channel_id)
+        entree = self._entrees.get(cle)
+        if entree is None:
+            entree = _PoolsServeur(self._creer_pools(cle, maintenant),
+                                   maintenant)
+            self._entrees[cle] = entree
+        else:
+            entree.dernier_acces = maintenant
+            self._entrees.move_to_end(cle)
+        # Purge amortie : seules les entrées les plus anciennes sont examinées
+        self._purger(maintenant, limite=2)
+        return entree.pools
+
+    @staticmethod
+    def _guild(cle):
+        return cle[0] if isinstance(cle, tuple) else cle
+
+    def _nouveau_pool(self, cle, nom):
+        pool = CooldownPool(self._catalogues.catalogue(self._guild(cle), nom),
+                            self._duree, self._horloge, self._random)
+        if self._store is not None:
+            pool.on_tirage = partial(self._store.enregistrer,
+                                     cle_persistance(cle), nom)
+        return pool
+
+    def _creer_pools(self, cle, maintenant):
+        pools = {
+            nom: self._nouveau_pool(cle, nom)
+            for nom in self._catalogues.globaux
+        }
+        if self._store is not None:
+            for nom, item, expire_a in self._en_attente.pop(
+                    cle_persistance(cle), ()):
+                if nom in pools:
+                    pools[nom].restaurer(item, expire_a, maintenant)
+        return pools
+
+    def remplacer_catalogues(self, catalogues, maintenant=None):
+        """Change les catalogues sans perdre les cooldowns en cours.
+
+        Seuls les pools dont le catalogue a changé sont reconstruits : un
+        élément toujours présent garde son cooldown, un élément retiré est
+        oublié et un nouvel élément est immédiatement disponible. Retourne la
+        liste des tables modifiées.
+        """
+        if maintenant is None:
+            maintenant = self._horloge()
+        ancien = self._catalogues
+        self._catalogues = jeu = en_jeu(catalogues)
+        jeu.conserver(ancien)
+        for cle, entree in self._entrees.items():
+            pools = entree.pools
+            for nom in pools.keys() - jeu.globaux.keys():
+                del pools[nom]
+            for nom in jeu.globaux:
+                ancien_pool = pools.get(nom)
+                if (ancien_pool is not None
+                        and ancien_pool.catalogue is jeu.catalogue(
+                            self._guild(cle), nom)):
+                    continue
+                pool = pools[nom] = self._nouveau_pool(cle, nom)
+                if ancien_pool is not None:
+                    for item, expire_a in ancien_pool.cooldowns(maintenant):
+                        pool.restaurer(item, expire_a, maintenant)
+        return jeu.modifies(ancien)
+
+    def attacher_store(self, store, maintenant=None):
+        """Branche un stockage persistant et charge les cooldowns encore actifs.
+
+        Les entrées chargées ne sont appliquées qu'à la création paresseuse du
+        pool de leur serveur.
+        """
+        self._store = store
+        self._en_attente = store.charger(maintenant)
+
+    def tirer(self, nom, guild_id, channel_id=None):
+        return self.pools(guild_id, channel_id)[nom].tirer()
+
+    def nb_en_cooldown(self, maintenant=None):
+        """Nombre total d'éléments en cooldown (parcours de tous les pools)."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        return sum(pool.en_cooldown(maintenant)
+                   for entree in self._entrees.values()
+                   for pool in entree.pools.values())
+
+    def _purger(self, maintenant, limite=None):
+        supprimes = 0
+        entrees = self._entrees
+        while entrees and (limite is None or supprimes < limite):
+            cle, entree = next(iter(entrees.items()))
+            if maintenant - entree.dernier_acces < self._ttl:
+                break
+            del entrees[cle]
+            supprimes += 1
+        return supprimes
+
+    def purger_inactifs(self, maintenant=None):
+        """Supprime tous les pools inactifs et retourne leur nombre."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        return self._purger(maintenant)
@@ -0,0 +1,53 @@
+import time
+
+
+class FenetreDedup:
+    """Déduplication d'identifiants sur une fenêtre de temps, à mémoire bornée.
+
+    Deux générations d'ensembles tournent : un identifiant vu il y a moins de
+    `fenetre` secondes est toujours dans l'une des deux, tant que moins de
+    capacite / 2 identifiants arrivent par fenêtre. Au-delà, la rotation est
+    anticipée pour que la mémoire reste plafonnée à `capacite` entrées.
+    """
+
+    __slots__ = ('_fenetre', '_demi_capacite', '_horloge', '_courant',
+                 '_precedent', '_debut', 'hits', 'misses')
+
+    def __init__(self, fenetre=300.0, capacite=10000, horloge=time.monotonic):
+        self._fenetre = fenetre
+        self._demi_capacite = max(1, capacite // 2)
+        self._horloge = horloge
+        self._courant = set()
+        self._precedent = set()
+        self._debut = horloge()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._courant) + len(self._precedent)
+
+    def __contains__(self, identifiant):
+        return identifiant in self._courant or identifiant in self._precedent
+
+    def _rotation(self, maintenant):
+        age = maintenant - self._debut
+        if age >= 2 * self._fenetre:
+            # Les deux générations sont périmées
+            self._precedent = set()
+            self._courant = set()
+            self._debut = maintenant
+        elif (age >= self._fenetre
+              or len(self._courant) >= self._demi_capacite):
+            self._precedent = self._courant
+            self._courant = set()
+            self._debut = maintenant
+
+    def vu(self, identifiant):
+        """Retourne True si l'identifiant a déjà été vu, sinon l'enregistre."""
+        self._rotation(self._horloge())
+        if identifiant in self._courant or identifiant in self._precedent:
+            self.hits += 1
+            return True
+        self._courant.add(identifiant)
+        self.misses += 1
+        return False
@@ -0,0 +1,16 @@
+import yarl
+from discord.gateway import DiscordWebSocket
+from discord.http import Route
+
+
+def configurer_endpoints(api=None, gateway=None):
+    """Redirige l'API REST et la gateway de discord.py (serveur de test local).
+
+    Retourne les adresses précédentes, pour pouvoir les restaurer.
+    """
+    precedentes = (Route.BASE, str(DiscordWebSocket.DEFAULT_GATEWAY))
+    if api:
+        Route.BASE = api.rstrip('/')
+    if gateway:
+        DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(gateway)
+    return precedentes
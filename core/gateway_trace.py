@@ -0,0 +1,154 @@
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+
+from core.prefilter import DEBUT_MENTION
+
+logger = logging.getLogger(__name__)
+
+REDACTIONS = ('content', 'none')
+
+# Champs d'identité remplacés par la rédaction (les identifiants sont gardés :
+# ils relient messages, salons et serveurs au rejeu)
+CHAMPS_IDENTITE = {'username', 'global_name', 'nick', 'bio', 'email'}
+CHAMPS_IMAGES = {'avatar', 'banner', 'avatar_decoration_data'}
+CHAMPS_VIDES = {'attachments', 'embeds', 'sticker_items', 'components'}
+ARGUMENT_NEUTRE = re.compile(r'<@!?\d+>|\d{1,2}')
+
+
+def rediger_contenu(contenu, debuts):
+    """Garde la commande d'un message, masque le reste à longueur égale.
+
+    Les mentions et petits nombres des arguments (joueurs de `lucie`) sont
+    gardés : les identifiants le sont aussi dans le reste de la trace. Un
+    message sans préfixe est entièrement masqué : le préfiltre le rejette
+    toujours au rejeu, et la taille des messages est conservée.
+    """
+    if debuts is not None and contenu.startswith(debuts):
+        commande, espace, reste = contenu.partition(' ')
+        if commande.startswith(DEBUT_MENTION):
+            # Préfixe mention : la commande est le mot suivant
+            mot, espace2, reste = reste.partition(' ')
+            commande += espace + mot
+            espace = espace2
+        return commande + espace + ' '.join(
+            mot if ARGUMENT_NEUTRE.fullmatch(mot) else 'x' * len(mot)
+            for mot in reste.split(' '))
+    return 'x' * len(contenu)
+
+
+def rediger(donnees, debuts):
+    if isinstance(donnees, dict):
+        resultat = {}
+        for cle, valeur in donnees.items():
+            if cle in CHAMPS_IDENTITE and valeur is not None:
+                resultat[cle] = 'redacted'
+            elif cle in CHAMPS_IMAGES:
+                resultat[cle] = None
+            elif cle in CHAMPS_VIDES and valeur:
+                resultat[cle] = [{} for _ in valeur]
+            elif cle == 'content' and isinstance(valeur, str):
+                resultat[cle] = rediger_contenu(valeur, debuts)
+            else:
+                resultat[cle] = rediger(valeur, debuts)
+        return resultat
+    if isinstance(donnees, list):
+        return [rediger(valeur, debuts) for valeur in donnees]
+    return donnees
+
+
+class EnregistreurGateway:
+    """Enregistre les événements reçus de la gateway dans une trace gzip.
+
+    Chaque ligne est un objet JSON `{"t": secondes, "e": événement, "d":
+    données}` ; chaque démarrage ajoute à la fin du fichier un nouveau membre
+    gzip commençant par une ligne d'en-tête `{"session": ...}`. Comme pour le
+    stockage des cooldowns, la boucle ne fait qu'ajouter la ligne à un tampon
+    en mémoire ; `vider` compresse et écrit le tampon (depuis un thread).
+    """
+
+    def __init__(self, chemin, redaction='content', debuts=None,
+                 horloge=time.monotonic):
+        if redaction not in REDACTIONS:
+            raise ValueError(f"Rédaction inconnue: {redaction} "
+                             f"(valeurs possibles: {', '.join(REDACTIONS)})")
+        self.chemin = chemin
+        self._rediger = redaction != 'none'
+        self._debuts = debuts
+        self._horloge = horloge
+        self._debut = horloge()
+        self._tampon = [json.dumps({
+            'session': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'redaction': redaction,
+        }) + '\n']
+        self._verrou = threading.Lock()
+        self._fichier = gzip.open(chemin, 'at', encoding='utf-8')
+        self.nb_evenements = 0
+
+    async def enregistrer(self, brut):
+        """Listener de `on_socket_raw_receive` (payload JSON décompressé)."""
+        if isinstance(brut, bytes):
+            return
+        payload = json.loads(brut)
+        if payload.get('op') != 0:
+            return
+        donnees = payload.get('d')
+        if self._rediger:
+            donnees = rediger(donnees, self._debuts)
+        ligne = json.dumps(
+            {
+                't': round(self._horloge() - self._debut, 4),
+                'e': payload.get('t'),
+                'd': donnees,
+            },
+            ensure_ascii=False,
+            separators=(',', ':'))
+        with self._verrou:
+            self._tampon.append(ligne + '\n')
+        self.nb_evenements += 1
+
+    def vider(self):
+        with self._verrou:
+            lignes, self._tampon = self._tampon, []
+        if not lignes or self._fichier is None:
+            return
+        self._fichier.writelines(lignes)
+        # Bloc compressé complet : la trace reste lisible si le processus
+        # est tué avant la fermeture
+        self._fichier.flush()
+
+    def fermer(self):
+        self.vider()
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+            logger.info("Trace gateway fermée: %d événements dans %s",
+                        self.nb_evenements, self.chemin)
+
+
+def lire_trace(chemin):
+    """Événements d'une trace, sur une échelle de temps continue.
+
+    Les sessions successives sont mises bout à bout : le temps d'arrêt entre
+    deux démarrages n'est pas rejoué. Une fin de fichier tronquée (processus
+    tué) est ignorée.
+    """
+    decalage = 0.0
+    dernier = 0.0
+    with gzip.open(chemin, 'rt', encoding='utf-8') as f:
+        try:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except ValueError:
+                    break
+                if 'session' in entree:
+                    decalage = dernier
+                    continue
+                dernier = decalage + entree['t']
+                yield dernier, entree['e'], entree['d']
+        except (EOFError, gzip.BadGzipFile):
+            return
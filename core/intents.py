@@ -0,0 +1,31 @@
+import discord
+from discord.ext import commands
+
+# Profils d'intents disponibles (variable INTENTS_PROFILE) :
+# - full : intents par défaut + contenu des messages, préfixe `!`
+# - mentions : pas de contenu des messages ; Discord le fournit tout de même
+#   pour les messages qui mentionnent le bot, qui sert alors de préfixe
+# - minimal : uniquement l'intent guilds, aucun événement de message n'est
+#   reçu ; les commandes passent exclusivement par les commandes slash
+PROFILS = ('full', 'mentions', 'minimal')
+
+
+def construire_intents(profil='full'):
+    if profil not in PROFILS:
+        raise ValueError(f"Profil d'intents inconnu: {profil}")
+    if profil == 'full':
+        intents = discord.Intents.default()
+        intents.message_content = True
+        return intents
+    intents = discord.Intents.none()
+    # Nécessaire au cache des serveurs et salons utilisé par les interactions
+    intents.guilds = True
+    if profil == 'mentions':
+        intents.guild_messages = True
+    return intents
+
+
+def prefixe_commandes(profil='full'):
+    if profil == 'full':
+        return '!'
+    return commands.when_mentioned
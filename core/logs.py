@@ -0,0 +1,151 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class FichierRotatif(RotatingFileHandler):
+    """Fichier de logs avec rotation par taille et par durée."""
+
+    def __init__(self, chemin, max_octets=10 * 1024 * 1024, nb_sauvegardes=5,
+                 intervalle=86400, encoding='utf-8'):
+        super().__init__(chemin, maxBytes=max_octets,
+                         backupCount=nb_sauvegardes, encoding=encoding)
+        self._intervalle = intervalle
+        self._prochaine_rotation = time.time() + intervalle
+
+    def shouldRollover(self, record):
+        if self._intervalle and time.time() >= self._prochaine_rotation:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._prochaine_rotation = time.time() + self._intervalle
+
+
+class FormatJSON(logging.Formatter):
+    """Une ligne JSON par enregistrement, pour l'ingestion structurée."""
+
+    def format(self, record):
+        donnees = {
+            'ts': datetime.fromtimestamp(record.created,
+                                         timezone.utc).isoformat(),
+            'niveau': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            donnees['exception'] = self.formatException(record.exc_info)
+        return json.dumps(donnees, ensure_ascii=False)
+
+
+class FiltreRepetitions(logging.Filter):
+    """Limite les avertissements répétés à `limite` par `intervalle` secondes.
+
+    Les enregistrements sont regroupés par gabarit de message (avant
+    formatage), ce qui regroupe par exemple tous les « Commande déjà en cours
+    pour %s » quel que soit l'utilisateur. Le nombre de messages supprimés est
+    rappelé sur le premier message accepté de la fenêtre suivante.
+    """
+
+    def __init__(self, limite=5, intervalle=60.0, niveau=logging.WARNING):
+        super().__init__()
+        self._limite = limite
+        self._intervalle = intervalle
+        self._niveau = niveau
+        self._fenetres = {}
+
+    def filter(self, record):
+        if record.levelno < self._niveau:
+            return True
+        cle = (record.name, record.msg)
+        maintenant = record.created
+        fenetre = self._fenetres.get(cle)
+        if fenetre is None or maintenant - fenetre[0] >= self._intervalle:
+            if fenetre is None and len(self._fenetres) >= 1000:
+                # Borne la mémoire si des messages non paramétrés varient
+                self._fenetres.clear()
+            supprimes = fenetre[2] if fenetre is not None else 0
+            self._fenetres[cle] = [maintenant, 1, 0]
+            if supprimes:
+                record.msg = f"{record.msg} ({supprimes} messages similaires supprimés)"
+            return True
+        if fenetre[1] < self._limite:
+            fenetre[1] += 1
+            return True
+        fenetre[2] += 1
+        return False
+
+
+class _FileAttente(QueueHandler):
+    # Le formatage est laissé au thread d'écriture : la boucle asyncio ne fait
+    # qu'ajouter l'enregistrement à la file.
+    def prepare(self, record):
+        return record
+
+
+def configurer_logs(niveau=None, fichier=None, format_json=None,
+                    asynchrone=None, niveau_discord=None):
+    """Configure les logs du bot à partir des variables d'environnement.
+
+    Le logger `discord` a son propre niveau (INFO par défaut, comme avec
+    `bot.run`) : en DEBUG, discord.py journalise chaque payload de la gateway,
+    contenu des messages compris. En mode asynchrone (par défaut), les
+    handlers fichier et console tournent dans un thread d'écoute : une lenteur
+    disque ne bloque jamais la boucle.
+    Retourne le QueueListener démarré, ou None en mode synchrone.
+    """
+    niveau = niveau or os.getenv('LOG_LEVEL', 'INFO').upper()
+    niveau_discord = niveau_discord or os.getenv('DISCORD_LOG_LEVEL',
+                                                 'INFO').upper()
+    fichier = fichier or os.getenv('LOG_FILE', 'bot.log')
+    if format_json is None:
+        format_json = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+    if asynchrone is None:
+        asynchrone = os.getenv('LOG_ASYNC', 'true').lower() != 'false'
+
+    if format_json:
+        formatteur = FormatJSON()
+    else:
+        formatteur = logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [
+        FichierRotatif(fichier,
+                       max_octets=int(os.getenv('LOG_MAX_BYTES', 10485760)),
+                       nb_sauvegardes=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+                       intervalle=int(
+                           os.getenv('LOG_ROTATION_INTERVAL', 86400))),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatteur)
+
+    racine = logging.getLogger()
+    racine.setLevel(niveau)
+    logging.getLogger('discord').setLevel(niveau_discord)
+    for handler in list(racine.handlers):
+        racine.removeHandler(handler)
+    limite = int(os.getenv('LOG_REPEAT_LIMIT', 5))
+    intervalle = float(os.getenv('LOG_REPEAT_INTERVAL', 60))
+
+    if not asynchrone:
+        for handler in handlers:
+            handler.addFilter(FiltreRepetitions(limite, intervalle))
+            racine.addHandler(handler)
+        return None
+
+    file_attente = queue.SimpleQueue()
+    entree = _FileAttente(file_attente)
+    entree.addFilter(FiltreRepetitions(limite, intervalle))
+    racine.addHandler(entree)
+    ecoute = QueueListener(file_attente, *handlers,
+                           respect_handler_level=True)
+    ecoute.start()
+    atexit.register(ecoute.stop)
+    return ecoute
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(valeurs, p, trie=False):
+    if not valeurs:
+        return 0.0
+    tri = valeurs if trie else sorted(valeurs)
+    rang = min(len(tri) - 1, max(0, int(round(p / 100 * (len(tri) - 1)))))
+    return tri[rang]
+
+
+class MoniteurBoucle:
+    """Mesure le retard de la boucle asyncio et détecte les blocages.
+
+    Une tâche se réveille toutes les `intervalle` secondes et enregistre le
+    dépassement de son sommeil. Un thread de surveillance indépendant vérifie
+    que ces réveils continuent : si la boucle ne s'est pas réveillée depuis
+    `seuil` secondes, il capture la pile du thread de la boucle pour montrer ce
+    qui la bloque. Les percentiles du retard sont recalculés au plus une fois
+    toutes les `periode_percentiles` mesures, quel que soit le nombre
+    d'appels à `statistiques` (sondes /health).
+    """
+
+    def __init__(self, intervalle=0.1, seuil=1.0, taille_historique=600,
+                 on_retard=None, periode_percentiles=10):
+        self.intervalle = intervalle
+        self.seuil = seuil
+        self.dernier_retard = 0.0
+        self.retard_max = 0.0
+        self.nb_blocages = 0
+        self.dernier_battement = time.monotonic()
+        self.on_retard = on_retard
+        self._historique = deque(maxlen=taille_historique)
+        self._periode_percentiles = periode_percentiles
+        self._nb_mesures = 0
+        self._percentiles = None
+        self._calcul_a = 0
+        self._thread_boucle = None
+        self._surveillant = None
+        self._arret = threading.Event()
+
+    async def executer(self):
+        """Boucle de mesure ; à lancer comme tâche sur la boucle surveillée."""
+        self._thread_boucle = threading.get_ident()
+        self.dernier_battement = time.monotonic()
+        self._demarrer_surveillant()
+        try:
+            while True:
+                debut = time.monotonic()
+                await asyncio.sleep(self.intervalle)
+                maintenant = time.monotonic()
+                retard = max(0.0, maintenant - debut - self.intervalle)
+                self.dernier_battement = maintenant
+                self.dernier_retard = retard
+                self._historique.append(retard)
+                self._nb_mesures += 1
+                if retard > self.retard_max:
+                    self.retard_max = retard
+                if self.on_retard is not None:
+                    self.on_retard(retard)
+        finally:
+            self._arret.set()
+
+    def _demarrer_surveillant(self):
+        if self._surveillant is not None and self._surveillant.is_alive():
+            return
+        self._arret.clear()
+        self._surveillant = threading.Thread(target=self._surveiller,
+                                             name='loop-watchdog',
+                                             daemon=True)
+        self._surveillant.start()
+
+    def _surveiller(self):
+        signale = False
+        while not self._arret.wait(self.seuil / 2):
+            bloque_depuis = time.monotonic() - self.dernier_battement
+            if bloque_depuis < self.seuil + self.intervalle:
+                signale = False
+                continue
+            if signale:
+                continue
+            # Une seule capture par blocage
+            signale = True
+            self.nb_blocages += 1
+            logger.warning(
+                "Boucle asyncio bloquée depuis %.2f s, pile du thread de la boucle:\n%s",
+                bloque_depuis, self.pile_boucle())
+
+    def pile_boucle(self):
+        frame = sys._current_frames().get(self._thread_boucle)
+        if frame is None:
+            return '(thread de la boucle introuvable)'
+        return ''.join(traceback.format_stack(frame))
+
+    def _percentiles_retard(self):
+        if (self._percentiles is None or self._nb_mesures - self._calcul_a
+                >= self._periode_percentiles):
+            # Un seul tri de l'historique pour les deux percentiles
+            tri = sorted(self._historique)
+            self._percentiles = (
+                round(percentile(tri, 50, trie=True) * 1000, 2),
+                round(percentile(tri, 99, trie=True) * 1000, 2))
+            self._calcul_a = self._nb_mesures
+        return self._percentiles
+
+    def statistiques(self):
+        p50, p99 = self._percentiles_retard()
+        return {
+            'loop_lag_ms': round(self.dernier_retard * 1000, 2),
+            'loop_lag_p50_ms': p50,
+            'loop_lag_p99_ms': p99,
+            'loop_lag_max_ms': round(self.retard_max * 1000, 2),
+            'loop_stalls': self.nb_blocages,
+        }
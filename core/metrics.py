@@ -0,0 +1,210 @@
+from bisect import bisect_left
+
+import aiohttp
+
+# Bornes par défaut des histogrammes de latence (secondes)
+BORNES_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                  10.0)
+
+
+def _format_labels(noms, valeurs, extra=''):
+    paires = [f'{nom}="{valeur}"' for nom, valeur in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return '{' + ','.join(paires) + '}' if paires else ''
+
+
+def _format_valeur(valeur):
+    if valeur != valeur:
+        return 'NaN'
+    if valeur == float('inf'):
+        return '+Inf'
+    if isinstance(valeur, float) and valeur.is_integer():
+        return str(int(valeur))
+    return repr(valeur) if isinstance(valeur, float) else str(valeur)
+
+
+class _Valeur:
+    __slots__ = ('valeur', )
+
+    def __init__(self):
+        self.valeur = 0
+
+    def inc(self, n=1):
+        self.valeur += n
+
+    def set(self, valeur):
+        self.valeur = valeur
+
+
+class _Serie:
+    __slots__ = ('_bornes', 'comptes', 'somme', 'total')
+
+    def __init__(self, bornes):
+        self._bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur):
+        self.comptes[bisect_left(self._bornes, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+
+class _Famille:
+    """Métrique avec labels optionnels ; les séries sont créées à la demande.
+
+    Les mises à jour sont de simples opérations en mémoire sans verrou : elles
+    sont faites depuis le thread de la boucle asyncio.
+    """
+
+    type = None
+
+    def __init__(self, nom, aide, labels=(), fonction=None):
+        self.nom = nom
+        self.aide = aide
+        self.noms_labels = tuple(labels)
+        self.fonction = fonction
+        self._series = {}
+        if not self.noms_labels:
+            self._defaut = self._series[()] = self._nouvelle_serie()
+
+    def _nouvelle_serie(self):
+        return _Valeur()
+
+    def labels(self, *valeurs):
+        serie = self._series.get(valeurs)
+        if serie is None:
+            serie = self._series[valeurs] = self._nouvelle_serie()
+        return serie
+
+    def _lignes(self):
+        if self.fonction is not None:
+            yield f'{self.nom} {_format_valeur(self.fonction())}'
+            return
+        for valeurs, serie in self._series.items():
+            labels = _format_labels(self.noms_labels, valeurs)
+            yield f'{self.nom}{labels} {_format_valeur(serie.valeur)}'
+
+    def exposition(self):
+        entete = [
+            f'# HELP {self.nom} {self.aide}', f'# TYPE {self.nom} {self.type}'
+        ]
+        return '\n'.join(entete + list(self._lignes()))
+
+
+class Compteur(_Famille):
+    type = 'counter'
+
+    def inc(self, n=1):
+        self._defaut.valeur += n
+
+    @property
+    def valeur(self):
+        if self.fonction is not None:
+            return self.fonction()
+        return self._defaut.valeur
+
+
+class Jauge(_Famille):
+    type = 'gauge'
+
+    def set(self, valeur):
+        self._defaut.valeur = valeur
+
+    @property
+    def valeur(self):
+        if self.fonction is not None:
+            return self.fonction()
+        return self._defaut.valeur
+
+
+class Histogramme(_Famille):
+    type = 'histogram'
+
+    def __init__(self, nom, aide, labels=(), bornes=BORNES_LATENCE):
+        self.bornes = tuple(bornes)
+        super().__init__(nom, aide, labels)
+
+    def _nouvelle_serie(self):
+        return _Serie(self.bornes)
+
+    def observer(self, valeur):
+        self._defaut.observer(valeur)
+
+    def quantile(self, q, *valeurs):
+        """Borne supérieure du bucket contenant le quantile q (None si vide)."""
+        serie = self._series.get(valeurs)
+        if serie is None or not serie.total:
+            return None
+        rang = q * serie.total
+        cumul = 0
+        for borne, compte in zip(self.bornes + (float('inf'), ),
+                                 serie.comptes):
+            cumul += compte
+            if cumul >= rang:
+                return borne
+
+    def _lignes(self):
+        for valeurs, serie in self._series.items():
+            cumul = 0
+            for borne, compte in zip(self.bornes + (float('inf'), ),
+                                     serie.comptes):
+                cumul += compte
+                labels = _format_labels(self.noms_labels, valeurs,
+                                        f'le="{_format_valeur(borne)}"')
+                yield f'{self.nom}_bucket{labels} {cumul}'
+            labels = _format_labels(self.noms_labels, valeurs)
+            yield f'{self.nom}_sum{labels} {_format_valeur(serie.somme)}'
+            yield f'{self.nom}_count{labels} {serie.total}'
+
+
+class Registre:
+    """Ensemble des métriques exposées au format texte Prometheus."""
+
+    def __init__(self):
+        self._metriques = {}
+
+    def _ajouter(self, metrique):
+        existante = self._metriques.get(metrique.nom)
+        if existante is not None:
+            return existante
+        self._metriques[metrique.nom] = metrique
+        return metrique
+
+    def compteur(self, nom, aide, labels=(), fonction=None):
+        return self._ajouter(Compteur(nom, aide, labels, fonction))
+
+    def jauge(self, nom, aide, labels=(), fonction=None):
+        return self._ajouter(Jauge(nom, aide, labels, fonction))
+
+    def histogramme(self, nom, aide, labels=(), bornes=BORNES_LATENCE):
+        return self._ajouter(Histogramme(nom, aide, labels, bornes))
+
+    def get(self, nom):
+        return self._metriques.get(nom)
+
+    def exposition(self):
+        return '\n'.join(metrique.exposition()
+                         for metrique in self._metriques.values()) + '\n'
+
+
+REGISTRE = Registre()
+
+
+def suivi_rate_limits(compteur):
+    """TraceConfig aiohttp qui compte les réponses 429 de l'API REST.
+
+    Passée au client discord.py (`http_trace`), elle voit toutes les
+    réponses de discord.http, y compris les 429 des sous-limites que la
+    bibliothèque ne journalise qu'en DEBUG.
+    """
+
+    async def fin_requete(session, contexte, params):
+        if params.response.status == 429:
+            compteur.inc()
+
+    suivi = aiohttp.TraceConfig()
+    suivi.on_request_end.append(fin_requete)
+    return suivi
@@ -0,0 +1,216 @@
+import asyncio
+import time
+
+from core.tracing import trace_courante
+
+PRIORITE_RESULTAT = 0
+PRIORITE_ERREUR = 1
+
+# Taille maximale d'un message Discord
+TAILLE_MAX = 2000
+
+
+class _Envoi:
+    __slots__ = ('contenu', 'priorite', 'auteur', 'futur', 'embed', 'trace')
+
+    def __init__(self, contenu, priorite, auteur, futur, embed=None,
+                 trace=None):
+        self.contenu = contenu
+        self.priorite = priorite
+        self.auteur = auteur
+        self.futur = futur
+        self.embed = embed
+        # Trace de la commande qui a mis le message en file (None si elle
+        # n'est pas tracée)
+        self.trace = trace
+
+
+class _FileSalon:
+    __slots__ = ('destination', 'envois', 'tache', 'jetons', 'recharge')
+
+    def __init__(self, destination, capacite):
+        self.destination = destination
+        self.envois = []
+        self.tache = None
+        self.jetons = float(capacite)
+        self.recharge = time.monotonic()
+
+
+class PlanificateurEnvois:
+    """File d'envoi par salon avec regroupement et rate limit anticipé.
+
+    Une réponse dans un salon sans envoi en cours part immédiatement si le
+    seau a un jeton. Sinon, les messages mis en file pour ce salon pendant
+    l'envoi en cours, l'attente d'un jeton ou `fenetre` secondes sont
+    fusionnés en un seul envoi, les résultats passant avant les messages
+    d'erreur. Un seau à jetons local (`capacite` messages par `periode`
+    secondes, comme le bucket Discord par salon) retarde les envois au lieu
+    de provoquer des 429.
+    """
+
+    def __init__(self, fenetre=0.05, capacite=5, periode=5.0,
+                 taille_max=TAILLE_MAX):
+        self._fenetre = fenetre
+        self._capacite = capacite
+        self._periode = periode
+        self._taille_max = taille_max
+        self._files = {}
+        self.nb_messages = 0
+        self.nb_envois = 0
+
+    def __len__(self):
+        return sum(len(file.envois) for file in self._files.values())
+
+    async def envoyer(self, cible, contenu, priorite=PRIORITE_RESULTAT,
+                      auteur=None, embed=None):
+        """Met un message en file pour le salon de `cible` et attend son envoi.
+
+        `cible` est un contexte de commande ou un salon. Retourne le message
+        Discord envoyé (éventuellement partagé avec d'autres réponses). Un
+        message avec `embed` n'est pas fusionné : il part seul, dans l'ordre
+        de la file.
+        """
+        destination = getattr(cible, 'channel', cible)
+        file = self._files.get(destination.id)
+        if file is None:
+            file = self._files[destination.id] = _FileSalon(
+                destination, self._capacite)
+        futur = asyncio.get_running_loop().create_future()
+        file.envois.append(
+            _Envoi(contenu, priorite, auteur, futur, embed, trace_courante()))
+        self.nb_messages += 1
+        if file.tache is None:
+            # Salon calme : pas de fenêtre de regroupement, rien n'attend
+            immediat = self._jetons(file) >= 1
+            file.tache = asyncio.get_running_loop().create_task(
+                self._vider(destination.id, file, immediat))
+        return await futur
+
+    async def _attendre_jeton(self, file):
+        while True:
+            maintenant = time.monotonic()
+            file.jetons = min(
+                self._capacite, file.jetons +
+                (maintenant - file.recharge) * self._capacite / self._periode)
+            file.recharge = maintenant
+            if file.jetons >= 1:
+                file.jetons -= 1
+                return
+            await asyncio.sleep(
+                (1 - file.jetons) * self._periode / self._capacite)
+
+    def _prendre_lot(self, file):
+        """Retire de la file les envois fusionnables en un seul message."""
+        file.envois.sort(key=lambda envoi: envoi.priorite)
+        if file.envois[0].embed is not None:
+            envoi = file.envois.pop(0)
+            return [envoi], envoi.contenu, envoi.embed
+        lot = []
+        parties = []
+        restants = []
+        taille = 0
+        erreurs_vues = set()
+        for envoi in file.envois:
+            if restants or envoi.embed is not None:
+                restants.append(envoi)
+                continue
+            if (envoi.priorite == PRIORITE_ERREUR
+                    and envoi.contenu in erreurs_vues):
+                # Erreurs identiques : une seule ligne pour tout le lot
+                lot.append(envoi)
+                continue
+            partie = envoi.contenu
+            if envoi.auteur is not None:
+                partie = f"**{envoi.auteur}** : {partie}"
+            ajout = len(partie) + (2 if parties else 0)
+            if parties and taille + ajout > self._taille_max:
+                restants.append(envoi)
+                continue
+            if envoi.priorite == PRIORITE_ERREUR:
+                erreurs_vues.add(envoi.contenu)
+            parties.append(partie)
+            taille += ajout
+            lot.append(envoi)
+        file.envois = restants
+        if len(lot) == 1:
+            return lot, lot[0].contenu, None
+        return lot, '\n\n'.join(parties), None
+
+    async def _vider(self, cle, file, immediat=False):
+        try:
+            if not immediat:
+                await asyncio.sleep(self._fenetre)
+            while file.envois:
+                attente = time.perf_counter()
+                await self._attendre_jeton(file)
+                lot, contenu, embed = self._prendre_lot(file)
+                debut = time.perf_counter()
+                try:
+                    if embed is None:
+                        message = await file.destination.send(contenu)
+                    else:
+                        message = await file.destination.send(contenu,
+                                                              embed=embed)
+                except Exception as e:
+                    for envoi in lot:
+                        if not envoi.futur.done():
+                            envoi.futur.set_exception(e)
+                    continue
+                finally:
+                    self.nb_envois += 1
+                    self._tracer(lot, attente, debut)
+                for envoi in lot:
+                    if not envoi.futur.done():
+                        envoi.futur.set_result(message)
+        finally:
+            file.tache = None
+            if not file.envois and self._seau_plein(file):
+                self._files.pop(cle, None)
+
+    def _tracer(self, lot, attente, debut):
+        """Spans d'attente de jeton et d'appel REST des commandes tracées.
+
+        Les attentes de discord.py après une 429 font partie de l'appel REST.
+        """
+        fin = time.perf_counter()
+        for envoi in lot:
+            if envoi.trace is not None:
+                envoi.trace.ajouter('attente_rate_limit', attente, debut)
+                envoi.trace.ajouter('rest_send', debut, fin,
+                                    {'lot': len(lot)})
+
+    def _jetons(self, file, maintenant=None):
+        """Jetons du seau à cet instant, sans les consommer."""
+        if maintenant is None:
+            maintenant = time.monotonic()
+        return (file.jetons + (maintenant - file.recharge) * self._capacite /
+                self._periode)
+
+    def _seau_plein(self, file, maintenant=None):
+        return self._jetons(file, maintenant) >= self._capacite
+
+    def purger(self):
+        """Oublie les salons inactifs dont le seau de jetons est de nouveau plein.
+
+        Un salon vidé garde son seau tant qu'il n'est pas rechargé, pour qu'une
+        nouvelle rafale ne reparte pas d'un seau plein.
+        """
+        maintenant = time.monotonic()
+        inactifs = [
+            cle for cle, file in self._files.items() if file.tache is None
+            and not file.envois and self._seau_plein(file, maintenant)
+        ]
+        for cle in inactifs:
+            del self._files[cle]
+        return len(inactifs)
+
+    async def arreter(self):
+        taches = [f.tache for f in self._files.values() if f.tache is not None]
+        for tache in taches:
+            tache.cancel()
+        await asyncio.gather(*taches, return_exceptions=True)
+        for file in self._files.values():
+            for envoi in file.envois:
+                if not envoi.futur.done():
+                    envoi.futur.cancel()
+        self._files.clear()
@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cooldowns (
+    cle TEXT NOT NULL,
+    tableau TEXT NOT NULL,
+    item TEXT NOT NULL,
+    expire_a REAL NOT NULL,
+    PRIMARY KEY (cle, tableau, item)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cooldowns_expiration ON cooldowns (expire_a);
+'''
+
+
+class CooldownStore:
+    """Stockage SQLite (mode WAL) des cooldowns avec écriture différée.
+
+    Un tirage ne fait qu'ajouter une entrée dans un tampon en mémoire ;
+    `flush` applique les écritures regroupées en une transaction. Il est
+    appelé périodiquement par le superviseur, hors de la boucle
+    (`asyncio.to_thread`). En cas de crash, seuls les tirages depuis le
+    dernier flush sont perdus.
+    """
+
+    def __init__(self, chemin='cooldowns.db', horloge=time.time):
+        self._chemin = chemin
+        self._horloge = horloge
+        self._tampon = {}
+        self._verrou = threading.Lock()
+        self._verrou_db = threading.Lock()
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False,
+                                          isolation_level=None)
+        self._connexion.execute('PRAGMA journal_mode=WAL')
+        self._connexion.execute('PRAGMA synchronous=NORMAL')
+        self._connexion.executescript(_SCHEMA)
+
+    def __len__(self):
+        return len(self._tampon)
+
+    def charger(self, maintenant=None):
+        """Charge les cooldowns encore actifs, groupés par clé de serveur."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        debut = time.perf_counter()
+        entrees = {}
+        with self._verrou_db:
+            self._connexion.execute(
+                'DELETE FROM cooldowns WHERE expire_a <= ?', (maintenant, ))
+            lignes = self._connexion.execute(
+                'SELECT cle, tableau, item, expire_a FROM cooldowns')
+            total = 0
+            for cle, tableau, item, expire_a in lignes:
+                entrees.setdefault(cle, []).append((tableau, item, expire_a))
+                total += 1
+        logger.info("%d cooldowns actifs chargés depuis %s en %.1f ms", total,
+                    self._chemin, (time.perf_counter() - debut) * 1000)
+        return entrees
+
+    def enregistrer(self, cle, tableau, item, expire_a):
+        # Coalescence : un même élément retiré plusieurs fois n'est écrit qu'une fois
+        with self._verrou:
+            self._tampon[(cle, tableau, item)] = expire_a
+
+    def flush(self):
+        with self._verrou:
+            if not self._tampon:
+                return 0
+            tampon, self._tampon = self._tampon, {}
+        lignes = [(cle, tableau, item, expire_a)
+                  for (cle, tableau, item), expire_a in tampon.items()]
+        with self._verrou_db:
+            connexion = self._connexion
+            connexion.execute('BEGIN')
+            try:
+                connexion.executemany(
+                    'INSERT OR REPLACE INTO cooldowns VALUES (?, ?, ?, ?)',
+                    lignes)
+                connexion.execute('DELETE FROM cooldowns WHERE expire_a <= ?',
+                                  (self._horloge(), ))
+                connexion.execute('COMMIT')
+            except Exception:
+                connexion.execute('ROLLBACK')
+                # On remet les écritures en attente pour le prochain flush
+                with self._verrou:
+                    for cle, valeur in tampon.items():
+                        self._tampon.setdefault(cle, valeur)
+                raise
+        return len(lignes)
+
+    def fermer(self):
+        try:
+            self.flush()
+        finally:
+            with self._verrou_db:
+                self._connexion.close()
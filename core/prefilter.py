@@ -0,0 +1,46 @@
+from discord.ext import commands
+
+# Début commun des mentions du bot (<@id> et <@!id>)
+DEBUT_MENTION = '<@'
+
+
+def debuts_prefixe(prefixe):
+    """Débuts de message possibles pour le préfixe de commandes donné.
+
+    Retourne None si le préfixe est une fonction arbitraire : on ne peut alors
+    rien rejeter sans l'appeler.
+    """
+    if isinstance(prefixe, str):
+        return (prefixe, )
+    if prefixe is commands.when_mentioned:
+        return (DEBUT_MENTION, )
+    if callable(prefixe):
+        return None
+    return tuple(prefixe)
+
+
+class FiltrePrefixe:
+    """Filtre placé avant process_commands sur le chemin des messages.
+
+    Un message qui ne commence par aucun préfixe possible est rejeté par un
+    simple `str.startswith`, sans construire de Context ni résoudre le
+    préfixe. Les compteurs `nb_vus`, `nb_rejetes` et `nb_traites` mesurent
+    l'efficacité du filtre.
+    """
+
+    __slots__ = ('debuts', 'nb_vus', 'nb_rejetes', 'nb_traites')
+
+    def __init__(self, prefixe):
+        self.debuts = debuts_prefixe(prefixe)
+        self.nb_vus = 0
+        self.nb_rejetes = 0
+        self.nb_traites = 0
+
+    def accepte(self, message):
+        self.nb_vus += 1
+        if message.author.bot or (self.debuts is not None and
+                                  not message.content.startswith(self.debuts)):
+            self.nb_rejetes += 1
+            return False
+        self.nb_traites += 1
+        return True
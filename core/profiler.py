@@ -0,0 +1,202 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from core.loop_monitor import percentile
+
+# Limites du profilage à la demande
+DUREE_MAX = 120
+PROFONDEUR_MAX = 128
+# Intervalle de bascule du GIL pendant un profilage (secondes)
+INTERVALLE_BASCULE = 0.001
+# Période de la sonde qui mesure le retard de la boucle pendant un profilage
+PERIODE_SONDE = 0.01
+
+# Fonctions où un thread attend sans rien faire (boucle asyncio sans
+# événement, thread de travail sans tâche...), exclues du résumé
+CADRES_ATTENTE = ('select (selectors.py:', 'wait (threading.py:',
+                  '_worker (thread.py:')
+
+
+class ProfilageEnCours(RuntimeError):
+    """Levée quand un profilage est déjà en cours dans le processus."""
+
+    def __init__(self):
+        super().__init__("Un profilage est déjà en cours.")
+
+
+class Profil:
+    """Résultat d'un profilage : nombre d'échantillons par pile d'appels.
+
+    Les piles sont des tuples de cadres, de la racine (nom du thread) à la
+    fonction en cours d'exécution.
+    """
+
+    def __init__(self, piles, nb_echantillons, duree, temps_cpu,
+                 retards_boucle=()):
+        self.piles = piles
+        self.nb_echantillons = nb_echantillons
+        self.duree = duree
+        # Temps CPU consommé par le thread d'échantillonnage
+        self.temps_cpu = temps_cpu
+        # Retards de réveil de la boucle asyncio mesurés pendant le profilage
+        self.retards_boucle = list(retards_boucle)
+
+    @property
+    def cpu_echantillonnage(self):
+        """Part d'un cœur utilisée par le thread d'échantillonnage.
+
+        Ce n'est pas l'impact sur la boucle : la bascule fréquente du GIL
+        la ralentit aussi. Voir `retard_boucle_p99`.
+        """
+        return self.temps_cpu / self.duree if self.duree else 0.0
+
+    @property
+    def retard_boucle_p99(self):
+        """Retard p99 (s) des réveils de la boucle pendant le profilage."""
+        return percentile(self.retards_boucle, 99)
+
+    def collapsed(self):
+        """Format « collapsed stacks » de flamegraph.pl et speedscope."""
+        return ''.join(f"{';'.join(pile)} {nombre}\n"
+                       for pile, nombre in self.piles.most_common())
+
+    def actives(self):
+        """Piles des threads occupés, sans celles des threads en attente."""
+        return {pile: nombre for pile, nombre in self.piles.items()
+                if not pile[-1].startswith(CADRES_ATTENTE)}
+
+    def top(self, n=15):
+        """Les n cadres les plus échantillonnés : (cadre, propre, inclusif).
+
+        `propre` compte les échantillons où le cadre était en cours
+        d'exécution, `inclusif` ceux où il était sur la pile.
+        """
+        propre = Counter()
+        inclusif = Counter()
+        for pile, nombre in self.actives().items():
+            propre[pile[-1]] += nombre
+            for cadre in set(pile[1:]):
+                inclusif[cadre] += nombre
+        return [(cadre, nombre, inclusif[cadre])
+                for cadre, nombre in propre.most_common(n)]
+
+    def resume(self, n=15):
+        total = sum(self.actives().values()) or 1
+        lignes = [
+            f"{self.nb_echantillons} relevés en {self.duree:.1f} s "
+            f"(échantillonnage {self.cpu_echantillonnage:.1%} d'un cœur, "
+            f"retard p99 de la boucle {self.retard_boucle_p99 * 1000:.2f} ms), "
+            f"{total} piles de threads actifs",
+            f"{'propre':>7} {'inclusif':>9}  fonction",
+        ]
+        for cadre, nombre, cumul in self.top(n):
+            lignes.append(f"{nombre / total:>7.1%} {cumul / total:>9.1%}  "
+                          f"{cadre}")
+        return '\n'.join(lignes)
+
+
+class ProfileurEchantillonnage:
+    """Profileur par échantillonnage des piles de tous les threads.
+
+    Un thread relève `sys._current_frames()` toutes les `intervalle` secondes :
+    rien n'est instrumenté. Le thread consomme quelques dizaines de
+    microsecondes par relevé, et l'intervalle de bascule du GIL est réduit à
+    `bascule` pendant le profilage, ce qui ralentit un peu tous les threads (le
+    profil rapporte le retard de la boucle mesuré pendant ce temps). La boucle
+    asyncio, le serveur HTTP qui tourne dessus et les threads de travail
+    (`asyncio.to_thread`) sont profilés ensemble, chaque pile étant préfixée
+    par le nom de son thread. Un seul profilage peut tourner à la fois dans le
+    processus.
+    """
+
+    _verrou = threading.Lock()
+
+    def __init__(self, intervalle=0.01, bascule=INTERVALLE_BASCULE):
+        self.intervalle = intervalle
+        self.bascule = bascule
+        self._libelles = {}
+        self._arret = threading.Event()
+
+    def _libelle(self, code):
+        libelle = self._libelles.get(code)
+        if libelle is None:
+            libelle = self._libelles[code] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                f"{code.co_firstlineno})")
+        return libelle
+
+    def _echantillonner(self, fin, piles, noms, moi):
+        nb_echantillons = 0
+        while time.monotonic() < fin and not self._arret.wait(self.intervalle):
+            for ident, cadre in sys._current_frames().items():
+                if ident == moi:
+                    continue
+                pile = []
+                while cadre is not None and len(pile) < PROFONDEUR_MAX:
+                    pile.append(self._libelle(cadre.f_code))
+                    cadre = cadre.f_back
+                nom = noms.get(ident)
+                if nom is None:
+                    noms.update(
+                        (t.ident, t.name) for t in threading.enumerate())
+                    nom = noms.get(ident, f'thread-{ident}')
+                pile.append(nom)
+                pile.reverse()
+                piles[tuple(pile)] += 1
+            nb_echantillons += 1
+        return nb_echantillons
+
+    def profiler_sync(self, duree):
+        """Profile le processus pendant `duree` secondes (appel bloquant)."""
+        if not self._verrou.acquire(blocking=False):
+            raise ProfilageEnCours()
+        # Le thread d'échantillonnage n'obtient le GIL que lorsque le thread
+        # profilé le relâche : au bout de l'intervalle de bascule (5 ms par
+        # défaut), ou quand il se bloque (select de la boucle). Sans
+        # réduction, les calculs courts ne seraient jamais échantillonnés
+        bascule = sys.getswitchinterval()
+        sys.setswitchinterval(min(bascule, self.bascule))
+        self._arret.clear()
+        try:
+            piles = Counter()
+            debut = time.monotonic()
+            debut_cpu = time.thread_time()
+            nb_echantillons = self._echantillonner(
+                debut + duree, piles, {}, threading.get_ident())
+            return Profil(piles, nb_echantillons, time.monotonic() - debut,
+                          time.thread_time() - debut_cpu)
+        finally:
+            sys.setswitchinterval(bascule)
+            self._verrou.release()
+
+    def arreter(self):
+        """Termine le profilage en cours avant la fin de sa durée."""
+        self._arret.set()
+
+    async def profiler(self, duree):
+        """Profile le processus pendant `duree` secondes sans bloquer la boucle.
+
+        L'échantillonnage tourne dans un thread dédié, qui n'est pas inclus
+        dans le profil. Une sonde mesure en même temps le retard de la boucle.
+        """
+        duree = min(max(float(duree), 0.1), DUREE_MAX)
+        retards = []
+        sonde = asyncio.create_task(_sonder(retards))
+        try:
+            profil = await asyncio.to_thread(self.profiler_sync, duree)
+        finally:
+            sonde.cancel()
+        profil.retards_boucle = retards
+        return profil
+
+
+async def _sonder(retards):
+    while True:
+        debut = time.perf_counter()
+        await asyncio.sleep(PERIODE_SONDE)
+        retards.append(
+            max(0.0, time.perf_counter() - debut - PERIODE_SONDE))
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+
+import discord
+from discord.backoff import ExponentialBackoff
+
+logger = logging.getLogger(__name__)
+
+# Erreurs pour lesquelles une nouvelle tentative ne peut pas réussir
+ERREURS_FATALES = (discord.LoginFailure, discord.PrivilegedIntentsRequired)
+
+
+class SuiviReconnexions:
+    """Mesure le temps de rétablissement de la connexion à la gateway.
+
+    Une coupure commence au premier `deconnecte` d'un shard et se termine au
+    `retabli` suivant (reprise de session ou nouvelle identification) ; les
+    déconnexions répétées pendant les tentatives comptent pour une seule
+    coupure. `on_retablissement(duree, mode)` reçoit chaque durée mesurée.
+    """
+
+    def __init__(self, horloge=time.monotonic, on_retablissement=None):
+        self._horloge = horloge
+        self._on_retablissement = on_retablissement
+        self._coupures = {}
+        self.nb_coupures = 0
+        self.nb_reprises = 0
+        self.nb_identifications = 0
+
+    def __len__(self):
+        return len(self._coupures)
+
+    def deconnecte(self, shard_id=None):
+        if shard_id not in self._coupures:
+            self._coupures[shard_id] = self._horloge()
+            self.nb_coupures += 1
+
+    def retabli(self, shard_id=None, reprise=True):
+        debut = self._coupures.pop(shard_id, None)
+        if debut is None:
+            # Première connexion : rien à mesurer
+            return None
+        duree = self._horloge() - debut
+        if reprise:
+            self.nb_reprises += 1
+        else:
+            self.nb_identifications += 1
+        if self._on_retablissement is not None:
+            self._on_retablissement(duree, 'resume' if reprise else 'identify')
+        return duree
+
+    def duree_coupure(self):
+        """Durée de la plus ancienne coupure en cours, ou None."""
+        if not self._coupures:
+            return None
+        return self._horloge() - min(self._coupures.values())
+
+
+async def executer_avec_reprise(client, token, arret, backoff=None,
+                                on_echec=None):
+    """Maintient le client connecté jusqu'à ce que `arret` soit positionné.
+
+    discord.py reprend lui-même la session gateway après les coupures
+    réseau ; cette boucle couvre les échecs qui font sortir `start` (échec
+    de connexion HTTP, fermeture non reprenable...). Le client est alors
+    réinitialisé et relancé après un délai exponentiel avec gigue, dans la
+    même boucle asyncio : l'état du processus est conservé. Un arrêt normal
+    de `start` (appel à `close`) termine la boucle ; les erreurs fatales
+    (token invalide, intents non autorisés) sont propagées.
+    """
+    if backoff is None:
+        backoff = ExponentialBackoff()
+    async with client:
+        while not arret.is_set():
+            try:
+                await client.start(token, reconnect=True)
+                return
+            except ERREURS_FATALES:
+                raise
+            except Exception as e:
+                if arret.is_set():
+                    return
+                delai = backoff.delay()
+                # Pile d'appels inutile pour une simple erreur réseau
+                logger.error(
+                    "Connexion à Discord perdue (%s), nouvelle tentative dans "
+                    "%.1f s", e, delai, exc_info=not isinstance(e, OSError))
+                if on_echec is not None:
+                    on_echec(e)
+            try:
+                await asyncio.wait_for(arret.wait(), delai)
+            except asyncio.TimeoutError:
+                pass
+            client.clear()
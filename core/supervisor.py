@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+class Tache:
+    """Tâche de fond enregistrée auprès du superviseur et ses statistiques."""
+
+    __slots__ = ('nom', 'fonction', 'intervalle', 'tache', 'nb_executions',
+                 'nb_erreurs', 'nb_redemarrages', 'derniere_duree',
+                 'duree_max', 'derniere_derive', 'derive_max')
+
+    def __init__(self, nom, fonction, intervalle=None):
+        self.nom = nom
+        self.fonction = fonction
+        self.intervalle = intervalle
+        self.tache = None
+        self.nb_executions = 0
+        self.nb_erreurs = 0
+        self.nb_redemarrages = 0
+        self.derniere_duree = 0.0
+        self.duree_max = 0.0
+        self.derniere_derive = 0.0
+        self.derive_max = 0.0
+
+    @property
+    def active(self):
+        return self.tache is not None and not self.tache.done()
+
+
+class Superviseur:
+    """Registre nommé de tâches de fond, chacune démarrée une seule fois.
+
+    Une tâche périodique (`intervalle` en secondes) appelle `fonction` à
+    cadence fixe ; sans intervalle, `fonction` est une coroutine de longue
+    durée. Une tâche qui plante est relancée avec un délai exponentiel
+    (avec gigue) plafonné à `backoff_max` secondes.
+    """
+
+    def __init__(self, backoff_max=60.0):
+        self._backoff_max = backoff_max
+        self._taches = {}
+
+    def __iter__(self):
+        return iter(self._taches.values())
+
+    def __getitem__(self, nom):
+        return self._taches[nom]
+
+    def enregistrer(self, nom, fonction, intervalle=None):
+        if nom in self._taches and self._taches[nom].active:
+            raise ValueError(f"La tâche {nom} est déjà en cours")
+        self._taches[nom] = Tache(nom, fonction, intervalle)
+
+    def demarrer(self):
+        """Démarre les tâches qui ne tournent pas déjà (appel idempotent)."""
+        loop = asyncio.get_running_loop()
+        for tache in self._taches.values():
+            if not tache.active:
+                tache.tache = loop.create_task(self._superviser(tache),
+                                               name=f'superviseur:{tache.nom}')
+
+    async def arreter(self):
+        taches = [t.tache for t in self._taches.values() if t.active]
+        for tache in taches:
+            tache.cancel()
+        await asyncio.gather(*taches, return_exceptions=True)
+        for tache in self._taches.values():
+            tache.tache = None
+
+    async def _executer(self, tache):
+        loop = asyncio.get_running_loop()
+        debut = loop.time()
+        resultat = tache.fonction()
+        if inspect.isawaitable(resultat):
+            await resultat
+        duree = loop.time() - debut
+        tache.nb_executions += 1
+        tache.derniere_duree = duree
+        if duree > tache.duree_max:
+            tache.duree_max = duree
+
+    async def _periodique(self, tache):
+        loop = asyncio.get_running_loop()
+        prochaine = loop.time() + tache.intervalle
+        while True:
+            await asyncio.sleep(max(0.0, prochaine - loop.time()))
+            derive = loop.time() - prochaine
+            tache.derniere_derive = derive
+            if derive > tache.derive_max:
+                tache.derive_max = derive
+            await self._executer(tache)
+            prochaine += tache.intervalle
+            if prochaine < loop.time():
+                # Exécutions manquées : on repart de maintenant sans rattrapage
+                prochaine = loop.time() + tache.intervalle
+
+    async def _superviser(self, tache):
+        echecs = 0
+        while True:
+            loop = asyncio.get_running_loop()
+            debut = loop.time()
+            try:
+                if tache.intervalle is None:
+                    await self._executer(tache)
+                    return
+                await self._periodique(tache)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                tache.nb_erreurs += 1
+                # Une tâche restée stable assez longtemps repart d'un délai court
+                if loop.time() - debut > self._backoff_max:
+                    echecs = 0
+                delai = min(self._backoff_max, 2**echecs)
+                delai = random.uniform(delai / 2, delai)
+                echecs += 1
+                logger.exception(
+                    "La tâche %s a planté, redémarrage dans %.1f s", tache.nom,
+                    delai)
+                await asyncio.sleep(delai)
+                tache.nb_redemarrages += 1
+
+    def statistiques(self):
+        return {
+            tache.nom: {
+                'active': tache.active,
+                'executions': tache.nb_executions,
+                'errors': tache.nb_erreurs,
+                'restarts': tache.nb_redemarrages,
+                'last_duration_ms': round(tache.derniere_duree * 1000, 2),
+                'max_duration_ms': round(tache.duree_max * 1000, 2),
+                'last_drift_ms': round(tache.derniere_derive * 1000, 2),
+                'max_drift_ms': round(tache.derive_max * 1000, 2),
+            }
+            for tache in self._taches.values()
+        }
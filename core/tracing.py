@@ -0,0 +1,223 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spans gardés en mémoire au plus entre deux écritures ; au-delà ils sont
+# perdus (et comptés) plutôt que de faire grossir la mémoire
+TAILLE_TAMPON = 50000
+
+_courante = contextvars.ContextVar('trace_courante', default=None)
+# Instant de réception du message d'une commande préfixée (perf_counter),
+# posé par on_message autour de process_commands
+reception_message = contextvars.ContextVar('reception_message', default=None)
+
+
+class _SpanNul:
+    """Span sans effet, retourné quand la commande n'est pas tracée."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def ajouter(self, **attributs):
+        pass
+
+
+SPAN_NUL = _SpanNul()
+
+
+class _Trace:
+    __slots__ = ('traceur', 'id')
+
+    def __init__(self, traceur, trace_id):
+        self.traceur = traceur
+        self.id = trace_id
+
+    def ajouter(self, nom, debut, fin, attributs=None):
+        """Span déjà mesuré (instants `time.perf_counter`)."""
+        self.traceur._exporter(self.id, nom, debut, fin, attributs)
+
+
+class Span:
+    __slots__ = ('trace', 'nom', 'attributs', 'debut', 'racine', '_jeton')
+
+    def __init__(self, trace, nom, attributs, racine=False, debut=None):
+        self.trace = trace
+        self.nom = nom
+        self.attributs = attributs
+        self.racine = racine
+        self.debut = debut
+        self._jeton = None
+
+    def ajouter(self, **attributs):
+        self.attributs.update(attributs)
+
+    def __enter__(self):
+        if self.racine:
+            self._jeton = _courante.set(self.trace)
+        if self.debut is None:
+            self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, type_exc, exc, tb):
+        fin = time.perf_counter()
+        if type_exc is not None:
+            self.attributs['erreur'] = type_exc.__name__
+        self.trace.ajouter(self.nom, self.debut, fin, self.attributs)
+        if self._jeton is not None:
+            try:
+                _courante.reset(self._jeton)
+            except ValueError:
+                # Fermé depuis une autre tâche (on_command_error) : le
+                # contexte de la commande n'est plus utilisé
+                pass
+        return False
+
+
+def trace_courante():
+    """Trace de la commande en cours dans cette tâche (None si non tracée)."""
+    return _courante.get()
+
+
+def span(nom, **attributs):
+    """Span d'une étape de la commande en cours : `with span('tirage'):`.
+
+    Hors d'une commande tracée (traçage désactivé ou commande non
+    échantillonnée), ne coûte qu'une lecture de ContextVar.
+    """
+    trace = _courante.get()
+    if trace is None:
+        return SPAN_NUL
+    return Span(trace, nom, attributs)
+
+
+class Traceur:
+    """Traçage des commandes, exporté au format Chrome trace.
+
+    Le fichier s'ouvre dans Perfetto (ui.perfetto.dev) ou chrome://tracing.
+    `commencer` (ou `debut_commande` depuis le hook before_invoke) ouvre la
+    trace d'une commande avec la probabilité `taux` ;
+    les spans des étapes suivent la commande à travers ses `await` grâce à
+    une ContextVar. Chaque span terminé est ajouté à un tampon en mémoire ;
+    `vider` l'écrit (depuis un thread) à la fin d'un tableau JSON dont le
+    crochet fermant est omis, ce que le format autorise : le fichier reste
+    lisible après un arrêt brutal et est complété au démarrage suivant.
+    Chaque commande tracée occupe sa propre ligne (`tid`) dans le viewer.
+    """
+
+    def __init__(self, chemin=None, taux=1.0, taille_tampon=TAILLE_TAMPON):
+        self.chemin = chemin
+        self.taux = taux if chemin else 0.0
+        self.taille_tampon = taille_tampon
+        self._tampon = []
+        self._verrou = threading.Lock()
+        self._ids = 0
+        self._pid = os.getpid()
+        # Conversion des instants perf_counter en microsecondes depuis l'epoch
+        self._origine = time.time() - time.perf_counter()
+        self.nb_traces = 0
+        self.nb_spans = 0
+        self.nb_perdus = 0
+
+    @property
+    def actif(self):
+        return self.taux > 0
+
+    def commencer(self, nom, debut=None, **attributs):
+        """Span racine d'une commande, ou SPAN_NUL si elle n'est pas tracée."""
+        if not self.taux or (self.taux < 1 and random.random() >= self.taux):
+            return SPAN_NUL
+        self._ids += 1
+        self.nb_traces += 1
+        return Span(_Trace(self, self._ids), nom, attributs, racine=True,
+                    debut=debut)
+
+    def debut_commande(self, ctx):
+        """Ouvre la trace d'une commande (hook before_invoke).
+
+        Appelé pour les commandes préfixées comme pour les commandes slash.
+        Pour une commande préfixée, la trace commence à la réception du
+        message et un span `dispatch` couvre l'analyse jusqu'à l'invocation.
+        """
+        if not self.taux:
+            return
+        reception = reception_message.get()
+        racine = self.commencer('commande', debut=reception,
+                                commande=ctx.command.qualified_name,
+                                slash=ctx.interaction is not None)
+        if racine is SPAN_NUL:
+            return
+        racine.__enter__()
+        if reception is not None:
+            racine.trace.ajouter('dispatch', reception, time.perf_counter())
+        ctx.span_commande = racine
+
+    def fin_commande(self, ctx, erreur=None):
+        """Ferme la trace ouverte par `debut_commande` (after_invoke, ou
+        on_command_error quand discord.py n'appelle pas after_invoke)."""
+        racine = getattr(ctx, 'span_commande', None)
+        if racine is None:
+            return
+        ctx.span_commande = None
+        racine.__exit__(None if erreur is None else type(erreur), erreur,
+                        None)
+
+    def _exporter(self, trace_id, nom, debut, fin, attributs):
+        if len(self._tampon) >= self.taille_tampon:
+            self.nb_perdus += 1
+            return
+        evenement = {
+            'name': nom,
+            'cat': 'commande',
+            'ph': 'X',
+            'ts': round((self._origine + debut) * 1e6),
+            'dur': round((fin - debut) * 1e6),
+            'pid': self._pid,
+            'tid': trace_id,
+        }
+        if attributs:
+            evenement['args'] = attributs
+        with self._verrou:
+            self._tampon.append(evenement)
+        self.nb_spans += 1
+
+    def vider(self):
+        with self._verrou:
+            evenements, self._tampon = self._tampon, []
+        if not evenements or not self.chemin:
+            return
+        lignes = ''.join(
+            json.dumps(e, ensure_ascii=False, separators=(',', ':'),
+                       default=str) + ',\n' for e in evenements)
+        with open(self.chemin, 'a', encoding='utf-8') as f:
+            if f.tell() == 0:
+                f.write('[\n')
+            f.write(lignes)
+
+    def fermer(self):
+        self.vider()
+        if self.nb_traces:
+            logger.info("Traçage: %d commandes, %d spans écrits dans %s "
+                        "(%d perdus)", self.nb_traces, self.nb_spans,
+                        self.chemin, self.nb_perdus)
+
+
+def lire_spans(chemin):
+    """Spans d'un fichier de trace, même non terminé par `]`."""
+    with open(chemin, encoding='utf-8') as f:
+        texte = f.read().rstrip()
+    if not texte:
+        return []
+    if not texte.endswith(']'):
+        texte = texte.rstrip(',') + ']'
+    return json.loads(texte)
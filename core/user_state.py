@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+
+
+class EtatUtilisateur:
+    """État compact d'un utilisateur : verrou de commande et compteurs."""
+
+    __slots__ = ('en_cours', 'derniere_commande', 'nb_commandes', 'nb_refus')
+
+    def __init__(self):
+        self.en_cours = False
+        self.derniere_commande = 0.0
+        self.nb_commandes = 0
+        self.nb_refus = 0
+
+
+class TableUtilisateurs:
+    """Table des états par identifiant entier d'utilisateur, avec éviction.
+
+    Les entrées sont ordonnées par `derniere_commande` croissante : toute
+    entrée déplacée en fin de table est horodatée à `maintenant`. Une
+    entrée sans commande en cours est évincée après `ttl` secondes
+    d'inactivité, ou plus tôt si la table dépasse `capacite` entrées.
+    """
+
+    def __init__(self, ttl=3600, capacite=100000, horloge=time.monotonic):
+        self._ttl = ttl
+        self._capacite = capacite
+        self._horloge = horloge
+        self._etats = OrderedDict()
+
+    def __len__(self):
+        return len(self._etats)
+
+    def __contains__(self, user_id):
+        return user_id in self._etats
+
+    def get(self, user_id):
+        return self._etats.get(user_id)
+
+    def acquerir(self, user_id):
+        """Active le verrou de l'utilisateur ; False s'il est déjà actif."""
+        maintenant = self._horloge()
+        etat = self._etats.get(user_id)
+        if etat is None:
+            etat = self._etats[user_id] = EtatUtilisateur()
+        elif etat.en_cours:
+            # Refus : l'entrée garde sa place, son horodatage ne change pas
+            etat.nb_refus += 1
+            return False
+        else:
+            self._etats.move_to_end(user_id)
+        etat.en_cours = True
+        etat.derniere_commande = maintenant
+        etat.nb_commandes += 1
+        # Éviction amortie : seules les entrées les plus anciennes sont examinées
+        self._purger(maintenant, limite=2)
+        return True
+
+    def liberer(self, user_id):
+        etat = self._etats.get(user_id)
+        if etat is not None:
+            etat.en_cours = False
+
+    def _purger(self, maintenant, limite=None):
+        etats = self._etats
+        evinces = 0
+        examines = 0
+        while etats and (limite is None or examines < limite):
+            examines += 1
+            user_id, etat = next(iter(etats.items()))
+            if (maintenant - etat.derniere_commande < self._ttl
+                    and len(etats) <= self._capacite):
+                break
+            if etat.en_cours:
+                # Une commande en cours n'est jamais évincée ; elle compte
+                # comme une activité pour garder la table triée
+                etat.derniere_commande = maintenant
+                etats.move_to_end(user_id)
+                continue
+            del etats[user_id]
+            evinces += 1
+        return evinces
+
+    def purger(self, maintenant=None):
+        """Évince toutes les entrées expirées et retourne leur nombre."""
+        if maintenant is None:
+            maintenant = self._horloge()
+        return self._purger(maintenant, limite=len(self._etats))
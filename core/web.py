@@ -0,0 +1,108 @@
+import hmac
+import json
+import logging
+import os
+
+from aiohttp import web
+
+from core.profiler import ProfilageEnCours
+
+logger = logging.getLogger(__name__)
+
+_ENTETES = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'X-Replit-ID': os.getenv('REPL_ID', 'Non défini'),
+    'X-Debug-Info': 'aiohttp server running',
+}
+
+
+@web.middleware
+async def _ajouter_entetes(request, handler):
+    response = await handler(request)
+    response.headers.update(_ENTETES)
+    return response
+
+
+def reponse_json(donnees, status=200):
+    return web.Response(text=json.dumps(donnees), status=status,
+                        content_type='application/json')
+
+
+def route_profil(profileur, jeton):
+    """Handler de `/profile?seconds=N[&format=summary]`.
+
+    Le serveur keep-alive étant public, la route exige `jeton` dans l'en-tête
+    `Authorization: Bearer ...` ou le paramètre `token`. Répond les piles au
+    format collapsed (flamegraph), ou le résumé des fonctions les plus
+    échantillonnées.
+    """
+
+    async def profil(request):
+        fourni = request.query.get('token', '')
+        entete = request.headers.get('Authorization', '')
+        if entete.startswith('Bearer '):
+            fourni = entete[len('Bearer '):]
+        if not hmac.compare_digest(fourni.encode(), jeton.encode()):
+            return reponse_json({'error': 'unauthorized'}, 401)
+        try:
+            duree = float(request.query.get('seconds', 10))
+        except ValueError:
+            return reponse_json({'error': 'invalid seconds'}, 400)
+        try:
+            resultat = await profileur.profiler(duree)
+        except ProfilageEnCours as e:
+            return reponse_json({'error': str(e)}, 409)
+        if request.query.get('format') == 'summary':
+            return web.Response(text=resultat.resume() + '\n')
+        return web.Response(text=resultat.collapsed())
+
+    return profil
+
+
+class ServeurKeepAlive:
+    """Serveur HTTP keep-alive exécuté sur la boucle asyncio du bot.
+
+    `etat` et `sante` sont des fonctions sans argument retournant les petits
+    dictionnaires servis sur `/` et `/health` ; `sante` peut ajouter une clé
+    `status` différente de 'healthy' pour signaler un problème (réponse 503).
+    """
+
+    def __init__(self, etat, sante, host='0.0.0.0', port=8080):
+        self._etat = etat
+        self._sante = sante
+        self.host = host
+        self.port = port
+        self.app = web.Application(middlewares=[_ajouter_entetes])
+        self.app.router.add_get('/', self._accueil)
+        self.app.router.add_get('/health', self._health)
+        self._runner = None
+
+    def ajouter_route(self, chemin, handler):
+        self.app.router.add_get(chemin, handler)
+
+    async def _accueil(self, request):
+        donnees = self._etat()
+        donnees['debug_info'] = {'host': request.host, 'url': str(request.url)}
+        return reponse_json(donnees)
+
+    async def _health(self, request):
+        donnees = self._sante()
+        status = 200 if donnees.get('status') == 'healthy' else 503
+        return reponse_json(donnees, status)
+
+    async def demarrer(self):
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("Serveur keep-alive démarré sur %s:%d", self.host,
+                    self.port)
+
+    async def arreter(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from core.backends import BackendMemoire, BackendRedis, ClientRedis
+from core.cooldown import CooldownRegistry
+from core.dedup import FenetreDedup
+from core.outbound import PlanificateurEnvois
+from core.prefilter import FiltrePrefixe
+from core.profiler import DUREE_MAX, ProfileurEchantillonnage
+from core.user_state import TableUtilisateurs
+from utils.fake_redis import FakeRedisServer
+
+RESULTS_DIR = 'test_results'
+BASELINE = os.path.join(RESULTS_DIR, 'bench_baseline.json')
+
+# Default matrix: concurrent users x catalog size
+USERS = (1, 100, 1000, 10000)
+CATALOG_SIZES = (60, 1000)
+STAGES = ('prefilter', 'handler', 'draw', 'reply')
+
+# Latency changes below these many ms are noise, whatever the ratio
+NOISE_MS = {'p50_ms': 0.05, 'p99_ms': 1.0}
+
+
+class FakeChannel:
+    """Channel stand-in: `send` only simulates the REST latency."""
+
+    def __init__(self, channel_id, latency):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, content=None, embed=None):
+        self.sent += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def timed(method, samples):
+    """Wrap a coroutine method so each call's duration lands in `samples`."""
+
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def make_catalogs(size):
+    return {
+        'atouts': [f'atout {i}' for i in range(size)],
+        'defauts': [f'defaut {i}' for i in range(size)],
+    }
+
+
+async def make_bot(catalogs, backend, redis_url):
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    bot.cooldowns = CooldownRegistry(catalogs)
+    if backend == 'redis':
+        bot.backend = BackendRedis(ClientRedis(redis_url), catalogs,
+                                   bot.cooldowns.duree)
+    else:
+        bot.backend = BackendMemoire(bot.cooldowns)
+    bot.envois = PlanificateurEnvois()
+    bot.command_lock = TableUtilisateurs()
+    bot.processed_messages = FenetreDedup()
+    await bot.load_extension('cogs.lucie')
+    return bot
+
+
+async def run_scenario(users, catalog_size, requests=5, players=1,
+                       backend='memory', redis_url=None, send_latency=0.0,
+                       profile_switch=None):
+    """Run `requests` lucie commands for each of `users` concurrent users.
+
+    Each user has its own guild and channel, so cooldowns never run out and
+    the per-channel send bucket is not the bottleneck. The real handler runs
+    on a stand-in context; only the Discord REST call is simulated. With
+    `profile_switch`, the production profiler samples the whole scenario
+    with that GIL switch interval, to measure its cost on the loop.
+    """
+    bot = await make_bot(make_catalogs(catalog_size), backend, redis_url)
+    samples = {stage: [] for stage in STAGES}
+    bot.backend.tirer_lot = timed(bot.backend.tirer_lot, samples['draw'])
+    bot.envois.envoyer = timed(bot.envois.envoyer, samples['reply'])
+    command = bot.get_command('lucie')
+    prefix_filter = FiltrePrefixe('!')
+    argument = str(players) if players > 1 else None
+    next_id = iter(range(1, users * requests + 1))
+
+    async def defer():
+        pass
+
+    async def user(user_id):
+        channel = FakeChannel(user_id, send_latency)
+        guild = SimpleNamespace(id=user_id)
+        author = SimpleNamespace(id=user_id, name=f'user{user_id}',
+                                 display_name=f'User {user_id}', bot=False)
+        for _ in range(requests):
+            message = SimpleNamespace(id=next(next_id), author=author,
+                                      content='!lucie')
+            start = time.perf_counter()
+            accepted = prefix_filter.accepte(message)
+            samples['prefilter'].append(time.perf_counter() - start)
+            if not accepted:
+                continue
+            ctx = SimpleNamespace(defer=defer, message=message, guild=guild,
+                                  channel=channel, author=author,
+                                  interaction=None)
+            start = time.perf_counter()
+            await command.callback(command.cog, ctx, joueurs=argument)
+            samples['handler'].append(time.perf_counter() - start)
+        return channel.sent
+
+    profiling = None
+    if profile_switch is not None:
+        profiler = ProfileurEchantillonnage(bascule=profile_switch)
+        profiling = asyncio.create_task(profiler.profiler(DUREE_MAX))
+        # Let the sampling thread start before timing
+        await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    sent = await asyncio.gather(*(user(i) for i in range(1, users + 1)))
+    elapsed = time.perf_counter() - start
+    if profiling is not None:
+        profiler.arreter()
+        profile = await profiling
+    await bot.envois.arreter()
+    await bot.backend.fermer()
+
+    commands_run = len(samples['handler'])
+    result = {
+        'users': users,
+        'catalog_size': catalog_size,
+        'players': players,
+        'backend': backend,
+        'commands': commands_run,
+        'replies': sum(sent),
+        'seconds': round(elapsed, 4),
+        'throughput': round(commands_run / elapsed, 1) if elapsed else 0.0,
+        'stages': {
+            stage: {
+                'p50_ms': round(percentile(values, 0.50) * 1000, 4),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 4),
+            }
+            for stage, values in samples.items()
+        },
+    }
+    if profiling is not None:
+        result['profile'] = {
+            'switch_interval_ms': profile_switch * 1000,
+            'samples': profile.nb_echantillons,
+            'sampler_cpu': round(profile.cpu_echantillonnage, 4),
+            'loop_lag_p99_ms': round(profile.retard_boucle_p99 * 1000, 3),
+        }
+    return result
+
+
+def best_of(runs):
+    """Merge repeated runs of one scenario, keeping each metric's best value.
+
+    Scheduling and GC noise only ever make a run slower, so the best of a
+    few runs is far more stable than any single one.
+    """
+    best = dict(runs[0])
+    best['throughput'] = max(run['throughput'] for run in runs)
+    best['stages'] = {
+        stage: {
+            metric: min(run['stages'][stage][metric] for run in runs)
+            for metric in latency
+        }
+        for stage, latency in runs[0]['stages'].items()
+    }
+    return best
+
+
+def scenario_name(result):
+    return (f"{result['backend']}-u{result['users']}-c{result['catalog_size']}"
+            f"-p{result['players']}")
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of `results` against `baseline`.
+
+    Throughput may not drop, and no stage's p50 or p99 may grow, by more
+    than `threshold` (a ratio). Scenarios missing from the baseline are
+    skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result['throughput'] < reference['throughput'] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {result['throughput']}/s < "
+                f"{reference['throughput']}/s")
+        for stage, latency in result['stages'].items():
+            before = reference['stages'].get(stage)
+            if before is None:
+                continue
+            for metric, noise in NOISE_MS.items():
+                value, ref = latency[metric], before[metric]
+                if value > ref * (1 + threshold) and value - ref > noise:
+                    regressions.append(f"{name}: {stage} {metric[:3]} "
+                                       f"{value} ms > {ref} ms")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<28}{'cmd/s':>10}" +
+          ''.join(f"{stage + ' p50/p99 ms':>28}" for stage in STAGES))
+    for name, result in results.items():
+        cells = ''.join(
+            f"{result['stages'][stage]['p50_ms']:>13.3f} /"
+            f"{result['stages'][stage]['p99_ms']:>12.3f}" for stage in STAGES)
+        print(f"{name:<28}{result['throughput']:>10.0f}{cells}")
+
+
+async def run_bench(args):
+    redis_server = None
+    redis_url = args.redis_url
+    if args.backend == 'redis' and redis_url is None:
+        redis_server = FakeRedisServer()
+        redis_url = await redis_server.start()
+    results = {}
+    try:
+        # Warm-up: imports, extension loading and first-call caches
+        await run_scenario(10, args.catalog_sizes[0], 1, args.players,
+                           args.backend, redis_url)
+        for users in args.users:
+            for catalog_size in args.catalog_sizes:
+                runs = []
+                for _ in range(args.repeat):
+                    runs.append(await run_scenario(
+                        users, catalog_size, args.requests, args.players,
+                        args.backend, redis_url, args.send_latency,
+                        args.profile_switch_interval))
+                    if redis_server is not None:
+                        # The fake server keeps a log of every command
+                        redis_server.commands.clear()
+                result = best_of(runs)
+                results[scenario_name(result)] = result
+    finally:
+        if redis_server is not None:
+            await redis_server.stop()
+    return results
+
+
+def main(argv=None):
+    """Run the benchmark matrix, store the report and check the baseline"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=USERS)
+    parser.add_argument('--catalog-sizes', type=int, nargs='+',
+                        default=CATALOG_SIZES)
+    parser.add_argument('--requests', type=int, default=5,
+                        help="commands per user")
+    parser.add_argument('--players', type=int, default=1,
+                        help="players per draw (!lucie N)")
+    parser.add_argument('--backend', choices=('memory', 'redis'),
+                        default='memory')
+    parser.add_argument('--redis-url',
+                        help="real server (default: in-process fake)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per scenario, best values kept")
+    parser.add_argument('--send-latency', type=float, default=0.0,
+                        help="simulated Discord REST latency, in seconds")
+    parser.add_argument('--profile-switch-interval', type=float,
+                        help="profile each run with this GIL switch "
+                        "interval, in seconds")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed regression ratio")
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    # The handler logs every command at INFO: keep I/O out of the numbers
+    logging.disable(logging.INFO)
+    results = asyncio.run(run_bench(args))
+    print_table(results)
+
+    if not os.path.exists(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report = {
+        'timestamp': timestamp,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'scenarios': results,
+    }
+    report_file = os.path.join(RESULTS_DIR, f'bench_{timestamp}.json')
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report generated: {report_file}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (use --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['scenarios']
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
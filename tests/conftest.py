@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 import discord.ext.test as dpytest
 import discord
@@ -5,6 +7,54 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv
 
+from core.backends import BackendMemoire
+from core.catalogues import SourceCatalogues
+from core.cooldown import CooldownRegistry
+from core.dedup import FenetreDedup
+from core.outbound import PlanificateurEnvois
+from core.user_state import TableUtilisateurs
+
+
+class FakeClock:
+    """Horloge injectable (`horloge=`), avancée à la main par les tests."""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def creer_bot():
+    """Bot sans connexion portant l'état du processus lu par les cogs."""
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    bot.cooldowns = CooldownRegistry(
+        SourceCatalogues('data/catalogues').charger())
+    bot.backend = BackendMemoire(bot.cooldowns)
+    bot.envois = PlanificateurEnvois()
+    bot.command_lock = TableUtilisateurs()
+    bot.processed_messages = FenetreDedup()
+    return bot
+
+
+async def attendre(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition never met")
+
+
+async def pas_d_attente(shard_id, *, initial=False):
+    """before_identify_hook sans les 5 s d'attente de discord.py."""
+
+
+def nb_resultats(serveur):
+    """Tirages répondus par le bot au serveur Discord simulé."""
+    return sum(message['content'].count('Résultat du tirage')
+               for message in serveur.sent_messages())
+
+
 @pytest.fixture
 def bot():
     """Create a bot instance for testing"""
@@ -30,8 +80,12 @@ def test_member():
     return dpytest.backend.make_member("TestUser")
 
 @pytest.fixture(autouse=True)
-def setup_teardown():
+def setup_teardown(request):
     """Setup and teardown for each test"""
+    # Les tests unitaires sans bot n'ont pas besoin du backend dpytest
+    if 'bot' not in request.fixturenames:
+        yield
+        return
     dpytest.configure()
     yield
     dpytest.empty_queue()
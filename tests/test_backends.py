@@ -0,0 +1,264 @@
+import asyncio
+import shutil
+import socket
+import subprocess
+from collections import Counter
+
+import pytest
+import pytest_asyncio
+
+from core.backends import (BackendMemoire, BackendRedis, ClientRedis,
+                           ErreurRedis)
+from core.cooldown import CooldownEpuise, CooldownRegistry
+from utils.fake_redis import FakeRedisServer
+
+CATALOGUES = {'atouts': ['a1', 'a2', 'a3'], 'defauts': ['d1', 'd2']}
+
+
+@pytest_asyncio.fixture
+async def redis_url():
+    server = FakeRedisServer()
+    url = await server.start()
+    yield url, server
+    await server.stop()
+
+
+@pytest_asyncio.fixture(params=['fake', 'redis-server'])
+async def vrai_script(request):
+    """URL d'un serveur exécutant le tirage : le miroir Python du script, ou
+    le vrai script Lua si redis-server est installé."""
+    if request.param == 'fake':
+        server = FakeRedisServer()
+        yield await server.start()
+        await server.stop()
+        return
+    executable = shutil.which('redis-server')
+    if executable is None:
+        pytest.skip("redis-server non installé")
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    processus = subprocess.Popen(
+        [executable, '--port', str(port), '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                _, ecrivain = await asyncio.open_connection('127.0.0.1', port)
+                ecrivain.close()
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        yield f'redis://127.0.0.1:{port}/0'
+    finally:
+        processus.terminate()
+        processus.wait()
+
+
+class TestBackendMemoire:
+    @pytest.mark.asyncio
+    async def test_draw_is_all_or_nothing(self):
+        """Test that nothing is reserved when one table is exhausted"""
+        backend = BackendMemoire(CooldownRegistry(CATALOGUES))
+        for _ in range(2):
+            await backend.tirer(1, None, ('atouts', 'defauts'))
+        with pytest.raises(CooldownEpuise):
+            await backend.tirer(1, None, ('atouts', 'defauts'))
+        # Le troisième atout n'a pas été consommé par l'échec
+        assert len(backend.registry.pools(1)['atouts']) == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_draw_gives_distinct_pairs(self):
+        """Test that a batch draw reserves distinct items in every table"""
+        backend = BackendMemoire(CooldownRegistry(CATALOGUES))
+        lot = await backend.tirer_lot(1, None, ('atouts', 'defauts'), 2)
+        assert len(set(lot['atouts'])) == 2
+        assert sorted(lot['defauts']) == ['d1', 'd2']
+        with pytest.raises(CooldownEpuise):
+            await backend.tirer_lot(1, None, ('atouts', ), 2)
+        with pytest.raises(ValueError):
+            await backend.tirer_lot(2, None, ('atouts', ), 4)
+
+
+class TestBackendRedis:
+    @pytest.mark.asyncio
+    async def test_processes_share_one_pool(self, redis_url):
+        """Test that two backends never hand out the same item"""
+        url, server = redis_url
+        backends = [
+            BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+            for _ in range(2)
+        ]
+        tirages = []
+        for i in range(2):
+            tirages.append(await backends[i].tirer(1, None,
+                                                   ('atouts', 'defauts')))
+        assert {t['defauts'] for t in tirages} == {'d1', 'd2'}
+        assert len({t['atouts'] for t in tirages}) == 2
+        with pytest.raises(CooldownEpuise) as exc:
+            await backends[0].tirer(1, None, ('atouts', 'defauts'))
+        assert exc.value.temps_restant > 3500
+
+        # Le refus suivant est servi par le cache local, sans aller-retour
+        nb_commandes = len(server.commands)
+        with pytest.raises(CooldownEpuise):
+            await backends[0].tirer(1, None, ('atouts', 'defauts'))
+        assert len(server.commands) == nb_commandes
+        for backend in backends:
+            await backend.fermer()
+
+    @pytest.mark.asyncio
+    async def test_one_round_trip_with_shared_dedup(self, redis_url):
+        """Test the single EVALSHA per draw and cross-process dedup"""
+        url, server = redis_url
+        backend = BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+        assert await backend.tirer(1, None, ('atouts', ), message_id=42)
+        nb_commandes = len(server.commands)
+        autre = BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+        assert await autre.tirer(1, None, ('atouts', ), message_id=42) is None
+        assert len(server.commands) == nb_commandes + 1
+        assert server.commands[-1][0] == 'EVALSHA'
+        await backend.fermer()
+        await autre.fermer()
+
+    @pytest.mark.asyncio
+    async def test_client_pipelines_commands(self, redis_url):
+        """Test that the client sends several commands in one round-trip"""
+        url, server = redis_url
+        client = ClientRedis(url)
+        reponses = await client.pipeline([('SET', 'k', 'v'), ('GET', 'k'),
+                                          ('GET', 'absent')])
+        assert reponses == ['OK', 'v', None]
+        await client.fermer()
+
+    @pytest.mark.asyncio
+    async def test_failed_auth_leaves_no_connection(self):
+        """Test that nothing is sent on a connection whose AUTH failed"""
+        server = FakeRedisServer(password='s3cret')
+        url = await server.start()
+        client = ClientRedis(url.replace('redis://', 'redis://:faux@'))
+        for _ in range(2):
+            with pytest.raises(ErreurRedis):
+                await client.executer('GET', 'k')
+            assert client._ecrivain is None
+        assert [c[0] for c in server.commands] == ['AUTH', 'AUTH']
+        await client.fermer()
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_close_fails_pending_replies(self):
+        """Test that fermer() wakes up callers waiting for a reply"""
+        async def muet(lecteur, ecrivain):
+            await lecteur.read()
+            ecrivain.close()
+
+        server = await asyncio.start_server(muet, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = ClientRedis(f'redis://127.0.0.1:{port}/0')
+        attente = asyncio.create_task(client.executer('GET', 'k'))
+        await asyncio.sleep(0.05)
+        await client.fermer()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(attente, 1)
+        server.close()
+        await server.wait_closed()
+
+    @pytest.mark.asyncio
+    async def test_lost_connection_is_closed(self, redis_url):
+        """Test that a read error closes the socket before forgetting it"""
+        url, server = redis_url
+        client = ClientRedis(url)
+        await client.executer('PING')
+        ecrivain = client._ecrivain
+        # Réponse illisible : la boucle de lecture s'arrête
+        client._lecteur.feed_data(b'?\r\n')
+        with pytest.raises(ConnectionError):
+            await client.executer('PING')
+        assert ecrivain.is_closing()
+        assert client._ecrivain is None
+        await client.fermer()
+
+    @pytest.mark.asyncio
+    async def test_batch_draw_in_one_round_trip(self, redis_url):
+        """Test that a batch draw is a single all-or-nothing EVALSHA"""
+        url, server = redis_url
+        backend = BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+        lot = await backend.tirer_lot(1, None, ('atouts', 'defauts'), 2)
+        assert len(set(lot['atouts'])) == 2
+        assert sorted(lot['defauts']) == ['d1', 'd2']
+        nb_commandes = len(server.commands)
+        # Plus de joueurs que d'éléments : refusé sans aller-retour
+        with pytest.raises(ValueError):
+            await backend.tirer_lot(2, None, ('atouts', 'defauts'), 3)
+        assert len(server.commands) == nb_commandes
+        autre = await backend.tirer_lot(2, None, ('atouts', 'defauts'), 2)
+        assert sorted(autre['defauts']) == ['d1', 'd2']
+        with pytest.raises(CooldownEpuise) as exc:
+            await backend.tirer_lot(1, None, ('atouts', ), 2)
+        assert exc.value.temps_restant > 3500
+        await backend.fermer()
+
+    @pytest.mark.asyncio
+    async def test_refused_batch_does_not_block_single_draw(self, redis_url):
+        """Test that a refused batch leaves smaller draws to the server"""
+        url, server = redis_url
+        backend = BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+        await backend.tirer_lot(1, None, ('atouts', ), 1)
+        # 2 atouts libres : un lot de 3 est refusé...
+        with pytest.raises(CooldownEpuise):
+            await backend.tirer_lot(1, None, ('atouts', ), 3)
+        # ... mais un tirage simple passe encore
+        seul = await backend.tirer_lot(1, None, ('atouts', ), 1)
+        assert len(seul['atouts']) == 1
+        # Lot au moins aussi grand que le refus : servi par le cache
+        nb_commandes = len(server.commands)
+        with pytest.raises(CooldownEpuise):
+            await backend.tirer_lot(1, None, ('atouts', ), 3)
+        assert len(server.commands) == nb_commandes
+        await backend.fermer()
+
+
+    @pytest.mark.asyncio
+    async def test_exhaustion_cache_evicts_least_recent(self, redis_url):
+        """Test that a full exhaustion cache forgets one pool, not all"""
+        url, server = redis_url
+        backend = BackendRedis(ClientRedis(url), CATALOGUES, duree=3600)
+        backend.TAILLE_EPUISES = 2
+        for guild in (1, 2, 3):
+            await backend.tirer_lot(guild, None, ('defauts', ), 2)
+            with pytest.raises(CooldownEpuise):
+                await backend.tirer_lot(guild, None, ('defauts', ), 1)
+        nb_commandes = len(server.commands)
+        for guild in (2, 3):
+            with pytest.raises(CooldownEpuise):
+                await backend.tirer_lot(guild, None, ('defauts', ), 1)
+        assert len(server.commands) == nb_commandes
+        # Le plus ancien a été oublié : de nouveau demandé au serveur
+        with pytest.raises(CooldownEpuise):
+            await backend.tirer_lot(1, None, ('defauts', ), 1)
+        assert len(server.commands) == nb_commandes + 1
+        await backend.fermer()
+
+class TestScriptTirage:
+    @pytest.mark.asyncio
+    async def test_draw_stays_uniform_under_heavy_cooldown(self, vrai_script):
+        """Test that the free items are drawn uniformly when most are busy"""
+        catalogues = {'atouts': [f'a{i}' for i in range(60)]}
+        client = ClientRedis(vrai_script)
+        backend = BackendRedis(client, catalogues, duree=3600)
+        cle = backend._cle('1', 'atouts',
+                           backend._catalogues.catalogue(1, 'atouts'))
+        # 50 éléments sur 60 en cooldown : souvent, tous les candidats tirés
+        # par le client sont pris
+        await client.executer('DEL', cle)
+        for indice in range(50):
+            await client.executer('ZADD', cle, 2**50, indice)
+        comptes = Counter()
+        for _ in range(3000):
+            tirage = await backend.tirer(1, None, ('atouts', ))
+            comptes[tirage['atouts']] += 1
+            await client.executer('ZREM', cle,
+                                  catalogues['atouts'].index(tirage['atouts']))
+        assert set(comptes) == {f'a{i}' for i in range(50, 60)}
+        assert all(200 < nombre < 400 for nombre in comptes.values())
+        await backend.fermer()
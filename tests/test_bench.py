@@ -0,0 +1,51 @@
+import pytest
+
+from run_bench import compare, run_scenario, scenario_name
+from utils.fake_redis import FakeRedisServer
+
+
+class TestBench:
+    @pytest.mark.asyncio
+    async def test_scenario_runs_real_handler(self):
+        """Test that every simulated command is drawn and answered"""
+        result = await run_scenario(users=3, catalog_size=10, requests=2,
+                                    players=2)
+        assert result['commands'] == 6
+        assert result['replies'] == 6
+        assert set(result['stages']) == {'prefilter', 'handler', 'draw',
+                                         'reply'}
+        assert scenario_name(result) == 'memory-u3-c10-p2'
+
+    @pytest.mark.asyncio
+    async def test_scenario_with_redis_backend(self):
+        """Test the harness against the shared Redis backend"""
+        server = FakeRedisServer()
+        url = await server.start()
+        result = await run_scenario(users=2, catalog_size=5, requests=2,
+                                    backend='redis', redis_url=url)
+        await server.stop()
+        assert result['replies'] == 4
+
+    def test_regressions_against_baseline(self):
+        """Test the throughput and p99 thresholds"""
+        baseline = {
+            's': {
+                'throughput': 1000.0,
+                'stages': {'draw': {'p50_ms': 0.1, 'p99_ms': 1.0}},
+            }
+        }
+        stable = {
+            's': {
+                'throughput': 900.0,
+                'stages': {'draw': {'p50_ms': 0.1, 'p99_ms': 1.2}},
+            }
+        }
+        assert compare(stable, baseline, 0.25) == []
+        slower = {
+            's': {
+                'throughput': 500.0,
+                'stages': {'draw': {'p50_ms': 0.5, 'p99_ms': 3.0}},
+            }
+        }
+        assert len(compare(slower, baseline, 0.25)) == 3
+        assert compare({'nouveau': slower['s']}, baseline, 0.25) == []
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from core.cache import memoire_residente, options_cache, statistiques_cache
+
+
+class TestProfilsCache:
+    def test_default_profile_keeps_library_defaults(self):
+        """Test that the default profile passes no cache options"""
+        assert options_cache('default') == {}
+        assert options_cache('default', taille_messages=200) == {
+            'max_messages': 200
+        }
+
+    def test_low_memory_profile(self):
+        """Test that the low-memory profile disables message and member caches"""
+        options = options_cache('low_memory')
+        assert options['max_messages'] is None
+        assert options['member_cache_flags'].value == 0
+        assert options['chunk_guilds_at_startup'] is False
+        # 0 désactive explicitement le cache de messages
+        assert options_cache('default', taille_messages=0)['max_messages'] is None
+
+    def test_low_memory_options_are_accepted(self):
+        """Test that discord.py accepts the low-memory options"""
+        client = discord.Client(intents=discord.Intents.none(),
+                                **options_cache('low_memory'))
+        assert client._connection.max_messages is None
+
+    def test_unknown_profile(self):
+        """Test that an unknown profile is rejected"""
+        with pytest.raises(ValueError):
+            options_cache('minuscule')
+
+
+class TestStatistiquesCache:
+    def test_counts_cached_objects(self):
+        """Test that cache sizes are summed over guilds"""
+        guilds = [
+            SimpleNamespace(channels=[1, 2], members=[1]),
+            SimpleNamespace(channels=[3], members=[2, 3]),
+        ]
+        bot = SimpleNamespace(guilds=guilds, users=[1, 2, 3],
+                              cached_messages=[], emojis=[])
+        stats = statistiques_cache(bot)
+        assert stats['guilds'] == 2
+        assert stats['channels'] == 3
+        assert stats['members'] == 3
+        assert stats['users'] == 3
+        assert stats['messages'] == 0
+
+    def test_resident_memory(self):
+        """Test that the process RSS is reported"""
+        assert memoire_residente() > 1024 * 1024
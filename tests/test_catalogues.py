@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+from core.catalogues import Catalogue, JeuCatalogues, SourceCatalogues
+from core.cooldown import CooldownEpuise, CooldownRegistry
+from tests.conftest import FakeClock
+
+
+def ecrire(chemin, lignes):
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lignes) + '\n')
+
+
+class TestCatalogue:
+    def test_compiled_catalogue(self):
+        """Test that items are deduplicated, interned and indexed"""
+        texte = ''.join(['atout ', 'rare'])
+        catalogue = Catalogue([texte, 'autre', 'atout rare'])
+        assert catalogue.items == ('atout rare', 'autre')
+        assert catalogue.items[0] is sys.intern(texte)
+        assert catalogue.indices == {'atout rare': 0, 'autre': 1}
+        assert Catalogue(['autre', 'atout rare']).empreinte != catalogue.empreinte
+
+    def test_guild_overrides(self):
+        """Test that a guild only overrides the tables it defines"""
+        jeu = JeuCatalogues({'atouts': ['a'], 'defauts': ['x']},
+                            {'42': {'atouts': ['b']}})
+        assert jeu.catalogue(42, 'atouts').items == ('b', )
+        assert jeu.catalogue(42, 'defauts').items == ('x', )
+        assert jeu.catalogue(7, 'atouts').items == ('a', )
+
+    def test_registry_uses_guild_catalogues(self):
+        """Test that pools are built from the guild's own catalogue"""
+        registry = CooldownRegistry(
+            JeuCatalogues({'atouts': ['a']}, {42: {'atouts': ['b']}}),
+            horloge=FakeClock())
+        assert registry.tirer('atouts', 42) == 'b'
+        assert registry.tirer('atouts', 7) == 'a'
+        # Les pools partagent le catalogue compilé au lieu d'en copier un
+        assert (registry.pools(7)['atouts'].catalogue is
+                registry.pools(8)['atouts'].catalogue)
+
+    def test_unchanged_pools_are_kept(self):
+        """Test that a reload only rebuilds pools whose catalogue changed"""
+        registry = CooldownRegistry({'atouts': ['a'], 'defauts': ['x']},
+                                    horloge=FakeClock())
+        pools = registry.pools(1)
+        pool_defauts = pools['defauts']
+        registry.tirer('atouts', 1)
+        modifies = registry.remplacer_catalogues(
+            JeuCatalogues({'atouts': ['a', 'b'], 'defauts': ['x']}))
+        assert modifies == ['atouts']
+        assert registry.pools(1)['defauts'] is pool_defauts
+        assert registry.tirer('atouts', 1) == 'b'
+        with pytest.raises(CooldownEpuise):
+            registry.tirer('atouts', 1)
+
+
+class TestSourceCatalogues:
+    def test_loads_directory(self, tmp_path):
+        """Test that global and per-guild files are loaded"""
+        ecrire(str(tmp_path / 'atouts.txt'), ['# commentaire', 'a', '', 'b'])
+        ecrire(str(tmp_path / '42' / 'atouts.txt'), ['c'])
+        jeu = SourceCatalogues(str(tmp_path)).charger()
+        assert jeu.globaux['atouts'].items == ('a', 'b')
+        assert jeu.catalogue(42, 'atouts').items == ('c', )
+
+    def test_detects_changes(self, tmp_path):
+        """Test that only modified directories are reloaded"""
+        chemin = str(tmp_path / 'atouts.txt')
+        ecrire(chemin, ['a'])
+        source = SourceCatalogues(str(tmp_path))
+        source.charger()
+        assert source.verifier() is None
+        ecrire(chemin, ['a', 'b'])
+        jeu = source.verifier()
+        assert jeu.globaux['atouts'].items == ('a', 'b')
+        assert source.verifier() is None
+
+    def test_invalid_files_are_ignored(self, tmp_path):
+        """Test that an invalid catalogue keeps the previous one in place"""
+        ecrire(str(tmp_path / 'atouts.txt'), ['a'])
+        source = SourceCatalogues(str(tmp_path))
+        source.charger()
+        ecrire(str(tmp_path / 'atouts.txt'), ['# vide'])
+        assert source.verifier() is None
+        ecrire(str(tmp_path / '42' / 'defauts.txt'), ['x'])
+        assert source.verifier() is None
+        with pytest.raises(ValueError):
+            source.charger()
+
+    def test_repository_catalogues(self):
+        """Test that the shipped catalogues load"""
+        jeu = SourceCatalogues('data/catalogues').charger()
+        assert len(jeu.globaux['atouts']) == 60
+        assert len(jeu.globaux['defauts']) == 60
@@ -0,0 +1,35 @@
+import os
+
+from cluster import env_worker, fusionner_metriques, repartir_shards
+
+
+class TestCluster:
+    def test_shards_are_split_in_contiguous_ranges(self):
+        """Test the shard distribution across clusters"""
+        assert repartir_shards(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+        assert repartir_shards(2, 4) == [[0], [1]]
+
+    def test_metrics_are_merged_with_cluster_label(self):
+        """Test that worker expositions are merged per metric family"""
+        texte = ('# HELP bot_total Test\n'
+                 '# TYPE bot_total counter\n'
+                 'bot_total 3\n'
+                 'bot_seconds_bucket{le="+Inf"} 2\n')
+        fusion = fusionner_metriques({'0': texte, '1': texte})
+        assert fusion.count('# HELP bot_total Test') == 1
+        assert 'bot_total{cluster="0"} 3' in fusion
+        assert 'bot_total{cluster="1"} 3' in fusion
+        assert 'bot_seconds_bucket{cluster="1",le="+Inf"} 2' in fusion
+
+    def test_workers_get_their_own_files(self):
+        """Test that two workers never share a log, database or trace file"""
+        env = env_worker(1, [2, 3], 4, 8082,
+                         {'COOLDOWN_DB': 'data/cooldowns.db', 'TRACE_FILE': ''})
+        assert env['SHARD_IDS'] == '2,3'
+        assert env['LOG_FILE'] == 'bot.1.log'
+        assert env['COOLDOWN_DB'] == os.path.join('data', 'cooldowns.1.db')
+        # Désactivé : reste désactivé
+        assert env['TRACE_FILE'] == ''
+        assert env['GATEWAY_TRACE'] == ''
+        env = env_worker(0, [0], 1, 8081, {'GATEWAY_TRACE': 'trace.jsonl.gz'})
+        assert env['GATEWAY_TRACE'] == 'trace.0.jsonl.gz'
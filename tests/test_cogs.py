@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from cogs.lucie import MAX_JOUEURS, embed_tirage, lire_joueurs
+from tests.conftest import creer_bot
+
+
+class TestExtensions:
+    @pytest.mark.asyncio
+    async def test_extensions_register_commands(self):
+        """Test that the command modules load as extensions"""
+        bot = creer_bot()
+        await bot.load_extension('cogs.lucie')
+        await bot.load_extension('cogs.admin')
+        assert {'lucie', 'cache', 'reload', 'profile'} <= {
+            c.name for c in bot.commands}
+        assert bot.tree.get_command('lucie') is not None
+
+    @pytest.mark.asyncio
+    async def test_reload_keeps_process_state(self):
+        """Test that a reload swaps the code but keeps cooldowns"""
+        bot = creer_bot()
+        await bot.load_extension('cogs.lucie')
+        commande = bot.get_command('lucie')
+        tirage = await bot.backend.tirer(1, 1, ('atouts', 'defauts'))
+        await bot.reload_extension('cogs.lucie')
+        assert bot.get_command('lucie') is not commande
+        assert bot.cooldowns.nb_en_cooldown() == 2
+        pools = bot.cooldowns.pools(1)
+        assert tirage['atouts'] in dict(pools['atouts'].cooldowns())
+
+
+class TestTirageGroupe:
+    def test_players_from_count_or_mentions(self):
+        """Test the parsing of `!lucie N` and `!lucie @a @b`"""
+        assert lire_joueurs(None) == [None]
+        assert lire_joueurs(' 3 ') == [None] * 3
+        assert lire_joueurs('<@1> <@!2> <@1>') == ['<@1>', '<@2>']
+        for texte in ('0', str(MAX_JOUEURS + 1), 'trois', '<@1> et moi'):
+            with pytest.raises(ValueError):
+                lire_joueurs(texte)
+
+    def test_oversized_or_unicode_count_is_refused(self):
+        """Test that a huge count allocates nothing and '²' is a usage error"""
+        debut = time.perf_counter()
+        for texte in ('50000000', '9' * 100000):
+            with pytest.raises(ValueError, match='de 1 à'):
+                lire_joueurs(texte)
+        assert time.perf_counter() - debut < 0.05
+        with pytest.raises(ValueError, match='Usage'):
+            lire_joueurs('²')
+        assert lire_joueurs('007') == [None] * 7
+
+    @pytest.mark.asyncio
+    async def test_batch_draw_fits_one_embed(self):
+        """Test that a full party is drawn once and rendered in one embed"""
+        bot = creer_bot()
+        joueurs = lire_joueurs(str(MAX_JOUEURS))
+        tirage = await bot.backend.tirer_lot(1, 1, ('atouts', 'defauts'),
+                                             len(joueurs))
+        embed = embed_tirage(joueurs, tirage)
+        assert len(embed.fields) == MAX_JOUEURS
+        assert len(embed) <= 6000
+        assert bot.cooldowns.nb_en_cooldown() == 2 * MAX_JOUEURS
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from core.cooldown import CooldownEpuise, CooldownPool, CooldownRegistry
+from tests.conftest import FakeClock
+
+
+class TestCooldownPool:
+    def test_draws_are_unique_until_exhausted(self):
+        """Test that every item is drawn once before the pool is exhausted"""
+        clock = FakeClock()
+        pool = CooldownPool(range(50), duree=60, horloge=clock,
+                            rng=random.Random(1))
+        tirages = [pool.tirer() for _ in range(50)]
+        assert sorted(tirages) == list(range(50))
+        assert len(pool) == 0
+        assert pool.en_cooldown() == 50
+
+    def test_exhausted_pool_reports_wait(self):
+        """Test the wait message when every item is in cooldown"""
+        clock = FakeClock()
+        pool = CooldownPool(['a', 'b'], duree=3600, horloge=clock)
+        pool.tirer()
+        clock.now += 100
+        pool.tirer()
+        clock.now += 60
+        with pytest.raises(CooldownEpuise) as exc:
+            pool.tirer()
+        assert exc.value.temps_restant == 3440
+        assert "57m 20s" in str(exc.value)
+        assert isinstance(exc.value, ValueError)
+
+    def test_items_come_back_after_expiry(self):
+        """Test that expired items are available again"""
+        clock = FakeClock()
+        pool = CooldownPool(['a', 'b', 'c'], duree=10, horloge=clock)
+        premier = pool.tirer()
+        clock.now += 5
+        pool.tirer()
+        pool.tirer()
+        clock.now += 5
+        assert pool.tirer() == premier
+        # Les trois éléments sont pris ; les deux tirés à t=5 expirent à t=15
+        assert len(pool) == 0
+        assert pool.temps_restant() == 5
+        assert pool.temps_restant(nombre=3) == 10
+
+    def test_expired_entries_are_not_counted(self):
+        """Test that the cooldown count of an idle pool drops on expiry"""
+        clock = FakeClock()
+        registry = CooldownRegistry({'atouts': ['a', 'b']}, duree=10,
+                                    horloge=clock)
+        registry.tirer('atouts', 1)
+        registry.tirer('atouts', 1)
+        assert registry.nb_en_cooldown() == 2
+        # Aucun tirage depuis : la jauge ne doit pas rester à 2
+        clock.now += 10
+        assert registry.nb_en_cooldown() == 0
+        assert len(registry.pools(1)['atouts']) == 2
+
+    def test_duplicates_share_cooldown(self):
+        """Test that duplicate catalog entries count as one item"""
+        pool = CooldownPool(['a', 'a', 'b'], horloge=FakeClock())
+        assert pool.taille_catalogue == 2
+        assert {pool.tirer(), pool.tirer()} == {'a', 'b'}
+
+    def test_batch_draw_is_distinct_and_waits_for_enough_items(self):
+        """Test that a batch draw takes distinct items or reserves none"""
+        clock = FakeClock()
+        pool = CooldownPool(range(5), duree=100, horloge=clock,
+                            rng=random.Random(2))
+        tirage = pool.tirer_plusieurs(3)
+        assert len(set(tirage)) == 3
+        clock.now += 10
+        pool.tirer()
+        with pytest.raises(CooldownEpuise) as exc:
+            pool.tirer_plusieurs(3)
+        # Deux éléments manquent : il faut attendre la deuxième expiration
+        assert exc.value.temps_restant == 90
+        assert len(pool) == 1
+
+
+class TestCooldownRegistry:
+    def test_guilds_are_isolated(self):
+        """Test that each guild gets its own pools"""
+        registry = CooldownRegistry({'atouts': ['a']}, horloge=FakeClock())
+        assert registry.tirer('atouts', 1) == 'a'
+        assert registry.tirer('atouts', 2) == 'a'
+        with pytest.raises(CooldownEpuise):
+            registry.tirer('atouts', 1)
+        assert len(registry) == 2
+
+    def test_channel_scope(self):
+        """Test the optional per-channel scope"""
+        registry = CooldownRegistry({'atouts': ['a']}, par_salon=True,
+                                    horloge=FakeClock())
+        registry.tirer('atouts', 1, 10)
+        registry.tirer('atouts', 1, 11)
+        assert len(registry) == 2
+
+    def test_idle_pools_are_dropped(self):
+        """Test that idle pools are dropped once their cooldowns expired"""
+        clock = FakeClock()
+        registry = CooldownRegistry({'atouts': ['a', 'b']}, duree=60,
+                                    ttl_inactivite=30, horloge=clock)
+        registry.tirer('atouts', 1)
+        registry.tirer('atouts', 2)
+        clock.now += 45
+        # Le ttl est relevé à la durée du cooldown : rien n'est supprimé
+        assert registry.purger_inactifs() == 0
+        clock.now += 20
+        registry.tirer('atouts', 3)
+        assert len(registry) == 1
+
+    def test_replacing_catalogues_keeps_cooldowns(self):
+        """Test that items still present keep their cooldown after a reload"""
+        clock = FakeClock()
+        registry = CooldownRegistry({'atouts': ['a'], 'defauts': ['x']},
+                                    duree=60, horloge=clock)
+        assert registry.tirer('atouts', 1) == 'a'
+        registry.tirer('defauts', 1)
+        modifies = registry.remplacer_catalogues({
+            'atouts': ['a', 'b'],
+            'defauts': ['x']
+        })
+        assert modifies == ['atouts']
+        # 'a' reste en cooldown, 'b' est immédiatement disponible
+        assert registry.tirer('atouts', 1) == 'b'
+        with pytest.raises(CooldownEpuise):
+            registry.tirer('atouts', 1)
+        with pytest.raises(CooldownEpuise):
+            registry.tirer('defauts', 1)
+        clock.now += 61
+        assert registry.tirer('atouts', 1) in ('a', 'b')
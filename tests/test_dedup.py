@@ -0,0 +1,33 @@
+from core.dedup import FenetreDedup
+from tests.conftest import FakeClock
+
+
+class TestFenetreDedup:
+    def test_duplicates_within_window(self):
+        """Test that a message seen within the window is a hit"""
+        clock = FakeClock()
+        dedup = FenetreDedup(fenetre=10, capacite=100, horloge=clock)
+        assert not dedup.vu(1)
+        clock.now += 9
+        assert not dedup.vu(2)
+        clock.now += 9
+        # Rotation passée : 1 et 2 restent dans la génération précédente
+        assert dedup.vu(1)
+        assert dedup.vu(2)
+        assert (dedup.hits, dedup.misses) == (2, 2)
+
+    def test_entries_expire(self):
+        """Test that old entries are forgotten after the window"""
+        clock = FakeClock()
+        dedup = FenetreDedup(fenetre=10, capacite=100, horloge=clock)
+        dedup.vu(1)
+        clock.now += 25
+        assert not dedup.vu(1)
+
+    def test_memory_is_bounded(self):
+        """Test that the structure never exceeds its capacity"""
+        dedup = FenetreDedup(fenetre=3600, capacite=100, horloge=FakeClock())
+        for message_id in range(10000):
+            dedup.vu(message_id)
+            assert len(dedup) <= 100
+        assert dedup.vu(9999)
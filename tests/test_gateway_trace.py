@@ -0,0 +1,168 @@
+import asyncio
+import gzip
+import json
+import os
+
+import discord
+import pytest
+from discord.ext import commands
+
+from core.endpoints import configurer_endpoints
+from core.gateway_trace import EnregistreurGateway, lire_trace, rediger
+from core.reconnect import executer_avec_reprise
+from tests.conftest import (FakeClock, attendre, creer_bot, nb_resultats,
+                            pas_d_attente)
+from utils.mock_discord import FakeDiscordServer
+from utils.replay_trace import (isolate_environment, load_trace,
+                                 prepare_server, replay)
+
+
+def payload(evenement, donnees, op=0):
+    return json.dumps({'op': op, 't': evenement, 's': 1, 'd': donnees})
+
+
+async def connecter(enregistreur=None):
+    intents = discord.Intents.none()
+    intents.guilds = intents.guild_messages = intents.message_content = True
+    client = commands.Bot(command_prefix='!', intents=intents,
+                          guild_ready_timeout=0.1,
+                          enable_debug_events=enregistreur is not None)
+    client.before_identify_hook = pas_d_attente
+    etat = creer_bot()
+    for nom in ('cooldowns', 'backend', 'envois', 'command_lock',
+                'processed_messages'):
+        setattr(client, nom, getattr(etat, nom))
+    await client.load_extension('cogs.lucie')
+    if enregistreur is not None:
+        client.add_listener(enregistreur.enregistrer, 'on_socket_raw_receive')
+    arret = asyncio.Event()
+    tache = asyncio.create_task(executer_avec_reprise(client, 'token', arret))
+    await asyncio.wait_for(client.wait_until_ready(), 5)
+
+    async def fermer():
+        arret.set()
+        await client.close()
+        await tache
+        await client.envois.arreter()
+
+    return client, fermer
+
+
+class TestRedaction:
+
+    def test_content_and_identity_are_redacted(self):
+        """Test that only the command word and the ids survive redaction"""
+        message = {
+            'id': '42',
+            'content': '!lucie <@123> secret',
+            'author': {'id': '7', 'username': 'alice', 'avatar': 'abc'},
+            'attachments': [{'url': 'https://cdn/x.png'}],
+            'mentions': [{'id': '123', 'username': 'bob'}],
+        }
+        resultat = rediger(message, ('!', ))
+        assert resultat['content'] == '!lucie <@123> xxxxxx'
+        assert resultat['author'] == {'id': '7', 'username': 'redacted',
+                                      'avatar': None}
+        assert resultat['attachments'] == [{}]
+        assert resultat['mentions'][0]['username'] == 'redacted'
+        # Bavardage : masqué en entier, longueur conservée
+        assert rediger({'content': 'bonjour'}, ('!', )) == {
+            'content': 'xxxxxxx'}
+        # Préfixe mention : la commande est le deuxième mot
+        assert rediger({'content': '<@1> lucie 3 abc'}, ('<@', )) == {
+            'content': '<@1> lucie 3 xxx'}
+
+
+class TestEnregistreurGateway:
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_appended_on_one_timeline(self, tmp_path):
+        """Test that restarts append to the trace without a time gap"""
+        chemin = tmp_path / 'trace.jsonl.gz'
+        for session in range(2):
+            horloge = FakeClock(0.0)
+            enregistreur = EnregistreurGateway(chemin, horloge=horloge)
+            horloge.now = 1.0
+            await enregistreur.enregistrer(payload('MESSAGE_CREATE', {
+                'id': str(session), 'content': '!lucie'}))
+            # Heartbeats et autres opcodes : ignorés
+            await enregistreur.enregistrer(json.dumps({'op': 11, 'd': None}))
+            enregistreur.fermer()
+
+        evenements = list(lire_trace(chemin))
+        assert [(t, e, d['id']) for t, e, d in evenements] == [
+            (1.0, 'MESSAGE_CREATE', '0'), (2.0, 'MESSAGE_CREATE', '1')]
+
+    @pytest.mark.asyncio
+    async def test_truncated_trace_is_readable(self, tmp_path):
+        """Test that a killed process leaves a trace readable up to its end"""
+        chemin = tmp_path / 'trace.jsonl.gz'
+        enregistreur = EnregistreurGateway(chemin, redaction='none')
+        for i in range(3):
+            await enregistreur.enregistrer(payload('MESSAGE_CREATE',
+                                                   {'id': str(i)}))
+        enregistreur.vider()
+        await enregistreur.enregistrer(payload('MESSAGE_CREATE', {'id': '3'}))
+        # Fichier copié sans le bloc final ni la fin du membre gzip
+        tronque = tmp_path / 'tronque.jsonl.gz'
+        tronque.write_bytes(chemin.read_bytes())
+        enregistreur.fermer()
+
+        assert [d['id'] for _, _, d in lire_trace(tronque)] == ['0', '1', '2']
+        assert len(list(lire_trace(chemin))) == 4
+        with gzip.open(chemin, 'rt') as f:
+            assert json.loads(f.readline())['redaction'] == 'none'
+
+    def test_unknown_redaction_is_rejected(self, tmp_path):
+        """Test the GATEWAY_TRACE_REDACT validation"""
+        with pytest.raises(ValueError):
+            EnregistreurGateway(tmp_path / 'trace.jsonl.gz', redaction='all')
+
+
+class TestReplay:
+
+    @pytest.mark.asyncio
+    async def test_recorded_traffic_is_replayed(self, tmp_path):
+        """Test record then replay: same guild, same commands answered"""
+        chemin = tmp_path / 'trace.jsonl.gz'
+        source = FakeDiscordServer(channels_per_guild=2, message_limit=50)
+        precedentes = configurer_endpoints(*await source.start())
+        enregistreur = EnregistreurGateway(chemin, debuts=('!', ))
+        client, fermer = await connecter(enregistreur)
+        await source.flood(4)
+        await source.flood(3, content='bonjour')
+        await attendre(lambda: nb_resultats(source) == 4)
+        await fermer()
+        enregistreur.fermer()
+        await source.stop()
+
+        bot_user, guilds, evenements = load_trace(chemin)
+        assert [g['id'] for g in guilds] == [source.guilds[0]['id']]
+        assert len(evenements) == 7
+
+        cible = FakeDiscordServer(message_limit=50)
+        prepare_server(cible, bot_user, guilds)
+        configurer_endpoints(*await cible.start())
+        client, fermer = await connecter()
+        try:
+            assert client.user.id == int(source.bot_user['id'])
+            resultat = await replay(cible, evenements, speed=0)
+            assert resultat['events'] == 7
+            await attendre(lambda: nb_resultats(cible) == 4)
+            salons = {call['path'].split('/')[2] for call in cible.calls
+                      if call['path'].endswith('/messages')}
+            assert salons <= {str(c) for c in source.channel_ids}
+        finally:
+            await fermer()
+            configurer_endpoints(*precedentes)
+            await cible.stop()
+
+    def test_replay_environment_is_isolated(self, tmp_path, monkeypatch):
+        """Test that a production .env cannot leak into the replayed bot"""
+        for nom in ('COOLDOWN_BACKEND', 'REDIS_URL', 'LOG_FILE', 'TRACE_FILE'):
+            monkeypatch.setenv(nom, 'production')
+        isolate_environment(str(tmp_path))
+        assert os.environ['COOLDOWN_BACKEND'] == 'memory'
+        assert os.environ['REDIS_URL'] == ''
+        for nom in ('LOG_FILE', 'TRACE_FILE', 'COOLDOWN_DB'):
+            assert os.environ[nom].startswith(str(tmp_path))
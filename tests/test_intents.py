@@ -0,0 +1,33 @@
+import pytest
+from discord.ext import commands
+
+from core.intents import construire_intents, prefixe_commandes
+
+
+class TestProfilsIntents:
+    def test_full_profile_keeps_message_content(self):
+        """Test that the default profile matches the historical configuration"""
+        intents = construire_intents('full')
+        assert intents.message_content
+        assert intents.guild_messages
+        assert prefixe_commandes('full') == '!'
+
+    def test_mentions_profile_drops_message_content(self):
+        """Test that the mentions profile receives messages without content"""
+        intents = construire_intents('mentions')
+        assert not intents.message_content
+        assert intents.guild_messages
+        assert not intents.members and not intents.presences
+        assert prefixe_commandes('mentions') is commands.when_mentioned
+
+    def test_minimal_profile_only_keeps_guilds(self):
+        """Test that the minimal profile receives no message events"""
+        intents = construire_intents('minimal')
+        assert intents.guilds
+        assert not intents.guild_messages and not intents.dm_messages
+        assert intents.value == type(intents)(guilds=True).value
+
+    def test_unknown_profile(self):
+        """Test that an unknown profile is rejected"""
+        with pytest.raises(ValueError):
+            construire_intents('tout')
@@ -0,0 +1,75 @@
+import logging
+
+from core.logs import FichierRotatif, FiltreRepetitions, configurer_logs
+
+
+def make_record(msg, args=(), created=0.0, level=logging.WARNING):
+    record = logging.LogRecord('bot', level, __file__, 1, msg, args, None)
+    record.created = created
+    return record
+
+
+class TestFiltreRepetitions:
+    def test_repeated_warnings_are_rate_limited(self):
+        """Test that identical warning templates are limited per interval"""
+        filtre = FiltreRepetitions(limite=2, intervalle=60)
+        acceptes = [
+            filtre.filter(make_record("Commande déjà en cours pour %s",
+                                      (f"user{i}", ), created=i))
+            for i in range(10)
+        ]
+        assert acceptes.count(True) == 2
+
+        suivant = make_record("Commande déjà en cours pour %s", ("x", ),
+                              created=100)
+        assert filtre.filter(suivant)
+        assert "8 messages similaires supprimés" in suivant.getMessage()
+
+    def test_info_records_are_untouched(self):
+        """Test that records below the threshold always pass"""
+        filtre = FiltreRepetitions(limite=1, intervalle=60)
+        assert all(
+            filtre.filter(make_record("info", level=logging.INFO))
+            for _ in range(5))
+
+
+class TestFichierRotatif:
+    def test_size_rollover(self, tmp_path):
+        """Test that the log file rotates once it exceeds its size"""
+        chemin = tmp_path / 'bot.log'
+        handler = FichierRotatif(str(chemin), max_octets=100,
+                                 nb_sauvegardes=2, intervalle=0)
+        for i in range(20):
+            handler.emit(make_record("ligne de log numéro %d", (i, )))
+        handler.close()
+        assert (tmp_path / 'bot.log.1').exists()
+
+
+class TestConfigurerLogs:
+    def test_discord_gateway_payloads_are_not_logged(self, tmp_path,
+                                                     monkeypatch):
+        """Test the INFO defaults, discord.py's logger included"""
+        monkeypatch.delenv('LOG_LEVEL', raising=False)
+        monkeypatch.delenv('DISCORD_LOG_LEVEL', raising=False)
+        racine = logging.getLogger()
+        avant = racine.level, list(racine.handlers)
+        discord_avant = logging.getLogger('discord').level
+        try:
+            configurer_logs(fichier=str(tmp_path / 'bot.log'),
+                            asynchrone=False)
+            assert racine.level == logging.INFO
+            assert not logging.getLogger('discord.gateway').isEnabledFor(
+                logging.DEBUG)
+            configurer_logs(niveau='DEBUG', fichier=str(tmp_path / 'bot.log'),
+                            asynchrone=False)
+            # Le niveau de discord.py ne suit pas LOG_LEVEL
+            assert not logging.getLogger('discord.gateway').isEnabledFor(
+                logging.DEBUG)
+        finally:
+            for handler in list(racine.handlers):
+                racine.removeHandler(handler)
+                handler.close()
+            racine.setLevel(avant[0])
+            for handler in avant[1]:
+                racine.addHandler(handler)
+            logging.getLogger('discord').setLevel(discord_avant)
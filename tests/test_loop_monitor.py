@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from core import loop_monitor
+from core.loop_monitor import MoniteurBoucle, percentile
+
+
+def blocage_volontaire():
+    time.sleep(0.5)
+
+
+class TestMoniteurBoucle:
+    def test_percentile(self):
+        """Test the nearest-rank percentile helper"""
+        assert percentile([], 99) == 0.0
+        assert percentile(list(range(101)), 50) == 50
+        assert percentile(list(range(101)), 99) == 99
+
+    @pytest.mark.asyncio
+    async def test_stall_is_detected_with_stack(self, caplog):
+        """Test that a blocked loop is reported with the blocking frame"""
+        moniteur = MoniteurBoucle(intervalle=0.01, seuil=0.2)
+        tache = asyncio.get_running_loop().create_task(moniteur.executer())
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING, logger='core.loop_monitor'):
+            blocage_volontaire()
+            await asyncio.sleep(0.05)
+        tache.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tache
+
+        assert moniteur.nb_blocages == 1
+        assert moniteur.retard_max >= 0.4
+        assert 'blocage_volontaire' in caplog.text
+        assert moniteur.statistiques()['loop_stalls'] == 1
+
+    @pytest.mark.asyncio
+    async def test_percentiles_are_not_sorted_per_request(self, monkeypatch):
+        """Test that frequent /health calls reuse the lag percentiles"""
+        appels = []
+
+        def compter(valeurs, p, trie=False):
+            appels.append(p)
+            return 0.0
+
+        monkeypatch.setattr(loop_monitor, 'percentile', compter)
+        moniteur = MoniteurBoucle(intervalle=0.001, periode_percentiles=10)
+        tache = asyncio.get_running_loop().create_task(moniteur.executer())
+        for _ in range(50):
+            moniteur.statistiques()
+            await asyncio.sleep(0.001)
+        tache.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tache
+        # Un calcul (p50 et p99) au départ puis toutes les 10 mesures
+        assert 0 < len(appels) <= 2 * (1 + moniteur._nb_mesures // 10)
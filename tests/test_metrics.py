@@ -0,0 +1,55 @@
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.metrics import Registre, suivi_rate_limits
+
+
+class TestRegistre:
+    def test_counter_and_gauge_exposition(self):
+        """Test the Prometheus text format of counters and gauges"""
+        registre = Registre()
+        compteur = registre.compteur('bot_test_total', 'Compteur de test')
+        registre.jauge('bot_test_size', 'Jauge de test', fonction=lambda: 7)
+        compteur.inc()
+        compteur.inc(2)
+        texte = registre.exposition()
+        assert '# TYPE bot_test_total counter' in texte
+        assert 'bot_test_total 3' in texte
+        assert 'bot_test_size 7' in texte
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets are cumulative with labels"""
+        registre = Registre()
+        histo = registre.histogramme('bot_latency_seconds', 'Latence',
+                                     labels=('command', ),
+                                     bornes=(0.1, 1.0))
+        for valeur in (0.05, 0.5, 0.5, 5.0):
+            histo.labels('lucie').observer(valeur)
+        texte = registre.exposition()
+        assert 'bot_latency_seconds_bucket{command="lucie",le="0.1"} 1' in texte
+        assert 'bot_latency_seconds_bucket{command="lucie",le="1"} 3' in texte
+        assert 'bot_latency_seconds_bucket{command="lucie",le="+Inf"} 4' in texte
+        assert 'bot_latency_seconds_count{command="lucie"} 4' in texte
+        assert histo.quantile(0.5, 'lucie') == 1.0
+        assert histo.quantile(0.99, 'lucie') == float('inf')
+        assert histo.quantile(0.5, 'autre') is None
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_counter(self):
+        """Test that every 429 seen by the HTTP client is counted"""
+        registre = Registre()
+        compteur = registre.compteur('discord_429_total', '429')
+
+        async def repondre(request):
+            return web.Response(status=int(request.query['status']))
+
+        app = web.Application()
+        app.router.add_get('/', repondre)
+        async with TestServer(app) as serveur, aiohttp.ClientSession(
+                trace_configs=[suivi_rate_limits(compteur)]) as session:
+            for status in (200, 429, 429, 500):
+                async with session.get(serveur.make_url(f'/?status={status}')):
+                    pass
+        assert compteur.valeur == 2
@@ -0,0 +1,82 @@
+import asyncio
+
+import discord
+import pytest
+import pytest_asyncio
+from discord.ext import commands
+
+from core.endpoints import configurer_endpoints
+from core.metrics import Registre, suivi_rate_limits
+from core.reconnect import executer_avec_reprise
+from tests.conftest import attendre, creer_bot, nb_resultats, pas_d_attente
+from utils.mock_discord import FakeDiscordServer
+
+
+@pytest_asyncio.fixture
+async def serveur():
+    server = FakeDiscordServer(channels_per_guild=2, message_limit=50,
+                               global_limit=3)
+    precedentes = configurer_endpoints(*await server.start())
+    yield server
+    configurer_endpoints(*precedentes)
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def client(serveur):
+    intents = discord.Intents.none()
+    intents.guilds = intents.guild_messages = intents.message_content = True
+    compteur = Registre().compteur('discord_429_total', '429')
+    bot = commands.Bot(command_prefix='!', intents=intents,
+                       guild_ready_timeout=0.1,
+                       http_trace=suivi_rate_limits(compteur))
+    bot.compteur_429 = compteur
+    # discord.py attend 5 s avant chaque nouvelle identification
+    bot.before_identify_hook = pas_d_attente
+    etat = creer_bot()
+    for nom in ('cooldowns', 'backend', 'envois', 'command_lock',
+                'processed_messages'):
+        setattr(bot, nom, getattr(etat, nom))
+    await bot.load_extension('cogs.lucie')
+    arret = asyncio.Event()
+    tache = asyncio.create_task(executer_avec_reprise(bot, 'token', arret))
+    await asyncio.wait_for(bot.wait_until_ready(), 5)
+    yield bot
+    arret.set()
+    await bot.close()
+    await tache
+    await bot.envois.arreter()
+
+
+class TestFakeDiscordServer:
+    @pytest.mark.asyncio
+    async def test_flood_is_answered_through_real_connection(
+            self, serveur, client):
+        """Test that a MESSAGE_CREATE flood reaches lucie and its replies"""
+        assert len(client.guilds) == 1
+        await serveur.flood(6)
+        await attendre(lambda: nb_resultats(serveur) == 6)
+        # Réponses regroupées par salon
+        assert len(serveur.sent_messages()) < 6
+        assert serveur.calls[0]['path'] == '/users/@me'
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_events(self, serveur, client):
+        """Test a forced disconnect: RESUME, then the missed messages"""
+        await serveur.disconnect()
+        await serveur.flood(2)
+        await attendre(lambda: nb_resultats(serveur) == 2)
+        assert (serveur.identifies, serveur.resumes) == (1, 1)
+
+        await serveur.invalidate_session()
+        await attendre(lambda: serveur.identifies == 2)
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_are_retried(self, serveur, client):
+        """Test that 429 answers are waited out, not lost"""
+        salon = client.get_channel(serveur.channel_ids[0])
+        await asyncio.gather(*(salon.send(f'message {i}') for i in range(4)))
+        assert serveur.rate_limited >= 1
+        assert len(serveur.sent_messages()) == 4
+        # Chaque 429 envoyé par le serveur est compté par le client
+        assert client.compteur_429.valeur == serveur.rate_limited
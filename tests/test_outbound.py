@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from core.outbound import PRIORITE_ERREUR, PlanificateurEnvois
+
+
+class FakeChannel:
+    def __init__(self, channel_id=1):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content, embed=None):
+        self.sent.append(content if embed is None else (content, embed))
+        return len(self.sent)
+
+
+class TestPlanificateurEnvois:
+    @pytest.mark.asyncio
+    async def test_burst_is_coalesced_with_results_first(self):
+        """Test that a burst in one channel becomes a single message"""
+        envois = PlanificateurEnvois(fenetre=0.01)
+        salon = FakeChannel()
+        resultats = await asyncio.gather(
+            envois.envoyer(salon, "cooldown", PRIORITE_ERREUR, auteur='a'),
+            envois.envoyer(salon, "résultat 1", auteur='b'),
+            envois.envoyer(salon, "cooldown", PRIORITE_ERREUR, auteur='c'),
+            envois.envoyer(salon, "résultat 2", auteur='d'))
+        assert resultats == [1, 1, 1, 1]
+        assert salon.sent == [
+            "**b** : résultat 1\n\n**d** : résultat 2\n\n**a** : cooldown"
+        ]
+        assert (envois.nb_messages, envois.nb_envois) == (4, 1)
+
+    @pytest.mark.asyncio
+    async def test_single_message_is_unchanged(self):
+        """Test that a lone message is sent as is"""
+        envois = PlanificateurEnvois(fenetre=0)
+        salon = FakeChannel()
+        await envois.envoyer(salon, "bonjour", auteur='a')
+        assert salon.sent == ["bonjour"]
+
+    @pytest.mark.asyncio
+    async def test_quiet_channel_skips_coalescing_window(self):
+        """Test that a lone reply does not wait for the coalescing window"""
+        envois = PlanificateurEnvois(fenetre=1.0)
+        salon = FakeChannel()
+        debut = asyncio.get_running_loop().time()
+        await envois.envoyer(salon, "bonjour")
+        assert asyncio.get_running_loop().time() - debut < 0.1
+        # Rafale arrivée avant le premier envoi : toujours regroupée
+        await asyncio.gather(*(envois.envoyer(salon, f"r{i}", auteur='a')
+                               for i in range(3)))
+        assert salon.sent[1:] == ["**a** : r0\n\n**a** : r1\n\n**a** : r2"]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_is_anticipated(self):
+        """Test that sends beyond the bucket wait instead of failing"""
+        envois = PlanificateurEnvois(fenetre=0, capacite=2, periode=0.2,
+                                     taille_max=10)
+        salon = FakeChannel()
+        debut = asyncio.get_running_loop().time()
+        await asyncio.gather(*(envois.envoyer(salon, f"message {i}")
+                               for i in range(3)))
+        assert len(salon.sent) == 3
+        assert asyncio.get_running_loop().time() - debut >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_embed_is_sent_alone(self):
+        """Test that an embed is never merged with text replies"""
+        envois = PlanificateurEnvois(fenetre=0.01)
+        salon = FakeChannel()
+        await asyncio.gather(envois.envoyer(salon, "texte 1", auteur='a'),
+                             envois.envoyer(salon, None, embed='embed'),
+                             envois.envoyer(salon, "texte 2", auteur='b'))
+        assert salon.sent == ["texte 1", (None, 'embed'), "texte 2"]
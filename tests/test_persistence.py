@@ -0,0 +1,39 @@
+from core.cooldown import CooldownRegistry
+from core.persistence import CooldownStore
+from tests.conftest import FakeClock
+
+
+class TestCooldownStore:
+    def test_warm_start_restores_live_entries(self, tmp_path):
+        """Test that live cooldowns survive a restart and expired ones do not"""
+        clock = FakeClock()
+        chemin = str(tmp_path / 'cooldowns.db')
+        store = CooldownStore(chemin, horloge=clock)
+        registry = CooldownRegistry({'atouts': ['a', 'b']}, duree=60,
+                                    horloge=clock)
+        registry.attacher_store(store)
+        premier = registry.tirer('atouts', 1)
+        clock.now += 50
+        second = registry.tirer('atouts', 2)
+        store.fermer()
+
+        clock.now += 20
+        store = CooldownStore(chemin, horloge=clock)
+        registry = CooldownRegistry({'atouts': ['a', 'b']}, duree=60,
+                                    horloge=clock)
+        registry.attacher_store(store)
+        # Le tirage du serveur 1 a expiré, celui du serveur 2 est toujours actif
+        assert len(registry.pools(1)['atouts']) == 2
+        assert registry.tirer('atouts', 2) != second
+        assert premier in ('a', 'b')
+        store.fermer()
+
+    def test_writes_are_coalesced(self, tmp_path):
+        """Test that repeated writes of the same entry are merged"""
+        store = CooldownStore(str(tmp_path / 'cooldowns.db'))
+        store.enregistrer('1', 'atouts', 'a', 10.0**10)
+        store.enregistrer('1', 'atouts', 'a', 10.0**10 + 1)
+        assert len(store) == 1
+        assert store.flush() == 1
+        assert store.charger() == {'1': [('atouts', 'a', 10.0**10 + 1)]}
+        store.fermer()
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from discord.ext import commands
+
+from core.prefilter import FiltrePrefixe, debuts_prefixe
+
+
+def message(contenu, bot=False):
+    return SimpleNamespace(content=contenu, author=SimpleNamespace(bot=bot))
+
+
+class TestFiltrePrefixe:
+    def test_rejects_non_commands(self):
+        """Test that only messages starting with the prefix pass"""
+        filtre = FiltrePrefixe('!')
+        assert filtre.accepte(message('!lucie'))
+        assert not filtre.accepte(message('bonjour à tous'))
+        assert not filtre.accepte(message(''))
+        assert (filtre.nb_vus, filtre.nb_rejetes, filtre.nb_traites) == (3, 2,
+                                                                         1)
+
+    def test_rejects_bots(self):
+        """Test that messages from bots never reach command processing"""
+        filtre = FiltrePrefixe('!')
+        assert not filtre.accepte(message('!lucie', bot=True))
+
+    def test_mention_prefix(self):
+        """Test that the mention prefix is checked without the bot id"""
+        filtre = FiltrePrefixe(commands.when_mentioned)
+        assert filtre.accepte(message('<@123> lucie'))
+        assert filtre.accepte(message('<@!123> lucie'))
+        assert not filtre.accepte(message('!lucie'))
+
+    def test_prefix_forms(self):
+        """Test the possible starts computed for each prefix form"""
+        assert debuts_prefixe(['!', '?']) == ('!', '?')
+        # Préfixe dynamique : aucun rejet possible sans l'appeler
+        assert debuts_prefixe(lambda bot, msg: '!') is None
+        filtre = FiltrePrefixe(lambda bot, msg: '!')
+        assert filtre.accepte(message('texte quelconque'))
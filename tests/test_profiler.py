@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.profiler import ProfilageEnCours, ProfileurEchantillonnage
+from core.web import ServeurKeepAlive, route_profil
+
+
+def calcul_bloquant(duree):
+    fin = time.perf_counter() + duree
+    while time.perf_counter() < fin:
+        sum(range(500))
+
+
+async def charge(arret):
+    while not arret.is_set():
+        calcul_bloquant(0.005)
+        await asyncio.sleep(0.001)
+
+
+class TestProfileur:
+    @pytest.mark.asyncio
+    async def test_busy_coroutine_dominates_profile(self):
+        """Test that the event loop's hot function tops the summary"""
+        arret = asyncio.Event()
+        tache = asyncio.create_task(charge(arret))
+        profil = await ProfileurEchantillonnage(intervalle=0.002).profiler(0.5)
+        arret.set()
+        await tache
+
+        assert profil.nb_echantillons > 10
+        cadre, propre, inclusif = profil.top(1)[0]
+        assert cadre.startswith('calcul_bloquant (test_profiler.py:')
+        assert inclusif >= propre
+        # Format collapsed : "thread;racine;...;feuille nombre"
+        ligne = next(ligne for ligne in profil.collapsed().splitlines()
+                     if 'calcul_bloquant' in ligne)
+        pile, nombre = ligne.rsplit(' ', 1)
+        assert pile.split(';')[0] == 'MainThread'
+        assert pile.split(';')[-1] == cadre
+        assert int(nombre) > 0
+        assert 'calcul_bloquant' in profil.resume()
+        # Attente de la boucle (select) exclue du résumé
+        assert all('selectors.py' not in c for c, _, _ in profil.top(50))
+
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self):
+        """Test that a second concurrent profile is refused"""
+        profileur = ProfileurEchantillonnage()
+        premier = asyncio.create_task(profileur.profiler(0.3))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ProfilageEnCours):
+            await ProfileurEchantillonnage().profiler(0.1)
+        await premier
+
+
+    @pytest.mark.asyncio
+    async def test_loop_lag_is_measured_during_profile(self):
+        """Test the loop lag probe and stopping a profile early"""
+        profileur = ProfileurEchantillonnage()
+        tache = asyncio.create_task(profileur.profiler(60))
+        await asyncio.sleep(0.2)
+        calcul_bloquant(0.05)
+        await asyncio.sleep(0.05)
+        profileur.arreter()
+        profil = await asyncio.wait_for(tache, 5)
+
+        assert profil.duree < 5
+        assert len(profil.retards_boucle) > 5
+        # Le calcul bloquant retarde le réveil de la sonde
+        assert max(profil.retards_boucle) >= 0.03
+        assert 'retard p99 de la boucle' in profil.resume()
+
+
+class TestRouteProfil:
+    @pytest.mark.asyncio
+    async def test_profile_endpoint_requires_token(self):
+        """Test the /profile endpoint of the keep-alive server"""
+        serveur = ServeurKeepAlive(dict, dict)
+        serveur.ajouter_route('/profile',
+                              route_profil(ProfileurEchantillonnage(), 's3cret'))
+        async with TestClient(TestServer(serveur.app)) as client:
+            response = await client.get('/profile?seconds=0.1')
+            assert response.status == 401
+            response = await client.get('/profile?seconds=abc&token=s3cret')
+            assert response.status == 400
+
+            response = await client.get(
+                '/profile?seconds=0.1',
+                headers={'Authorization': 'Bearer s3cret'})
+            assert response.status == 200
+            assert 'MainThread;' in await response.text()
+
+            response = await client.get(
+                '/profile?seconds=0.1&format=summary&token=s3cret')
+            assert 'relevés' in await response.text()
@@ -0,0 +1,118 @@
+import asyncio
+
+import discord
+import pytest
+
+from core.reconnect import SuiviReconnexions, executer_avec_reprise
+from tests.conftest import FakeClock
+
+
+class FakeBackoff:
+    def __init__(self):
+        self.nb_appels = 0
+
+    def delay(self):
+        self.nb_appels += 1
+        return 0
+
+
+class FakeClient:
+    """Client dont `start` échoue selon la liste d'erreurs fournie."""
+
+    def __init__(self, erreurs):
+        self.erreurs = list(erreurs)
+        self.nb_starts = 0
+        self.nb_clears = 0
+        self.ouvert = False
+
+    async def __aenter__(self):
+        self.ouvert = True
+        return self
+
+    async def __aexit__(self, *args):
+        self.ouvert = False
+
+    async def start(self, token, reconnect=True):
+        self.nb_starts += 1
+        if self.erreurs:
+            raise self.erreurs.pop(0)
+
+    def clear(self):
+        self.nb_clears += 1
+
+
+class TestSuiviReconnexions:
+    def test_measures_recovery(self):
+        """Test that recovery time runs from the first disconnect"""
+        clock = FakeClock()
+        mesures = []
+        suivi = SuiviReconnexions(
+            horloge=clock,
+            on_retablissement=lambda duree, mode: mesures.append((duree, mode)))
+        # Première connexion : aucune coupure à mesurer
+        assert suivi.retabli(reprise=False) is None
+        suivi.deconnecte()
+        clock.now += 2
+        # Nouvelle tentative échouée pendant la même coupure
+        suivi.deconnecte()
+        assert suivi.duree_coupure() == 2
+        clock.now += 1
+        assert suivi.retabli() == 3
+        assert mesures == [(3, 'resume')]
+        assert suivi.nb_coupures == 1
+        assert suivi.duree_coupure() is None
+
+    def test_shards_are_tracked_separately(self):
+        """Test that each shard has its own outage"""
+        clock = FakeClock()
+        suivi = SuiviReconnexions(horloge=clock)
+        suivi.deconnecte(0)
+        clock.now += 5
+        suivi.deconnecte(1)
+        clock.now += 1
+        assert suivi.retabli(1, reprise=False) == 1
+        assert len(suivi) == 1
+        assert suivi.duree_coupure() == 6
+        assert (suivi.nb_reprises, suivi.nb_identifications) == (0, 1)
+
+
+class TestExecuterAvecReprise:
+    @pytest.mark.asyncio
+    async def test_restarts_after_failures(self):
+        """Test that the client is cleared and restarted after failures"""
+        client = FakeClient([OSError('réseau'), discord.GatewayNotFound()])
+        backoff = FakeBackoff()
+        echecs = []
+        await executer_avec_reprise(client, 'token', asyncio.Event(),
+                                    backoff=backoff, on_echec=echecs.append)
+        assert client.nb_starts == 3
+        assert client.nb_clears == 2
+        assert backoff.nb_appels == 2
+        assert len(echecs) == 2
+        assert not client.ouvert
+
+    @pytest.mark.asyncio
+    async def test_fatal_errors_are_raised(self):
+        """Test that an invalid token is not retried"""
+        client = FakeClient([discord.LoginFailure('token invalide')])
+        with pytest.raises(discord.LoginFailure):
+            await executer_avec_reprise(client, 'token', asyncio.Event(),
+                                        backoff=FakeBackoff())
+        assert client.nb_starts == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_requested(self):
+        """Test that no restart happens once a stop is requested"""
+        arret = asyncio.Event()
+        client = FakeClient([OSError('réseau')])
+
+        async def start(token, reconnect=True):
+            client.nb_starts += 1
+            arret.set()
+            raise OSError('fermé')
+
+        client.start = start
+        await executer_avec_reprise(client, 'token', arret,
+                                    backoff=FakeBackoff())
+        assert client.nb_starts == 1
+        assert client.nb_clears == 0
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from core.supervisor import Superviseur
+
+
+class TestSuperviseur:
+    @pytest.mark.asyncio
+    async def test_start_is_idempotent(self):
+        """Test that starting twice does not duplicate jobs"""
+        superviseur = Superviseur()
+        appels = []
+        superviseur.enregistrer('tick', lambda: appels.append(1),
+                                intervalle=0.01)
+        superviseur.demarrer()
+        premiere = superviseur['tick'].tache
+        superviseur.demarrer()
+        assert superviseur['tick'].tache is premiere
+        await asyncio.sleep(0.05)
+        await superviseur.arreter()
+        assert premiere.cancelled()
+        assert 2 <= len(appels) <= 6
+        assert superviseur.statistiques()['tick']['executions'] == len(appels)
+
+    @pytest.mark.asyncio
+    async def test_crashing_job_is_restarted(self):
+        """Test that a crashing job is restarted with backoff"""
+        superviseur = Superviseur(backoff_max=0.01)
+        appels = []
+
+        async def instable():
+            appels.append(1)
+            if len(appels) < 3:
+                raise RuntimeError("boom")
+            await asyncio.sleep(10)
+
+        superviseur.enregistrer('instable', instable)
+        superviseur.demarrer()
+        await asyncio.sleep(0.1)
+        tache = superviseur['instable']
+        assert tache.active
+        assert (tache.nb_erreurs, tache.nb_redemarrages) == (2, 2)
+        await superviseur.arreter()
+        assert not tache.active
@@ -0,0 +1,124 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.tracing import (SPAN_NUL, Traceur, lire_spans, reception_message,
+                          span)
+from run_bench import FakeChannel
+from tests.conftest import creer_bot
+
+
+async def differer():
+    pass
+
+
+async def repondre(*args, **kwargs):
+    pass
+
+
+def contexte(message_id, channel, commande=None, interaction=None):
+    auteur = SimpleNamespace(id=7, name='alice', display_name='Alice',
+                             bot=False)
+    return SimpleNamespace(defer=differer, send=repondre,
+                           interaction=interaction,
+                           channel=channel, command=commande,
+                           guild=SimpleNamespace(id=1), author=auteur,
+                           message=SimpleNamespace(id=message_id))
+
+
+async def invoquer(traceur, commande, ctx):
+    """Comme discord.py : before_invoke, callback, after_invoke."""
+    traceur.debut_commande(ctx)
+    await commande.callback(commande.cog, ctx)
+    traceur.fin_commande(ctx)
+
+
+class TestTraceur:
+    def test_disabled_tracer_costs_nothing(self, tmp_path):
+        """Test that without a file no span is created"""
+        traceur = Traceur(None, taux=1.0)
+        assert not traceur.actif
+        assert traceur.commencer('dispatch') is SPAN_NUL
+        # Hors d'une commande tracée
+        assert span('tirage') is SPAN_NUL
+        traceur.vider()
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_command_stages_are_traced(self, tmp_path):
+        """Test one span per lucie stage, REST round-trip included"""
+        chemin = tmp_path / 'spans.json'
+        bot = creer_bot()
+        await bot.load_extension('cogs.lucie')
+        commande = bot.get_command('lucie')
+        traceur = Traceur(chemin)
+        # Commande préfixée : la trace part de la réception du message
+        jeton = reception_message.set(time.perf_counter())
+        try:
+            await invoquer(traceur, commande,
+                           contexte(1, FakeChannel(1, 0.01), commande))
+        finally:
+            reception_message.reset(jeton)
+        await bot.envois.arreter()
+        traceur.vider()
+
+        spans = {s['name']: s for s in lire_spans(chemin)}
+        assert set(spans) == {'commande', 'dispatch', 'dedup', 'verrou',
+                              'tirage', 'formatage', 'envoi',
+                              'attente_rate_limit', 'rest_send'}
+        assert {s['tid'] for s in spans.values()} == {1}
+        racine = spans['commande']
+        assert racine['args'] == {'commande': 'lucie', 'slash': False}
+        assert racine['ts'] == spans['dispatch']['ts']
+        for s in spans.values():
+            assert racine['ts'] <= s['ts']
+            assert s['ts'] + s['dur'] <= racine['ts'] + racine['dur'] + 1
+        assert spans['rest_send']['dur'] >= 10000
+        assert spans['tirage']['args'] == {'joueurs': 1}
+
+    @pytest.mark.asyncio
+    async def test_slash_invocation_is_traced(self, tmp_path):
+        """Test that a slash invocation opens its trace in the hooks too"""
+        chemin = tmp_path / 'spans.json'
+        bot = creer_bot()
+        await bot.load_extension('cogs.lucie')
+        commande = bot.get_command('lucie')
+        traceur = Traceur(chemin)
+        await invoquer(traceur, commande,
+                       contexte(2, FakeChannel(1, 0), commande,
+                                interaction=SimpleNamespace(id=2)))
+        # Échec d'une commande slash : seul on_command_error est appelé
+        ctx = contexte(3, FakeChannel(1, 0), commande,
+                       interaction=SimpleNamespace(id=3))
+        traceur.debut_commande(ctx)
+        traceur.fin_commande(ctx, RuntimeError())
+        traceur.fin_commande(ctx)
+        await bot.envois.arreter()
+        traceur.vider()
+
+        spans = lire_spans(chemin)
+        racines = [s for s in spans if s['name'] == 'commande']
+        assert [r['args'] for r in racines] == [
+            {'commande': 'lucie', 'slash': True},
+            {'commande': 'lucie', 'slash': True, 'erreur': 'RuntimeError'}]
+        noms = {s['name'] for s in spans if s['tid'] == racines[0]['tid']}
+        assert 'dispatch' not in noms
+        assert {'tirage', 'formatage', 'envoi'} <= noms
+
+    def test_sampling_and_appended_file(self, tmp_path):
+        """Test the sample rate and a file appended across restarts"""
+        chemin = tmp_path / 'spans.json'
+        random.seed(1)
+        total = 0
+        for _ in range(2):
+            traceur = Traceur(chemin, taux=0.25)
+            for i in range(200):
+                with traceur.commencer('dispatch', message_id=i):
+                    pass
+            traceur.fermer()
+            assert 20 < traceur.nb_traces < 80
+            total += traceur.nb_traces
+        assert len(lire_spans(chemin)) == total
+        assert chemin.read_text().count('[') == 1
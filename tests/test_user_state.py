@@ -0,0 +1,52 @@
+from core.user_state import TableUtilisateurs
+from tests.conftest import FakeClock
+
+
+class TestTableUtilisateurs:
+    def test_lock_is_exclusive(self):
+        """Test that a user cannot run two commands at once"""
+        table = TableUtilisateurs(horloge=FakeClock())
+        assert table.acquerir(42)
+        assert not table.acquerir(42)
+        table.liberer(42)
+        assert table.acquerir(42)
+        etat = table.get(42)
+        assert (etat.nb_commandes, etat.nb_refus) == (2, 1)
+
+    def test_idle_users_are_evicted(self):
+        """Test the TTL eviction of idle users"""
+        clock = FakeClock()
+        table = TableUtilisateurs(ttl=60, horloge=clock)
+        table.acquerir(1)
+        table.liberer(1)
+        table.acquerir(2)
+        clock.now += 120
+        # L'utilisateur 2 a encore une commande en cours : il est conservé
+        assert table.purger() == 1
+        assert 1 not in table
+        assert 2 in table
+
+    def test_capacity_is_bounded(self):
+        """Test that the table never grows beyond its capacity"""
+        table = TableUtilisateurs(ttl=3600, capacite=10, horloge=FakeClock())
+        for user_id in range(1000):
+            table.acquerir(user_id)
+            table.liberer(user_id)
+        assert len(table) <= 10
+
+    def test_refusal_keeps_eviction_order(self):
+        """Test that a refused command does not hide a stale entry"""
+        clock = FakeClock()
+        table = TableUtilisateurs(ttl=60, horloge=clock)
+        table.acquerir(1)
+        clock.now += 10
+        table.acquerir(2)
+        table.liberer(2)
+        clock.now += 10
+        assert not table.acquerir(1)
+        table.liberer(1)
+        clock.now += 45
+        # 1 est inactif depuis 65 s, 2 depuis 55 s
+        assert table.purger() == 1
+        assert 1 not in table
+        assert 2 in table
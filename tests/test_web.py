@@ -0,0 +1,28 @@
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.web import ServeurKeepAlive
+
+
+class TestServeurKeepAlive:
+    @pytest.mark.asyncio
+    async def test_home_and_health(self):
+        """Test the keep-alive and health endpoints"""
+        sante = {'status': 'healthy', 'gateway_latency_ms': 42.0}
+        serveur = ServeurKeepAlive(lambda: {'status': 'alive'},
+                                   lambda: dict(sante))
+        async with TestClient(TestServer(serveur.app)) as client:
+            response = await client.get('/')
+            assert response.status == 200
+            donnees = await response.json()
+            assert donnees['status'] == 'alive'
+            assert 'host' in donnees['debug_info']
+            assert response.headers['Access-Control-Allow-Origin'] == '*'
+
+            response = await client.get('/health')
+            assert response.status == 200
+            assert (await response.json())['gateway_latency_ms'] == 42.0
+
+            sante['status'] = 'unhealthy'
+            response = await client.get('/health')
+            assert response.status == 503
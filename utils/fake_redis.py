@@ -0,0 +1,194 @@
+import asyncio
+import time
+
+from core.backends import SCRIPT_TIRAGE, SHA_SCRIPT_TIRAGE
+
+
+class FakeRedisServer:
+    """Local stand-in for a Redis server, speaking RESP2 over TCP.
+
+    Only the commands used by BackendRedis are supported. The draw Lua script
+    is executed by an equivalent Python implementation, keyed by its SHA1.
+    """
+
+    def __init__(self, password=None):
+        self.password = password
+        self.strings = {}
+        self.zsets = {}
+        self.expirations = {}
+        self.scripts = set()
+        self.commands = []
+        self._server = None
+        self._clients = set()
+
+    async def start(self, host='127.0.0.1', port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f'redis://{host}:{self.port}/0'
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        # Let connections closed by their clients finish on their own:
+        # cancelling them makes asyncio log spurious errors
+        if self._clients:
+            await asyncio.wait(self._clients, timeout=1)
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2].decode())
+        return args
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        task.add_done_callback(self._clients.discard)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                self.commands.append(args)
+                try:
+                    reply = self.execute(args[0].upper(), args[1:])
+                except Exception as e:
+                    reply = RuntimeError(f'ERR {e}')
+                writer.write(self._encode(reply))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _encode(self, reply):
+        if isinstance(reply, Exception):
+            return f'-{reply}\r\n'.encode()
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, bool):
+            return b'+OK\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(
+                self._encode(item) for item in reply)
+        data = str(reply).encode()
+        return b'$%d\r\n%s\r\n' % (len(data), data)
+
+    def _now_ms(self):
+        return int(time.time() * 1000)
+
+    def _expire(self, key):
+        deadline = self.expirations.get(key)
+        if deadline is not None and deadline <= self._now_ms():
+            self.strings.pop(key, None)
+            self.zsets.pop(key, None)
+            del self.expirations[key]
+
+    def execute(self, command, args):
+        for key in args[:1]:
+            self._expire(key)
+        if command == 'AUTH' and args[-1] != (self.password or args[-1]):
+            return RuntimeError('WRONGPASS invalid password')
+        if command in ('PING', 'AUTH', 'SELECT'):
+            return True
+        if command == 'SET':
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if 'NX' in options and key in self.strings:
+                return None
+            self.strings[key] = value
+            if 'PX' in options:
+                self.expirations[key] = self._now_ms() + int(
+                    args[2 + options.index('PX') + 1])
+            return True
+        if command == 'GET':
+            return self.strings.get(args[0])
+        if command == 'PEXPIRE':
+            self.expirations[args[0]] = self._now_ms() + int(args[1])
+            return 1
+        if command == 'ZCARD':
+            return len(self.zsets.get(args[0], {}))
+        if command == 'ZADD':
+            zset = self.zsets.setdefault(args[0], {})
+            added = 0
+            for score, member in zip(args[1::2], args[2::2]):
+                added += member not in zset
+                zset[member] = int(score)
+            return added
+        if command == 'ZREM':
+            zset = self.zsets.get(args[0], {})
+            return sum(zset.pop(member, None) is not None
+                       for member in args[1:])
+        if command == 'DEL':
+            found = args[0] in self.strings or args[0] in self.zsets
+            self.strings.pop(args[0], None)
+            self.zsets.pop(args[0], None)
+            self.expirations.pop(args[0], None)
+            return int(found)
+        if command == 'ZSCORE':
+            score = self.zsets.get(args[0], {}).get(args[1])
+            return None if score is None else str(score)
+        if command == 'SCRIPT' and args[0].upper() == 'LOAD':
+            self.scripts.add(SHA_SCRIPT_TIRAGE)
+            return SHA_SCRIPT_TIRAGE
+        if command in ('EVAL', 'EVALSHA'):
+            if command == 'EVALSHA' and args[0] not in self.scripts:
+                return RuntimeError('NOSCRIPT No matching script.')
+            if command == 'EVAL':
+                if args[0] != SCRIPT_TIRAGE:
+                    return RuntimeError('ERR unknown script')
+                self.scripts.add(SHA_SCRIPT_TIRAGE)
+            nb_keys = int(args[1])
+            keys = args[2:2 + nb_keys]
+            for key in keys:
+                self._expire(key)
+            return self._draw_script(keys, args[2 + nb_keys:])
+        raise ValueError(f'unknown command {command}')
+
+    def _draw_script(self, keys, argv):
+        # Python equivalent of SCRIPT_TIRAGE
+        now, duration, window = int(argv[0]), int(argv[1]), int(argv[2])
+        if window > 0:
+            if self.execute('SET', [keys[0], '1', 'NX', 'PX', str(window)]) is None:
+                return [0]
+        tables = []
+        pos = 3
+        for index, key in enumerate(keys[1:]):
+            size, number, count = (int(argv[pos]), int(argv[pos + 1]),
+                                   int(argv[pos + 2]))
+            candidates = argv[pos + 3:pos + 3 + count]
+            randoms = [int(r) for r in
+                       argv[pos + 3 + count:pos + 3 + count + number]]
+            pos += 3 + count + number
+            zset = self.zsets.setdefault(key, {})
+            for member in [m for m, score in zset.items() if score <= now]:
+                del zset[member]
+            missing = len(zset) + number - size
+            if missing > 0:
+                return [-1, index, sorted(zset.values())[missing - 1]]
+            tables.append((key, size, number, candidates, randoms))
+        result = [1]
+        for key, size, number, candidates, randoms in tables:
+            zset = self.zsets[key]
+            chosen = 0
+            for choice in candidates:
+                if chosen == number:
+                    break
+                if choice not in zset:
+                    zset[choice] = now + duration
+                    result.append(int(choice))
+                    chosen += 1
+            free = [i for i in range(size) if str(i) not in zset]
+            for random_int in randoms[:number - chosen]:
+                rank = random_int % len(free)
+                choice = free[rank]
+                free[rank] = free[-1]
+                free.pop()
+                zset[str(choice)] = now + duration
+                result.append(choice)
+            self.expirations[key] = self._now_ms() + duration
+        return result
@@ -0,0 +1,515 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+import zlib
+
+import aiohttp
+from aiohttp import web
+
+API_PREFIX = '/api/v10'
+
+# Gateway opcodes
+DISPATCH = 0
+HEARTBEAT = 1
+IDENTIFY = 2
+RESUME = 6
+RECONNECT = 7
+REQUEST_MEMBERS = 8
+INVALID_SESSION = 9
+HELLO = 10
+HEARTBEAT_ACK = 11
+
+BOT_USER = {
+    'id': '100000000000000001',
+    'username': 'Lucie',
+    'discriminator': '0',
+    'global_name': None,
+    'avatar': None,
+    'bot': True,
+}
+OWNER_USER = {
+    'id': '100000000000000002',
+    'username': 'owner',
+    'discriminator': '0',
+    'global_name': None,
+    'avatar': None,
+}
+
+
+def timestamp():
+    return time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+
+
+class _Session:
+    """Gateway session, kept after a disconnect so it can be resumed."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.sequence = 0
+        # Dispatched (sequence, payload), replayed on RESUME
+        self.events = []
+        self.ws = None
+        self.compressor = None
+
+
+class _Bucket:
+    __slots__ = ('remaining', 'reset_at')
+
+    def __init__(self, limit, reset_at):
+        self.remaining = limit
+        self.reset_at = reset_at
+
+
+class FakeDiscordServer:
+    """Local stand-in for the Discord gateway and REST API.
+
+    The bot is pointed at it with `core.endpoints.configurer_endpoints` (or
+    the DISCORD_API_URL / DISCORD_GATEWAY_URL variables of bot.py). The
+    gateway implements HELLO, heartbeats, IDENTIFY/READY/GUILD_CREATE and
+    RESUME with replay of missed events; the test drives it with `flood`,
+    `dispatch`, `disconnect`, `invalidate_session` and `request_reconnect`.
+
+    REST calls are recorded in `calls` and message creation is limited per
+    channel like Discord (`message_limit` per `message_period` seconds):
+    over the limit the server answers 429 with the usual rate limit
+    headers. discord.py anticipates these buckets from the headers;
+    `global_limit` (requests per second, all routes) adds the global limit it
+    cannot anticipate. Gateway payloads received from the bot are kept in
+    `received`.
+    """
+
+    def __init__(self, guilds=1, channels_per_guild=1, heartbeat_interval=41.25,
+                 message_limit=5, message_period=5.0, global_limit=None,
+                 max_events=10000):
+        self.heartbeat_interval = heartbeat_interval
+        self.global_limit = global_limit
+        self.message_limit = message_limit
+        self.message_period = message_period
+        self.max_events = max_events
+        self.calls = []
+        self.received = []
+        self.identifies = 0
+        self.resumes = 0
+        self.rate_limited = 0
+        self.sessions = {}
+        self.ready = asyncio.Event()
+        self._ids = itertools.count(200000000000000000)
+        self._buckets = {}
+        self._session = None
+        self._runner = None
+        self.bot_user = dict(BOT_USER)
+        self._guild_payloads = {}
+        self.guilds = []
+        for _ in range(guilds):
+            guild_id = str(next(self._ids))
+            channels = [str(next(self._ids)) for _ in range(channels_per_guild)]
+            self.guilds.append({'id': guild_id, 'channels': channels})
+
+    def set_guilds(self, payloads):
+        """Serves these GUILD_CREATE payloads (e.g. recorded) on IDENTIFY."""
+        self._guild_payloads = {p['id']: p for p in payloads}
+        self.guilds = [{
+            'id': p['id'],
+            'channels': [c['id'] for c in p.get('channels', ())],
+        } for p in payloads]
+
+    @property
+    def channel_ids(self):
+        return [int(c) for guild in self.guilds for c in guild['channels']]
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_get('/gateway', self._gateway)
+        app.router.add_route('*', API_PREFIX + '/{path:.*}', self._rest)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.api_url = f'http://{host}:{self.port}{API_PREFIX}'
+        self.gateway_url = f'ws://{host}:{self.port}/gateway'
+        return self.api_url, self.gateway_url
+
+    async def stop(self):
+        for session in self.sessions.values():
+            if session.ws is not None and not session.ws.closed:
+                await session.ws.close()
+        await self._runner.cleanup()
+
+    # Gateway
+
+    async def _gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        compress = request.query.get('compress') == 'zlib-stream'
+        connection = {'ws': ws, 'compressor': zlib.compressobj() if compress else None}
+        await self._send(connection, {
+            'op': HELLO,
+            'd': {'heartbeat_interval': int(self.heartbeat_interval * 1000)},
+        })
+        session = None
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                self.received.append(payload)
+                op, data = payload.get('op'), payload.get('d')
+                if op == HEARTBEAT:
+                    await self._send(connection, {'op': HEARTBEAT_ACK})
+                elif op == IDENTIFY:
+                    session = await self._identify(connection)
+                elif op == RESUME:
+                    session = await self._resume(connection, data)
+                elif op == REQUEST_MEMBERS:
+                    await self._members_chunk(connection, data)
+        finally:
+            if session is not None and session.ws is ws:
+                session.ws = None
+        return ws
+
+    async def _send(self, connection, payload):
+        data = json.dumps(payload, separators=(',', ':'))
+        compressor = connection['compressor']
+        if compressor is None:
+            await connection['ws'].send_str(data)
+        else:
+            await connection['ws'].send_bytes(
+                compressor.compress(data.encode()) +
+                compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    def _attach(self, session, connection):
+        session.ws = connection['ws']
+        session.compressor = connection['compressor']
+        self._session = session
+
+    async def _identify(self, connection):
+        self.identifies += 1
+        session = _Session(uuid.uuid4().hex)
+        self.sessions[session.session_id] = session
+        self._attach(session, connection)
+        await self._dispatch(session, 'READY', {
+            'v': 10,
+            'user': self.bot_user,
+            'guilds': [{'id': g['id'], 'unavailable': True} for g in self.guilds],
+            'session_id': session.session_id,
+            'resume_gateway_url': self.gateway_url,
+            'application': {'id': self.bot_user['id'], 'flags': 0},
+        })
+        for guild in self.guilds:
+            await self._dispatch(session, 'GUILD_CREATE', self.guild_payload(guild))
+        self.ready.set()
+        return session
+
+    async def _resume(self, connection, data):
+        session = self.sessions.get(data.get('session_id'))
+        if session is None:
+            await self._send(connection, {'op': INVALID_SESSION, 'd': False})
+            return None
+        self.resumes += 1
+        self._attach(session, connection)
+        for sequence, payload in session.events:
+            if sequence > (data.get('seq') or 0):
+                await self._send(connection, payload)
+        await self._dispatch(session, 'RESUMED', {})
+        return session
+
+    async def _members_chunk(self, connection, data):
+        session = self._session
+        await self._dispatch(session, 'GUILD_MEMBERS_CHUNK', {
+            'guild_id': data['guild_id'],
+            'members': [],
+            'chunk_index': 0,
+            'chunk_count': 1,
+            'nonce': data.get('nonce'),
+        })
+
+    async def _dispatch(self, session, event, data):
+        session.sequence += 1
+        payload = {'op': DISPATCH, 't': event, 's': session.sequence, 'd': data}
+        session.events.append((session.sequence, payload))
+        if len(session.events) > self.max_events:
+            del session.events[:len(session.events) // 2]
+        if session.ws is not None and not session.ws.closed:
+            await self._send({'ws': session.ws, 'compressor': session.compressor},
+                             payload)
+
+    def guild_payload(self, guild):
+        if guild['id'] in self._guild_payloads:
+            return self._guild_payloads[guild['id']]
+        return {
+            'id': guild['id'],
+            'name': f"guild {guild['id']}",
+            'unavailable': False,
+            'member_count': 2,
+            'owner_id': OWNER_USER['id'],
+            'joined_at': timestamp(),
+            'large': False,
+            'features': [],
+            'emojis': [],
+            'stickers': [],
+            'threads': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+            'voice_states': [],
+            'presences': [],
+            'members': [],
+            'roles': [{
+                'id': guild['id'],
+                'name': '@everyone',
+                'permissions': str(2**53 - 1),
+                'position': 0,
+                'color': 0,
+                'hoist': False,
+                'managed': False,
+                'mentionable': False,
+            }],
+            'channels': [{
+                'id': channel_id,
+                'type': 0,
+                'name': f'salon-{position}',
+                'position': position,
+                'guild_id': guild['id'],
+                'permission_overwrites': [],
+                'nsfw': False,
+            } for position, channel_id in enumerate(guild['channels'])],
+        }
+
+    # Controls
+
+    async def dispatch(self, event, data):
+        """Sends an event to the current session (queued if disconnected)."""
+        await self._dispatch(self._session, event, data)
+
+    def message_payload(self, channel_id, content, author_id=None):
+        guild_id = next(g['id'] for g in self.guilds
+                        if str(channel_id) in g['channels'])
+        author_id = str(author_id or next(self._ids))
+        return {
+            'id': str(next(self._ids)),
+            'channel_id': str(channel_id),
+            'guild_id': guild_id,
+            'type': 0,
+            'content': content,
+            'author': {
+                'id': author_id,
+                'username': f'user{author_id[-4:]}',
+                'discriminator': '0',
+                'global_name': None,
+                'avatar': None,
+            },
+            'member': {'roles': [], 'joined_at': timestamp(), 'deaf': False,
+                       'mute': False, 'flags': 0},
+            'timestamp': timestamp(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'flags': 0,
+        }
+
+    async def flood(self, count, content='!lucie', channels=None, authors=None,
+                    rate=None):
+        """Dispatches `count` MESSAGE_CREATE events, `rate` per second at most.
+
+        Messages go round-robin over `channels` (all channels by default) and
+        come from `authors` distinct users (one per message by default).
+        """
+        channels = channels or self.channel_ids
+        author_ids = [next(self._ids) for _ in range(authors)] if authors else None
+        start = time.perf_counter()
+        for i in range(count):
+            author = author_ids[i % len(author_ids)] if author_ids else None
+            await self.dispatch('MESSAGE_CREATE', self.message_payload(
+                channels[i % len(channels)], content, author))
+            if rate:
+                delay = start + (i + 1) / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    async def disconnect(self, code=4000):
+        """Closes the gateway connection; 4000 lets the client resume."""
+        session = self._session
+        if session is not None and session.ws is not None:
+            await session.ws.close(code=code)
+
+    async def invalidate_session(self, resumable=False):
+        await self._send({'ws': self._session.ws,
+                          'compressor': self._session.compressor},
+                         {'op': INVALID_SESSION, 'd': resumable})
+
+    async def request_reconnect(self):
+        await self._send({'ws': self._session.ws,
+                          'compressor': self._session.compressor},
+                         {'op': RECONNECT, 'd': None})
+
+    # REST
+
+    def _rate_limit(self, key, limit, period):
+        now = time.time()
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.reset_at <= now:
+            bucket = self._buckets[key] = _Bucket(limit, now + period)
+        headers = {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Reset': f'{bucket.reset_at:.3f}',
+            'X-RateLimit-Reset-After': f'{bucket.reset_at - now:.3f}',
+            'X-RateLimit-Bucket': f'{key[0]}:{key[1]}',
+        }
+        if bucket.remaining <= 0:
+            headers['X-RateLimit-Remaining'] = '0'
+            headers['X-RateLimit-Scope'] = 'user'
+            headers['Retry-After'] = f'{bucket.reset_at - now:.3f}'
+            return False, headers
+        bucket.remaining -= 1
+        headers['X-RateLimit-Remaining'] = str(bucket.remaining)
+        return True, headers
+
+    async def _rest(self, request):
+        path = '/' + request.match_info['path']
+        body = None
+        if request.can_read_body:
+            if request.content_type == 'application/json':
+                body = await request.json()
+            else:
+                body = await request.read()
+        call = {'time': time.time(), 'method': request.method, 'path': path,
+                'body': body, 'status': 200}
+        self.calls.append(call)
+        status, payload, headers = self._global_limit()
+        if status is None:
+            status, payload, headers = self._route(request.method, path, body)
+        call['status'] = status
+        if status == 204:
+            return web.Response(status=204, headers=headers)
+        if status == 429:
+            # Without Via, discord.py takes a 429 for a Cloudflare ban
+            headers['Via'] = '1.1 google'
+        # discord.py only decodes an exact 'application/json' content type
+        headers['Content-Type'] = 'application/json'
+        return web.Response(body=json.dumps(payload).encode(), status=status,
+                            headers=headers)
+
+    def _global_limit(self):
+        if self.global_limit is None:
+            return None, None, None
+        allowed, headers = self._rate_limit(('global', ''), self.global_limit,
+                                            1.0)
+        if allowed:
+            return None, None, None
+        self.rate_limited += 1
+        headers = {'Retry-After': headers['Retry-After'],
+                   'X-RateLimit-Global': 'true',
+                   'X-RateLimit-Scope': 'global'}
+        return 429, {
+            'message': 'You are being rate limited.',
+            'retry_after': float(headers['Retry-After']),
+            'global': True,
+        }, headers
+
+    def _route(self, method, path, body):
+        parts = path.strip('/').split('/')
+        if method == 'GET' and path == '/users/@me':
+            return 200, self.bot_user, {}
+        if method == 'GET' and path == '/oauth2/applications/@me':
+            return 200, {
+                'id': self.bot_user['id'], 'name': 'Lucie', 'icon': None,
+                'description': '', 'bot_public': True,
+                'bot_require_code_grant': False, 'owner': OWNER_USER,
+                'verify_key': '', 'flags': 0, 'team': None,
+            }, {}
+        if method == 'GET' and path in ('/gateway', '/gateway/bot'):
+            return 200, {
+                'url': self.gateway_url,
+                'shards': 1,
+                'session_start_limit': {'total': 1000, 'remaining': 1000,
+                                        'reset_after': 0,
+                                        'max_concurrency': 1},
+            }, {}
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'channels':
+            channel_id = parts[1]
+            if parts[2] == 'typing':
+                return 204, None, {}
+            if parts[2] == 'messages':
+                allowed, headers = self._rate_limit(
+                    ('messages', channel_id), self.message_limit,
+                    self.message_period)
+                if not allowed:
+                    self.rate_limited += 1
+                    return 429, {
+                        'message': 'You are being rate limited.',
+                        'retry_after': float(headers['Retry-After']),
+                        'global': False,
+                    }, headers
+                message = self.message_payload(channel_id, '',
+                                               self.bot_user['id'])
+                message['author'] = self.bot_user
+                del message['member']
+                if isinstance(body, dict):
+                    message['content'] = body.get('content') or ''
+                    message['embeds'] = body.get('embeds') or []
+                return 200, message, headers
+        return 404, {'message': '404: Not Found', 'code': 0}, {}
+
+    def sent_messages(self):
+        """Bodies of the messages the bot successfully created."""
+        return [call['body'] for call in self.calls
+                if call['method'] == 'POST' and call['path'].endswith('/messages')
+                and call['status'] == 200]
+
+
+async def serve(args):
+    server = FakeDiscordServer(guilds=args.guilds,
+                               channels_per_guild=args.channels,
+                               message_limit=args.message_limit,
+                               message_period=args.message_period)
+    api_url, gateway_url = await server.start(args.host, args.port)
+    print(f'DISCORD_API_URL={api_url}')
+    print(f'DISCORD_GATEWAY_URL={gateway_url}')
+    await server.ready.wait()
+    print(f'Bot connected, guild ids: {[g["id"] for g in server.guilds]}')
+    started = time.monotonic()
+    next_disconnect = started + args.disconnect_every if args.disconnect_every else None
+    while True:
+        if args.rate:
+            await server.flood(args.rate, args.content, rate=args.rate)
+        else:
+            await asyncio.sleep(1)
+        if next_disconnect is not None and time.monotonic() >= next_disconnect:
+            await server.disconnect()
+            next_disconnect += args.disconnect_every
+        print(f'{len(server.calls)} REST calls, {server.rate_limited} 429s, '
+              f'{server.identifies} identifies, {server.resumes} resumes')
+
+
+def main(argv=None):
+    """Run a local Discord stand-in for the bot (any token is accepted)"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--guilds', type=int, default=1)
+    parser.add_argument('--channels', type=int, default=1,
+                        help="channels per guild")
+    parser.add_argument('--rate', type=int, default=0,
+                        help="MESSAGE_CREATE events per second")
+    parser.add_argument('--content', default='!lucie')
+    parser.add_argument('--disconnect-every', type=float, default=0,
+                        help="seconds between forced (resumable) disconnects")
+    parser.add_argument('--message-limit', type=int, default=5)
+    parser.add_argument('--message-period', type=float, default=5.0)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from core.endpoints import configurer_endpoints
+from core.gateway_trace import lire_trace
+from utils.mock_discord import FakeDiscordServer
+
+RESULTS_DIR = 'test_results'
+
+# Served by the fake gateway on IDENTIFY, or connection-specific
+STATE_EVENTS = {'READY', 'RESUMED'}
+
+
+def load_trace(path):
+    """Split a trace into initial state and the events to replay.
+
+    The bot user and the guilds of the first READY (with their recorded
+    GUILD_CREATE) become the fake server's initial state; later GUILD_CREATE
+    events (guilds joined during the trace) are replayed like the others.
+    """
+    bot_user = None
+    initial_guilds = None
+    guild_payloads = {}
+    events = []
+    for offset, event, data in lire_trace(path):
+        if event == 'READY':
+            if initial_guilds is None:
+                bot_user = data['user']
+                initial_guilds = {g['id'] for g in data['guilds']}
+            continue
+        if event in STATE_EVENTS:
+            continue
+        if (event == 'GUILD_CREATE' and initial_guilds is not None
+                and data['id'] in initial_guilds
+                and data['id'] not in guild_payloads):
+            guild_payloads[data['id']] = data
+            continue
+        events.append((offset, event, data))
+    return bot_user, list(guild_payloads.values()), events
+
+
+def prepare_server(server, bot_user, guilds):
+    if bot_user is not None:
+        server.bot_user = dict(bot_user, bot=True)
+    if guilds:
+        server.set_guilds(guilds)
+
+
+async def replay(server, events, speed=1.0):
+    """Dispatch `events` with their recorded spacing divided by `speed`.
+
+    A speed of 0 dispatches as fast as possible. Returns the wall time and
+    how late, at worst, an event was dispatched.
+    """
+    start = time.perf_counter()
+    first = events[0][0] if events else 0.0
+    max_late = 0.0
+    for offset, event, data in events:
+        if speed:
+            due = start + (offset - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_late = max(max_late, -delay)
+        await server.dispatch(event, data)
+    return {
+        'events': len(events),
+        'seconds': round(time.perf_counter() - start, 3),
+        'max_dispatch_late_ms': round(max_late * 1000, 2),
+    }
+
+
+def _seconds_to_ms(value):
+    if value is None:
+        return None
+    return value * 1000 if value != float('inf') else 'inf'
+
+
+def production_metrics(module):
+    """Same latency and loop-lag figures as the bot's /metrics and /health."""
+    from core.metrics import REGISTRE
+
+    report = dict(module.moniteur.statistiques())
+    for name in ('bot_command_duration_seconds', 'bot_command_dispatch_seconds'):
+        histogram = REGISTRE.get(name)
+        if histogram is None:
+            continue
+        series = histogram._series
+        for labels in series:
+            label = name + ('{' + ','.join(labels) + '}' if labels else '')
+            report[label] = {
+                'count': series[labels].total,
+                'p50_ms<=': _seconds_to_ms(histogram.quantile(0.5, *labels)),
+                'p99_ms<=': _seconds_to_ms(histogram.quantile(0.99, *labels)),
+            }
+    for name in ('discord_rest_rate_limited_total', 'bot_messages_seen_total',
+                 'bot_messages_rejected_total', 'bot_outbound_sends_total'):
+        metric = REGISTRE.get(name)
+        if metric is not None:
+            report[name] = metric.valeur
+    return report
+
+
+def isolate_environment(directory):
+    """Keep the replayed bot away from production state.
+
+    The bot module calls load_dotenv(), which never overrides variables that
+    are already set: everything that could reach shared state (Redis
+    cooldowns and dedup keys, the cooldown database, log and trace files,
+    the keep-alive port) is pinned here before it is imported.
+    """
+    isolated = {
+        'COOLDOWN_BACKEND': 'memory',
+        'REDIS_URL': '',
+        'COOLDOWN_DB': os.path.join(directory, 'cooldowns.db'),
+        'LOG_FILE': os.path.join(directory, 'bot.log'),
+        'TRACE_FILE': os.path.join(directory, 'spans.json'),
+        'GATEWAY_TRACE': '',
+        'PROFILE_TOKEN': '',
+        'CLUSTER_ID': '',
+        'PORT': '0',
+    }
+    os.environ.update(isolated)
+    return isolated
+
+
+async def run(args):
+    bot_user, guilds, events = load_trace(args.trace)
+    server = FakeDiscordServer()
+    prepare_server(server, bot_user, guilds)
+    endpoints = await server.start(args.host, args.port)
+    configurer_endpoints(*endpoints)
+
+    # The real bot module, with its production configuration and metrics
+    isolate_environment(tempfile.mkdtemp(prefix='replay_'))
+    module = importlib.import_module('bot')
+    bot_task = asyncio.create_task(module.executer('replay-token'))
+    try:
+        await asyncio.wait_for(server.ready.wait(), 30)
+        await module.bot.wait_until_ready()
+        result = await replay(server, events, args.speed)
+        await asyncio.sleep(args.drain)
+    finally:
+        await module.bot.close()
+        await bot_task
+        await server.stop()
+    result.update(trace=args.trace, speed=args.speed,
+                  rest_calls=len(server.calls),
+                  rest_429=server.rate_limited,
+                  metrics=production_metrics(module))
+    return result
+
+
+def main(argv=None):
+    """Replay a recorded gateway trace into the bot, with no network"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('trace', help="GATEWAY_TRACE file (.jsonl.gz)")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="replay speed factor (0 = as fast as possible)")
+    parser.add_argument('--drain', type=float, default=2.0,
+                        help="seconds to let the bot finish after the last event")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if not os.path.exists(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report_file = os.path.join(RESULTS_DIR, f'replay_{timestamp}.json')
+    with open(report_file, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Replay report generated: {report_file}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())